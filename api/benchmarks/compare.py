@@ -0,0 +1,83 @@
+"""
+Compare two benchmark result files created by `benchmarks/run.py`.
+
+Prints the change of p50/p95/p99 latency and throughput for every endpoint both runs
+have in common, and exits with status 1 if any p95 regressed by more than the
+threshold, so it can be used to gate changes.
+
+    python benchmarks/compare.py benchmarks/results/before.json benchmarks/results/after.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "throughput_rps"]
+
+
+def change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def compare(before: dict, after: dict, threshold: float) -> list[str]:
+    """
+    Print the comparison table and return the endpoints whose p95 regressed by more
+    than threshold percent.
+    """
+    regressions = []
+    for name, scenario in after["scenarios"].items():
+        if name not in before["scenarios"]:
+            continue
+        print(f"\n== {name} ==")
+        print(f"{'endpoint':<48} " + " ".join(f"{metric:>22}" for metric in METRICS))
+        old_endpoints = before["scenarios"][name]["endpoints"]
+        rows = [
+            (label, old_endpoints[label], stats)
+            for label, stats in scenario["endpoints"].items()
+            if label in old_endpoints
+        ]
+        rows.append(("total", before["scenarios"][name]["total"], scenario["total"]))
+        for label, old, new in rows:
+            cells = [
+                f"{old[metric]:>8.1f} -> {new[metric]:>7.1f} {change(old[metric], new[metric]):>+5.0f}%"
+                for metric in METRICS
+            ]
+            print(f"{label:<48} " + " ".join(cells))
+            if change(old["p95_ms"], new["p95_ms"]) > threshold:
+                regressions.append(f"{name}: {label}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=20,
+        help="percent p95 increase that counts as a regression, defaults to 20",
+    )
+    args = parser.parse_args(argv)
+
+    before = json.loads(args.before.read_text())
+    after = json.loads(args.after.read_text())
+    print(
+        f"before: {before['meta']['git_commit']} {before['meta']['timestamp']}\n"
+        f"after:  {after['meta']['git_commit']} {after['meta']['timestamp']}"
+    )
+    if before["meta"]["scale"] != after["meta"]["scale"]:
+        print("warning: the runs used different dataset scales")
+
+    regressions = compare(before, after, args.threshold)
+    if regressions:
+        print(f"\np95 regressions over {args.threshold}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Compare the event repositories: the latency of each repository operation on sqlite
+and, with --database-url, on PostgreSQL, at the same concurrency and over the same
+seeded events.
+
+Unlike run.py this skips HTTP and the routes, the numbers are the data layer alone.
+Run from the `api` folder:
+
+    python benchmarks/repositories.py --events 20000
+    python benchmarks/repositories.py --events 20000 --database-url postgresql://localhost/bench
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from seed import (
+    CITIES,
+    EVENT_WORDS,
+    START_TIME,
+    copy_to_postgres,
+    event_organization_id,
+    seed_database,
+)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def operations(args: argparse.Namespace):
+    from models import EventIn, EventUpdate
+    from repositories import EventFilters
+
+    async def list_page(repository, rng):
+        start = START_TIME.replace(month=rng.randrange(1, 13)).isoformat()
+        await repository.list_events(EventFilters(start=start), None, 51)
+
+    async def list_organization(repository, rng):
+        filters = EventFilters(organization_id=rng.randrange(1, args.orgs + 1))
+        await repository.list_events(filters, None, 51)
+
+    async def search(repository, rng):
+        await repository.search_events(
+            rng.choice(EVENT_WORDS), None, EventFilters(), None, 21
+        )
+
+    async def get_event(repository, rng):
+        await repository.get_validators(rng.randrange(1, args.events + 1))
+        await repository.get_event(rng.randrange(1, args.events + 1))
+
+    async def insert(repository, rng):
+        await repository.insert_event(
+            EventIn(
+                name=" ".join(rng.choices(EVENT_WORDS, k=3)).title(),
+                description=" ".join(rng.choices(EVENT_WORDS, k=20)),
+                location=f"{rng.randrange(1, 999)} Main St, {rng.choice(CITIES)}",
+                time=START_TIME.isoformat(),
+                organization_id=event_organization_id(1, args.orgs),
+            )
+        )
+
+    async def update(repository, rng):
+        await repository.update_event(
+            rng.randrange(1, args.events + 1),
+            EventUpdate(name=" ".join(rng.choices(EVENT_WORDS, k=3)).title()),
+        )
+
+    return {
+        "list_events": list_page,
+        "list_events (organization)": list_organization,
+        "search_events": search,
+        "get_event": get_event,
+        "insert_event": insert,
+        "update_event": update,
+    }
+
+
+async def measure(repository, operation, args: argparse.Namespace) -> dict:
+    """Run the operation from `concurrency` tasks for `duration` seconds."""
+    latencies: list[float] = []
+    deadline = time.perf_counter() + args.duration
+
+    async def worker(worker_id: int):
+        rng = random.Random(args.seed + worker_id)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await operation(repository, rng)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "ops_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+    }
+
+
+async def run_backend(repositories, args: argparse.Namespace) -> dict[str, dict]:
+    results = {}
+    try:
+        for name, operation in operations(args).items():
+            results[name] = await measure(repositories.events, operation, args)
+    finally:
+        await repositories.close()
+    return results
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--orgs", type=int, default=100)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--duration", type=float, default=5, help="seconds per operation"
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--database-url",
+        help="also run against this PostgreSQL database, its tables are replaced",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        seed_database(db_path, args.users, args.orgs, args.events, registrations=0)
+        # db reads its settings on import
+        os.environ["DATABASE_PATH"] = db_path
+
+        from db import close_pool
+        from repositories.sqlite import SqliteRepositories
+        from utils.writer import close_write_queue
+
+        results = {"sqlite": asyncio.run(run_backend(SqliteRepositories(), args))}
+        close_write_queue()
+        close_pool()
+
+        if args.database_url:
+            from repositories.postgres import PostgresRepositories
+
+            copy_to_postgres(db_path, args.database_url)
+            results["postgres"] = asyncio.run(
+                run_backend(PostgresRepositories(args.database_url), args)
+            )
+
+    print(f"{'operation':<28}{'backend':<10}{'ops/s':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    for name in operations(args):
+        for backend, backend_results in results.items():
+            result = backend_results[name]
+            print(
+                f"{name:<28}{backend:<10}{result['ops_per_s']:>9.1f}"
+                f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
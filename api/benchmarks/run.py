@@ -0,0 +1,471 @@
+"""
+Load test the API and report latency percentiles and throughput per endpoint.
+
+Seeds a database at the requested scale, starts the real app (`main:app`) with uvicorn
+against it and drives it with concurrent httpx clients, one scenario at a time. Results
+are printed and saved as JSON so runs can be compared with `benchmarks/compare.py`.
+
+Run from the `api` folder:
+
+    python benchmarks/run.py --users 10000 --events 5000 --registrations 50000
+
+With `--backend postgres --database-url postgresql://...` the seeded database is copied
+to PostgreSQL and every route is served from it.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from seed import (
+    BENCH_PASSWORD,
+    copy_to_postgres,
+    event_organization_id,
+    seed_database,
+)
+
+API_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+TIME_OF_DAY = ["Mornings", "Afternoons", "Evenings"]
+SEARCH_TERMS = ["beach", "food", "tutor", "garden", "park", "clinic", "river"]
+
+
+class Recorder:
+    """Collects the latency and status of every request, grouped by endpoint label."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    async def request(
+        self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs
+    ) -> httpx.Response | None:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as exc:
+            self.latencies[label].append(time.perf_counter() - start)
+            self.statuses[label][type(exc).__name__] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - start)
+        self.statuses[label][str(response.status_code)] += 1
+        return response
+
+
+class Context:
+    """What the scenarios need to know about the seeded data."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.users = args.users
+        self.orgs = args.orgs
+        self.events = args.events
+        self.signups = 0
+
+
+# Scenario operations, each makes one or more requests through the recorder.
+
+
+async def signup(client, recorder, ctx, rng):
+    ctx.signups += 1
+    email = f"bench{ctx.signups}-{rng.randrange(1 << 30)}@signup.example"
+    await recorder.request(
+        client,
+        "POST /api/auth/signup",
+        "POST",
+        "/api/auth/signup",
+        json={
+            "email": email,
+            "first_name": "Bench",
+            "last_name": "Signup",
+            "password": BENCH_PASSWORD,
+        },
+    )
+
+
+async def login(client, recorder, ctx, rng):
+    user_id = rng.randrange(1, ctx.users + 1)
+    await recorder.request(
+        client,
+        "POST /api/auth/login",
+        "POST",
+        "/api/auth/login",
+        data={"username": f"user{user_id}@bench.example", "password": BENCH_PASSWORD},
+    )
+
+
+async def list_events(client, recorder, ctx, rng):
+    params: dict = {"limit": 50}
+    choice = rng.random()
+    if choice < 0.25:
+        params["organization_id"] = rng.randrange(1, ctx.orgs + 1)
+    elif choice < 0.5:
+        params["time_of_day"] = rng.choice(TIME_OF_DAY)
+    elif choice < 0.6:
+        params["weekend_only"] = True
+    elif choice < 0.75:
+        params.update(scope="myOrgs", user_id=rng.randrange(1, ctx.users + 1))
+    response = await recorder.request(
+        client, "GET /api/events", "GET", "/api/events", params=params
+    )
+    # follow the cursor for a second page some of the time
+    if response is not None and "x-next-cursor" in response.headers and choice > 0.5:
+        params["cursor"] = response.headers["x-next-cursor"]
+        await recorder.request(
+            client, "GET /api/events", "GET", "/api/events", params=params
+        )
+
+
+async def get_event(client, recorder, ctx, rng):
+    event_id = rng.randrange(1, ctx.events + 1)
+    await recorder.request(
+        client, "GET /api/events/{event_id}", "GET", f"/api/events/{event_id}"
+    )
+
+
+async def search_events(client, recorder, ctx, rng):
+    await recorder.request(
+        client,
+        "GET /api/events/search",
+        "GET",
+        "/api/events/search",
+        params={"q": rng.choice(SEARCH_TERMS)},
+    )
+
+
+async def list_organizations(client, recorder, ctx, rng):
+    params = {"query": rng.choice(SEARCH_TERMS)} if rng.random() < 0.5 else {}
+    await recorder.request(
+        client, "GET /api/organization", "GET", "/api/organization", params=params
+    )
+
+
+async def list_organization_users(client, recorder, ctx, rng):
+    org_id = rng.randrange(1, ctx.orgs + 1)
+    await recorder.request(
+        client,
+        "GET /api/organization/{organization_id}/users",
+        "GET",
+        f"/api/organization/{org_id}/users",
+    )
+
+
+async def list_event_registrations(client, recorder, ctx, rng):
+    await recorder.request(
+        client,
+        "GET /api/event-registrations",
+        "GET",
+        "/api/event-registrations",
+        params={"event_id": rng.randrange(1, ctx.events + 1), "limit": 50},
+    )
+
+
+async def register_for_event(client, recorder, ctx, rng):
+    # a rush on a handful of popular events, duplicates answer 409 like in production
+    event_id = rng.randrange(1, min(ctx.events, 20) + 1)
+    await recorder.request(
+        client,
+        "POST /api/event-registrations",
+        "POST",
+        "/api/event-registrations",
+        json={
+            "user_id": rng.randrange(1, ctx.users + 1),
+            "event_id": event_id,
+            "organization_id": event_organization_id(event_id, ctx.orgs),
+            "registration_time": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+    )
+
+
+# scenario name -> weighted operations
+SCENARIOS = {
+    "auth": [(1, signup), (4, login)],
+    "browse": [
+        (5, list_events),
+        (4, get_event),
+        (2, search_events),
+        (2, list_organizations),
+        (1, list_organization_users),
+        (1, list_event_registrations),
+    ],
+    "registration": [(9, register_for_event), (1, list_event_registrations)],
+}
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(
+        0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1)
+    )
+    return sorted_values[index]
+
+
+def summarize(latencies: list[float], statuses: Counter, elapsed: float) -> dict:
+    values = sorted(latencies)
+    errors = sum(
+        count
+        for status_code, count in statuses.items()
+        if not status_code.isdigit() or int(status_code) >= 500
+    )
+    return {
+        "count": len(values),
+        "errors": errors,
+        "statuses": dict(statuses),
+        "throughput_rps": len(values) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(values) / len(values) * 1000 if values else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": values[-1] * 1000 if values else 0.0,
+    }
+
+
+async def run_scenario(
+    base_url: str, name: str, ctx: Context, args: argparse.Namespace
+) -> dict:
+    operations = SCENARIOS[name]
+    weights = [weight for weight, _ in operations]
+    recorder = Recorder()
+    deadline = time.perf_counter() + args.duration
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=args.timeout
+    ) as client:
+
+        async def worker(worker_id: int):
+            rng = random.Random(f"{args.seed}-{name}-{worker_id}")
+            while time.perf_counter() < deadline:
+                (operation,) = rng.choices(
+                    [op for _, op in operations], weights=weights
+                )
+                await operation(client, recorder, ctx, rng)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    all_latencies = [
+        value for values in recorder.latencies.values() for value in values
+    ]
+    all_statuses = sum(recorder.statuses.values(), Counter())
+    return {
+        "duration_s": elapsed,
+        "total": summarize(all_latencies, all_statuses, elapsed),
+        "endpoints": {
+            label: summarize(values, recorder.statuses[label], elapsed)
+            for label, values in sorted(recorder.latencies.items())
+        },
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(
+    db_path: Path, port: int, args: argparse.Namespace
+) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_PATH": str(db_path),
+        "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+        "DB_BACKEND": args.backend,
+    }
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(args.workers), "--log-level", "warning",
+    ]  # fmt: skip
+    return subprocess.Popen(command, cwd=API_DIR, env=env)
+
+
+def wait_until_ready(base_url: str, server: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("API server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/api", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("API server did not start in time")
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=API_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: dict) -> None:
+    header = f"{'endpoint':<48} {'count':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"
+    for name, scenario in results["scenarios"].items():
+        print(f"\n== {name} ({scenario['duration_s']:.1f}s) ==")
+        print(header)
+        rows = [*scenario["endpoints"].items(), ("total", scenario["total"])]
+        for label, stats in rows:
+            print(
+                f"{label:<48} {stats['count']:>7} {stats['errors']:>5} "
+                f"{stats['throughput_rps']:>8.1f} {stats['p50_ms']:>6.1f}ms "
+                f"{stats['p95_ms']:>6.1f}ms {stats['p99_ms']:>6.1f}ms"
+            )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    scale = parser.add_argument_group("dataset scale")
+    scale.add_argument("--users", type=int, default=2000)
+    scale.add_argument("--orgs", type=int, default=100)
+    scale.add_argument("--events", type=int, default=2000)
+    scale.add_argument("--registrations", type=int, default=20000)
+    scale.add_argument("--seed", type=int, default=0)
+
+    load = parser.add_argument_group("load")
+    load.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=sorted(SCENARIOS),
+        default=["browse", "auth", "registration"],
+    )
+    load.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    load.add_argument("--concurrency", type=int, default=16)
+    load.add_argument("--timeout", type=float, default=30)
+    load.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    load.add_argument(
+        "--bcrypt-rounds",
+        type=int,
+        default=12,
+        help="BCRYPT_ROUNDS for the server, the seeded users always use 4",
+    )
+
+    backend = parser.add_argument_group("backend")
+    backend.add_argument(
+        "--backend",
+        choices=["sqlite", "postgres"],
+        default="sqlite",
+        help="DB_BACKEND for the server, postgres serves every route from --database-url",
+    )
+    backend.add_argument(
+        "--database-url",
+        help="PostgreSQL database for --backend postgres, its tables are replaced",
+    )
+
+    output = parser.add_argument_group("output")
+    output.add_argument(
+        "--db", type=Path, help="database path, defaults to a temp file"
+    )
+    output.add_argument(
+        "--reuse-db", action="store_true", help="don't reseed an existing --db"
+    )
+    output.add_argument("--output", type=Path, help="results JSON path")
+    args = parser.parse_args(argv)
+    if args.backend == "postgres" and not args.database_url:
+        parser.error("--backend postgres needs --database-url")
+    return args
+
+
+def main(argv: list[str] | None = None) -> dict:
+    args = parse_args(argv)
+    tmp_dir = None
+    if args.db is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        args.db = Path(tmp_dir.name) / "bench.db"
+
+    if not (args.reuse_db and args.db.exists()):
+        print(
+            f"seeding {args.db}: {args.users} users, {args.orgs} orgs, "
+            f"{args.events} events, {args.registrations} registrations"
+        )
+        seed_start = time.perf_counter()
+        seed_database(
+            args.db, args.users, args.orgs, args.events, args.registrations, args.seed
+        )
+        print(f"seeded in {time.perf_counter() - seed_start:.1f}s")
+    if args.backend == "postgres":
+        print("copying the database to PostgreSQL")
+        copy_to_postgres(args.db, args.database_url)
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(args.db, port, args)
+    try:
+        wait_until_ready(base_url, server)
+        ctx = Context(args)
+        scenarios = {}
+        for name in args.scenarios:
+            print(
+                f"running {name} for {args.duration}s at concurrency {args.concurrency}"
+            )
+            scenarios[name] = asyncio.run(run_scenario(base_url, name, ctx, args))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    results = {
+        "meta": {
+            "git_commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": {
+                "users": args.users,
+                "orgs": args.orgs,
+                "events": args.events,
+                "registrations": args.registrations,
+                "seed": args.seed,
+            },
+            "duration_s": args.duration,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "bcrypt_rounds": args.bcrypt_rounds,
+            "backend": args.backend,
+        },
+        "scenarios": scenarios,
+    }
+    print_report(results)
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = (
+            RESULTS_DIR / f"{stamp}-{results['meta']['git_commit'] or 'nogit'}.json"
+        )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"\nresults saved to {output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
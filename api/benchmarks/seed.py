@@ -0,0 +1,244 @@
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import bcrypt
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.db_schema import DB_SCHEMA, run_migrations  # noqa: E402
+
+# every seeded user shares this password, so load tests can log in as any of them
+BENCH_PASSWORD = "Password123!"
+AVAILABILITY_OPTIONS = ["Full-time", "Part-time", "Weekends", "Evenings"]
+EVENT_WORDS = [
+    "beach",
+    "cleanup",
+    "food",
+    "bank",
+    "tutoring",
+    "garden",
+    "shelter",
+    "library",
+    "park",
+    "drive",
+    "clinic",
+    "coding",
+    "workshop",
+    "river",
+    "mentoring",
+    "repair",
+]
+CITIES = ["Oakland", "Austin", "Denver", "Portland", "Chicago", "Boston", "Seattle"]
+BATCH_SIZE = 10_000
+START_TIME = datetime(2026, 1, 1)
+
+
+def event_organization_id(event_id: int, num_orgs: int) -> int:
+    """Seeded events are spread round robin across organizations."""
+    return (event_id - 1) % num_orgs + 1
+
+
+def _batched(rows, size: int = BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed_database(
+    db_path: Path | str,
+    users: int,
+    orgs: int,
+    events: int,
+    registrations: int,
+    seed: int = 0,
+    bcrypt_rounds: int = 4,
+) -> None:
+    """
+    Create a fresh database at db_path and fill it with deterministic benchmark data.
+
+    Ids are sequential, so user N is `user{N}@bench.example` and event N belongs to
+    organization `event_organization_id(N)`, load tests rely on that to build valid
+    requests without querying the database.
+    """
+    if orgs > users:
+        raise ValueError("Need at least one user per organization")
+    rng = random.Random(seed)
+    db_path = Path(db_path)
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+
+    conn = sqlite3.connect(db_path)
+    conn.executescript(DB_SCHEMA)
+    run_migrations(conn)
+    # the load is a one off, durability doesn't matter until it is done
+    conn.execute("PRAGMA journal_mode = OFF;")
+    conn.execute("PRAGMA synchronous = OFF;")
+
+    hashed = bcrypt.hashpw(
+        BENCH_PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=bcrypt_rounds)
+    ).decode("utf-8")
+
+    with conn:
+        for batch in _batched(
+            (
+                f"user{i}@bench.example",
+                f"First{i}",
+                f"Last{i}",
+                rng.choice(AVAILABILITY_OPTIONS),
+            )
+            for i in range(1, users + 1)
+        ):
+            conn.executemany(
+                "INSERT INTO users (email, first_name, last_name, availability) VALUES (?, ?, ?, ?)",
+                batch,
+            )
+        for batch in _batched((i, hashed) for i in range(1, users + 1)):
+            conn.executemany(
+                "INSERT INTO credentials (user_id, hashed_password) VALUES (?, ?)",
+                batch,
+            )
+
+        for batch in _batched(
+            (
+                f"{rng.choice(EVENT_WORDS).title()} Collective {i}",
+                " ".join(rng.choices(EVENT_WORDS, k=12)),
+                i,
+            )
+            for i in range(1, orgs + 1)
+        ):
+            conn.executemany(
+                "INSERT INTO organizations (name, description, created_by_user_id) VALUES (?, ?, ?)",
+                batch,
+            )
+
+        # the creator is the admin, plus a few volunteers per organization
+        def roles():
+            for org_id in range(1, orgs + 1):
+                yield (org_id, org_id, "admin")
+                for user_id in rng.sample(range(1, users + 1), min(5, users)):
+                    if user_id != org_id:
+                        yield (user_id, org_id, "volunteer")
+
+        for batch in _batched(roles()):
+            conn.executemany(
+                "INSERT OR IGNORE INTO roles (user_id, organization_id, permission_level) VALUES (?, ?, ?)",
+                batch,
+            )
+
+        def event_rows():
+            for i in range(1, events + 1):
+                when = START_TIME + timedelta(
+                    days=rng.randrange(365), hours=rng.randrange(6, 22)
+                )
+                words = rng.choices(EVENT_WORDS, k=3)
+                yield (
+                    " ".join(words).title(),
+                    " ".join(rng.choices(EVENT_WORDS, k=20)),
+                    f"{rng.randrange(1, 999)} Main St, {rng.choice(CITIES)}",
+                    when.strftime("%Y-%m-%dT%H:%M:%S"),
+                    event_organization_id(i, orgs),
+                )
+
+        for batch in _batched(event_rows()):
+            conn.executemany(
+                "INSERT INTO events (name, description, location, time, organization_id) VALUES (?, ?, ?, ?, ?)",
+                batch,
+            )
+
+        def registration_rows():
+            registrations_left = min(registrations, users * events)
+            seen: set[tuple[int, int]] = set()
+            while registrations_left:
+                user_id = rng.randrange(1, users + 1)
+                event_id = rng.randrange(1, events + 1)
+                if (user_id, event_id) in seen:
+                    continue
+                seen.add((user_id, event_id))
+                registrations_left -= 1
+                when = START_TIME + timedelta(seconds=rng.randrange(365 * 86400))
+                yield (
+                    user_id,
+                    event_id,
+                    event_organization_id(event_id, orgs),
+                    when.strftime("%Y-%m-%dT%H:%M:%S"),
+                )
+
+        if events:
+            for batch in _batched(registration_rows()):
+                conn.executemany(
+                    "INSERT INTO event_registrations (user_id, event_id, organization_id, registration_time) VALUES (?, ?, ?, ?)",
+                    batch,
+                )
+
+    conn.execute("ANALYZE;")
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.close()
+
+
+# the tables copied to PostgreSQL, parents first for the foreign keys
+_POSTGRES_TABLES = {
+    "users": "user_id, email, first_name, last_name, availability",
+    "credentials": "id, user_id, hashed_password",
+    "organizations": "organization_id, name, description, created_by_user_id",
+    "roles": "user_id, organization_id, permission_level",
+    "events": "id, name, description, location, time, organization_id, capacity, "
+    "registered_count",
+    "event_registrations": "user_id, event_id, organization_id, registration_time",
+    "event_waitlist": "user_id, event_id, organization_id, waitlist_time",
+}
+# identity columns that continue after the copied ids
+_POSTGRES_IDENTITIES = {
+    "users": "user_id",
+    "credentials": "id",
+    "organizations": "organization_id",
+    "events": "id",
+}
+
+
+def copy_to_postgres(db_path: Path | str, database_url: str) -> None:
+    """
+    Replace every table in the PostgreSQL database at database_url with the ones of a
+    seeded database, for running the API or PostgresRepositories against it. Needs
+    psycopg, ids are copied so they still follow the seeded layout.
+    """
+    import psycopg
+
+    from repositories.postgres import POSTGRES_SCHEMA
+
+    source = sqlite3.connect(db_path)
+    with psycopg.connect(database_url) as conn:
+        conn.execute(POSTGRES_SCHEMA)
+        conn.execute(f"TRUNCATE {', '.join(_POSTGRES_TABLES)}, cache_invalidations")
+        conn.execute("DELETE FROM resource_versions WHERE resource <> 'database'")
+        # registered_count is copied with the events, the registration triggers
+        # would count every registration again
+        for table in ("event_registrations", "event_waitlist"):
+            conn.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+        with conn.cursor() as cursor:
+            for table, columns in _POSTGRES_TABLES.items():
+                with cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+                    for row in source.execute(f"SELECT {columns} FROM {table}"):
+                        copy.write_row(row)
+        for table in ("event_registrations", "event_waitlist"):
+            conn.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+        for table, column in _POSTGRES_IDENTITIES.items():
+            conn.execute(
+                f"""
+                SELECT setval(
+                    pg_get_serial_sequence('{table}', '{column}'),
+                    (SELECT coalesce(max({column}), 0) + 1 FROM {table}),
+                    false
+                )
+                """
+            )
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        conn.execute("ANALYZE")
+    source.close()
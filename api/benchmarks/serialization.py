@@ -0,0 +1,139 @@
+"""
+Compare the CPU cost of serializing list pages with the fast JSON path
+(`utils.responses.rows_response`) against building a Pydantic model per row and
+letting FastAPI validate and encode the response_model, the path the list routes used
+before.
+
+Both paths start from the same fetched rows and end with the response body bytes, so
+the numbers are the serialization cost alone, without the query. Run from the `api`
+folder:
+
+    python benchmarks/serialization.py --sizes 10 50 200 1000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from seed import seed_database
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+
+from models import Event, EventRegistrationIn, User  # noqa: E402
+from utils.responses import rows_response  # noqa: E402
+
+# serialize_response is a coroutine, one loop is reused so its setup isn't timed
+LOOP = asyncio.new_event_loop()
+
+# (label, model, query returning the model's columns, at most `?` rows)
+CASES = [
+    (
+        "users",
+        User,
+        "SELECT user_id, email, first_name, last_name, availability FROM users LIMIT ?",
+    ),
+    (
+        "events",
+        Event,
+        """
+        SELECT id, name, description, location, time, organization_id, capacity,
+            registered_count
+        FROM events LIMIT ?
+        """,
+    ),
+    (
+        "event_registrations",
+        EventRegistrationIn,
+        """
+        SELECT user_id, event_id, organization_id, registration_time
+        FROM event_registrations LIMIT ?
+        """,
+    ),
+]
+
+
+def model_path(rows, model, field) -> bytes:
+    # what the routes did: a model per row, then FastAPI validates the list against the
+    # response_model and JSON encodes the result
+    content = [model(**dict(row)) for row in rows]
+    encoded = LOOP.run_until_complete(
+        serialize_response(field=field, response_content=content)
+    )
+    return JSONResponse(encoded).body
+
+
+def fast_path(rows, model, field) -> bytes:
+    return rows_response(rows, model).body
+
+
+def measure(function, rows, model, field, min_time: float) -> float:
+    """Seconds per call, averaged over enough calls to run at least min_time."""
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        function(rows, model, field)
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return elapsed / calls
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10, 50, 200, 1000], help="page sizes"
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=1.0, help="seconds to time each measurement"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    largest = max(args.sizes)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        seed_database(
+            db_path,
+            users=largest,
+            orgs=max(1, largest // 100),
+            events=largest,
+            registrations=largest,
+        )
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+
+        print(f"{'model':<22}{'rows':>6}{'models µs':>12}{'fast µs':>10}{'speedup':>9}")
+        for label, model, query in CASES:
+            field = create_model_field(
+                name="Response_" + label, type_=list[model], mode="serialization"
+            )
+            for size in args.sizes:
+                rows = conn.execute(query, (size,)).fetchall()
+                # both paths must produce the same JSON document
+                assert json.loads(model_path(rows, model, field)) == json.loads(
+                    fast_path(rows, model, field)
+                )
+                slow = measure(model_path, rows, model, field, args.min_time)
+                fast = measure(fast_path, rows, model, field, args.min_time)
+                print(
+                    f"{label:<22}{len(rows):>6}{slow * 1e6:>12.1f}"
+                    f"{fast * 1e6:>10.1f}{slow / fast:>8.1f}x"
+                )
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
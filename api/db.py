@@ -1,28 +1,523 @@
-from pathlib import Path
+import asyncio
+import contextvars
+import os
+import re
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, closing, contextmanager
+from pathlib import Path
+from typing import Any, Callable
+
+from utils.db_schema import DB_SCHEMA, MIGRATIONS, get_schema_version, run_migrations
+from utils.file_lock import FileLock
+from utils.sql_profiling import ProfiledConnection
+
+DATABASE_PATH = Path(
+    os.environ.get("DATABASE_PATH", Path(__file__).resolve().parent / "app.db")
+)
+
+# a copy of the database (a replica, or a snapshot made with utils/snapshot_db.py) the
+# GET routes read from instead of DATABASE_PATH, reads can then lag behind writes
+DB_READ_PATH = Path(os.environ.get("DB_READ_PATH") or DATABASE_PATH)
+
+# max number of connections the pool will keep open at once
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+# max number of read-only connections, kept apart so reads never wait on write traffic
+DB_READ_POOL_SIZE = int(os.environ.get("DB_READ_POOL_SIZE", str(DB_POOL_SIZE)))
+# seconds a request will wait for a free connection before giving up
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "5"))
+# seconds between WAL checkpoints ran by the app lifespan, 0 disables the task
+DB_CHECKPOINT_INTERVAL = float(os.environ.get("DB_CHECKPOINT_INTERVAL", "60"))
+DB_CHECKPOINT_MODE = os.environ.get("DB_CHECKPOINT_MODE", "TRUNCATE").upper()
+# threads running the database calls of the async routes, a connection is only used by
+# one call at a time so more threads than pooled connections would sit idle
+DB_EXECUTOR_WORKERS = int(
+    os.environ.get("DB_EXECUTOR_WORKERS", str(DB_POOL_SIZE + DB_READ_POOL_SIZE))
+)
+
+# Held by the worker setting up the database, the others wait for it instead of running
+# the migrations again at the same time.
+migration_lock = FileLock(f"{DATABASE_PATH}.lock")
+# Held by one worker for as long as it runs, it alone runs the maintenance tasks (WAL
+# checkpoints, pruning the cache invalidation log), see main.py.
+maintenance_lock = FileLock(f"{DATABASE_PATH}.maintenance.lock")
+
+# PRAGMA profiles applied to every connection, the profile is selected with
+# DB_PRAGMA_PROFILE and any single pragma can be overridden with a DB_PRAGMA_<NAME>
+# environment variable, for example DB_PRAGMA_CACHE_SIZE=-128000
+PRAGMA_PROFILES: dict[str, dict[str, str]] = {
+    # sqlite defaults, rollback journal and full fsyncs
+    "default": {
+        "foreign_keys": "ON",
+    },
+    # WAL lets readers run alongside the single writer, synchronous=NORMAL is safe in
+    # WAL mode (a power loss can only roll back the last commits, never corrupt).
+    "production": {
+        "busy_timeout": "5000",
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "foreign_keys": "ON",
+        # negative values are KiB, so 64MB of page cache per connection
+        "cache_size": "-64000",
+        "mmap_size": "268435456",
+        "temp_store": "MEMORY",
+    },
+}
+DB_PRAGMA_PROFILE = os.environ.get("DB_PRAGMA_PROFILE", "production")
+
+_PRAGMA_VALUE = re.compile(r"^-?[\w]+$")
+_CHECKPOINT_MODES = {"PASSIVE", "FULL", "RESTART", "TRUNCATE"}
+
+
+def get_pragmas(profile: str = DB_PRAGMA_PROFILE) -> dict[str, str]:
+    """
+    Resolve the PRAGMA settings for a profile, including environment overrides.
+    """
+    if profile not in PRAGMA_PROFILES:
+        raise ValueError(
+            f"Unknown DB_PRAGMA_PROFILE '{profile}', expected one of {list(PRAGMA_PROFILES)}"
+        )
+    pragmas = dict(PRAGMA_PROFILES[profile])
+    for key, value in os.environ.items():
+        if key.startswith("DB_PRAGMA_") and key != "DB_PRAGMA_PROFILE":
+            pragmas[key.removeprefix("DB_PRAGMA_").lower()] = value
+
+    # values are interpolated into the PRAGMA statement, so only allow plain words
+    for name, value in pragmas.items():
+        if not _PRAGMA_VALUE.match(name) or not _PRAGMA_VALUE.match(value):
+            raise ValueError(f"Invalid PRAGMA setting {name}={value}")
+    return pragmas
+
+
+PRAGMAS = get_pragmas()
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the timeout."""
+
+
+def configure_connection(conn: sqlite3.Connection, read_only: bool = False) -> None:
+    """
+    Apply the per-connection setup every connection needs, this is only ran once
+    when the pool opens the connection rather than on every request.
+
+    Read-only connections skip journal_mode, it is stored in the database file and
+    changing it is a write, and refuse any statement that writes with query_only.
+    """
+    # a plain cursor, the setup isn't part of any request so it isn't profiled
+    cursor = sqlite3.Cursor(conn)
+    for name, value in PRAGMAS.items():
+        if read_only and name == "journal_mode":
+            continue
+        cursor.execute(f"PRAGMA {name} = {value};")
+    if read_only:
+        cursor.execute("PRAGMA query_only = ON;")
+    cursor.close()
+    conn.row_factory = sqlite3.Row
+
+
+class ConnectionPool:
+    """
+    A bounded pool of sqlite3 connections.
+
+    Connections are opened lazily up to `size`, handed out to one request at a time and
+    returned to the pool afterwards so the page cache stays warm between requests. If
+    every connection is checked out, callers wait up to `timeout` seconds for one to be
+    released before a PoolTimeoutError is raised.
+
+    A `read_only` pool opens its connections with the `mode=ro` URI and query_only.
+    """
+
+    def __init__(
+        self,
+        database: Path | str,
+        size: int = DB_POOL_SIZE,
+        timeout: float = DB_POOL_TIMEOUT,
+        read_only: bool = False,
+    ):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.read_only = read_only
+
+        self._idle: list[sqlite3.Connection] = []
+        self._opened = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # stats
+        self._in_use = 0
+        self._waiters = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        # connections are checked out and returned from different threadpool workers,
+        # the pool guarantees only one request uses a connection at a time.
+        if self.read_only:
+            conn = sqlite3.connect(
+                Path(self.database).resolve().as_uri() + "?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                factory=ProfiledConnection,
+            )
+        else:
+            conn = sqlite3.connect(
+                self.database, check_same_thread=False, factory=ProfiledConnection
+            )
+        configure_connection(conn, read_only=self.read_only)
+        return conn
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        # a plain cursor, the check on checkout isn't counted against the request
+        try:
+            sqlite3.Cursor(conn).execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        return True
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._opened -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def acquire(self) -> sqlite3.Connection:
+        """
+        Check out a connection, opening a new one if the pool has not reached its size.
+
+        :raises PoolTimeoutError: if no connection is available within the timeout
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        conn = None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            self._waiters += 1
+            try:
+                while not self._idle and self._opened >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if not self._idle and self._opened >= self.size:
+                            self._timeouts += 1
+                            raise PoolTimeoutError(
+                                f"Timed out after {self.timeout}s waiting for a database connection"
+                            )
+            finally:
+                self._waiters -= 1
+
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                # reserve the slot before connecting outside of the lock
+                self._opened += 1
+
+            waited = time.monotonic() - start
+            self._in_use += 1
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+
+        if conn is None:
+            try:
+                return self._connect()
+            except Exception:
+                with self._cond:
+                    self._opened -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+
+        if not self._is_healthy(conn):
+            with self._cond:
+                self._in_use -= 1
+            self._discard(conn)
+            return self.acquire()
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """
+        Return a connection to the pool, rolling back anything the request left
+        uncommitted so the next request starts from a clean state.
+        """
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            with self._cond:
+                self._in_use -= 1
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            if self._closed:
+                self._opened -= 1
+                conn.close()
+                return
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the pool usage, wait times are in seconds.
+        """
+        with self._cond:
+            return {
+                "size": self.size,
+                "opened": self._opened,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "waiters": self._waiters,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "total_wait_time": self._total_wait,
+                "avg_wait_time": self._total_wait / self._checkouts
+                if self._checkouts
+                else 0.0,
+                "max_wait_time": self._max_wait,
+            }
+
+    def close(self) -> None:
+        """
+        Close all idle connections, connections still checked out are closed when
+        they are released.
+        """
+        with self._cond:
+            self._closed = True
+            for conn in self._idle:
+                conn.close()
+            self._opened -= len(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+
+
+_pool: ConnectionPool | None = None
+_read_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Return the process wide connection pool, creating it on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(DATABASE_PATH)
+        return _pool
 
-from utils.db_schema import DB_SCHEMA
 
-DATABASE_PATH = Path(__file__).resolve().parent / "app.db"
+def get_read_pool() -> ConnectionPool:
+    """
+    Return the process wide pool of read-only connections to DB_READ_PATH, creating
+    it on first use.
+    """
+    global _read_pool
+    with _pool_lock:
+        if _read_pool is None:
+            _read_pool = ConnectionPool(
+                DB_READ_PATH, size=DB_READ_POOL_SIZE, read_only=True
+            )
+        return _read_pool
+
+
+def close_pool() -> None:
+    global _pool, _read_pool, _executor
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+        if _read_pool is not None:
+            _read_pool.close()
+            _read_pool = None
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+_executor: ThreadPoolExecutor | None = None
+# what a forked worker inherited, see _reset_after_fork
+_inherited: list = []
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """
+    Return the process wide executor the async routes run their database calls on,
+    creating it on first use.
+    """
+    global _executor
+    with _pool_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db"
+            )
+        return _executor
+
+
+def _reset_after_fork() -> None:
+    """
+    Connections and threads don't survive a fork, a worker forked from a process that
+    already opened them (e.g. gunicorn --preload) starts with pools and an executor of
+    its own. The inherited ones are kept referenced rather than closed, closing them
+    would run sqlite's cleanup on the parent's connections.
+    """
+    global _pool, _read_pool, _executor, _pool_lock
+    _inherited.extend(item for item in (_pool, _read_pool, _executor) if item)
+    _pool = _read_pool = _executor = None
+    # another thread may have held the lock when the process forked
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
 
 def init_db() -> None:
     """
-    Initialize the database by creating necessary tables.
+    Initialize the database by creating necessary tables, running any pending
+    migrations and applying the PRAGMA profile, persistent settings such as the WAL
+    journal mode are stored in the database file itself.
 
-    At the time of writing, this only creates the 'users' table as an example schema.
+    Every worker calls this on startup, the first one sets the database up while
+    holding migration_lock and the others find it up to date and skip the schema.
     """
-    with sqlite3.connect(DATABASE_PATH) as conn:
-        conn.execute("PRAGMA foreign_keys = ON;")
+    with migration_lock, closing(sqlite3.connect(DATABASE_PATH)) as conn:
+        configure_connection(conn)
+        if get_schema_version(conn) >= MIGRATIONS[-1][0]:
+            return
         conn.executescript(DB_SCHEMA)
         conn.commit()
+        run_migrations(conn)
 
 
-def get_connection():
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.execute("PRAGMA foreign_keys = ON;")
-    conn.row_factory = sqlite3.Row
-    try:
+def checkpoint_wal(mode: str = DB_CHECKPOINT_MODE) -> tuple[int, int, int]:
+    """
+    Run a WAL checkpoint on a pooled connection, copying the WAL back into the
+    database. TRUNCATE (the default) also resets the WAL file to zero bytes so it does
+    not keep growing under heavy write traffic.
+
+    Returns the (busy, wal pages, checkpointed pages) row sqlite reports.
+    """
+    mode = mode.upper()
+    if mode not in _CHECKPOINT_MODES:
+        raise ValueError(f"Unknown checkpoint mode '{mode}'")
+    with get_pool().connection() as conn:
+        row = conn.execute(f"PRAGMA wal_checkpoint({mode});").fetchone()
+    return tuple(row)
+
+
+class AsyncConnection:
+    """
+    Async facade over a pooled connection for `async def` routes.
+
+    Every call runs on the dedicated database executor rather than Starlette's
+    threadpool, so a request waiting on sqlite doesn't hold one of the threadpool's
+    slots and the event loop keeps handling other requests meanwhile. Calls on one
+    connection must be awaited one at a time, like the statements of a sync route.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, executor: ThreadPoolExecutor):
+        self.connection = conn
+        self.executor = executor
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """
+        Call `fn(connection, *args)` on the executor, for sync helpers that take the
+        connection (get_validators, get_user_roles...) or a few statements in a row.
+        """
+        loop = asyncio.get_running_loop()
+        # the request's context (metrics) goes along to the executor thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self.executor, context.run, fn, self.connection, *args
+        )
+
+    async def execute(self, sql: str, parameters=()) -> sqlite3.Cursor:
+        return await self.run(_execute, sql, parameters)
+
+    async def fetchone(self, sql: str, parameters=()) -> sqlite3.Row | None:
+        return await self.run(_fetchone, sql, parameters)
+
+    async def fetchall(self, sql: str, parameters=()) -> list[sqlite3.Row]:
+        return await self.run(_fetchall, sql, parameters)
+
+    async def commit(self) -> None:
+        await self.run(sqlite3.Connection.commit)
+
+
+def _execute(conn: sqlite3.Connection, sql: str, parameters) -> sqlite3.Cursor:
+    return conn.execute(sql, parameters)
+
+
+def _fetchone(conn: sqlite3.Connection, sql: str, parameters) -> sqlite3.Row | None:
+    return conn.execute(sql, parameters).fetchone()
+
+
+def _fetchall(conn: sqlite3.Connection, sql: str, parameters) -> list[sqlite3.Row]:
+    return conn.execute(sql, parameters).fetchall()
+
+
+async def run_read(fn: Callable[..., Any], *args) -> Any:
+    """
+    Call `fn(connection, *args)` with a read-only connection on the database
+    executor, how the sqlite repositories read.
+    """
+    async with read_connection() as conn:
+        return await conn.run(fn, *args)
+
+
+async def run_primary(fn: Callable[..., Any], *args) -> Any:
+    """
+    run_read on a connection of the read-write pool, for reads that have to see the
+    latest writes (authentication and authorization) when DB_READ_PATH is a snapshot.
+    """
+    async with _checkout_async(get_pool()) as conn:
+        return await conn.run(fn, *args)
+
+
+@asynccontextmanager
+async def read_connection():
+    """
+    Check out a read-only AsyncConnection, for reads that span several calls such as
+    a response body that is streamed.
+    """
+    async with _checkout_async(get_read_pool()) as conn:
         yield conn
+
+
+@asynccontextmanager
+async def _checkout_async(pool: ConnectionPool):
+    executor = get_db_executor()
+    loop = asyncio.get_running_loop()
+    # waiting for a free connection can block, that happens on the loop's default
+    # executor, the database executor's threads must stay free to run the statements
+    # of the requests that hold the connections. A PoolTimeoutError is answered with a
+    # 503 and a Retry-After header by the app's exception handler.
+    conn = await loop.run_in_executor(None, pool.acquire)
+    try:
+        yield AsyncConnection(conn, executor)
     finally:
-        conn.close()
+        await loop.run_in_executor(executor, pool.release, conn)
@@ -1,13 +1,87 @@
-from contextlib import asynccontextmanager
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager, suppress
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from db import init_db
+from db import (
+    DB_CHECKPOINT_INTERVAL,
+    PRAGMAS,
+    PoolTimeoutError,
+    checkpoint_wal,
+    close_pool,
+    get_pool,
+    get_read_pool,
+    init_db,
+    maintenance_lock,
+)
+from repositories import DB_BACKEND, close_repositories, get_repositories
 from routes.auth import router as auth_router
 from routes.event_registrations import router as event_registrations_router
 from routes.events import router as events_router
+from routes.imports import router as imports_router
 from routes.organization import router as organization_router
 from routes.users import router as users_router
+from utils.auth import user_cache
+from utils.cache_sync import (
+    CACHE_SYNC_INTERVAL_MS,
+    PRUNE_INTERVAL,
+    follower,
+    sync_caches,
+)
+from utils.entity_cache import entity_cache_stats
+from utils.metrics import GaugeCallback, MetricsMiddleware, register, render_metrics
+from utils.permissions import roles_cache
+from utils.security import PasswordHasherBusyError, password_hasher
+from utils.writer import WriteQueueBusyError, close_write_queue, get_write_queue
+
+logger = logging.getLogger(__name__)
+
+
+async def checkpoint_wal_periodically(interval: float):
+    """
+    Background task that checkpoints the WAL every `interval` seconds, so the WAL file
+    does not grow without bound when readers keep sqlite's automatic checkpoints from
+    completing.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        # one worker checkpoints for all of them
+        if not maintenance_lock.acquire(blocking=False):
+            continue
+        try:
+            busy, wal_pages, checkpointed = await asyncio.to_thread(checkpoint_wal)
+            if busy:
+                logger.warning(
+                    "WAL checkpoint blocked, checkpointed %s of %s pages",
+                    checkpointed,
+                    wal_pages,
+                )
+        except Exception:
+            logger.exception("WAL checkpoint failed")
+
+
+async def sync_caches_periodically(interval: float):
+    """
+    Background task that applies the cache invalidations logged by the other workers
+    (and any other process writing to the database) every `interval` seconds, the
+    worker holding maintenance_lock also prunes the log.
+    """
+    last_prune = time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        prune = (
+            time.monotonic() - last_prune >= PRUNE_INTERVAL
+            and maintenance_lock.acquire(blocking=False)
+        )
+        try:
+            await sync_caches(prune)
+        except Exception:
+            logger.exception("Cache invalidation sync failed")
+        if prune:
+            last_prune = time.monotonic()
 
 
 @asynccontextmanager
@@ -18,11 +92,99 @@ async def lifespan(app: FastAPI):
     This appears to be blocking, unsure if init_db should be async, as it should be blocking
     otherwise without a DB connection the server is useless.
     """
-    init_db()
+    # fail on startup rather than on the first request if DB_BACKEND is misconfigured,
+    # the PostgreSQL schema is created when its pool is first used
+    get_repositories()
+    tasks = []
+    if DB_BACKEND == "sqlite":
+        init_db()
+        if (
+            PRAGMAS.get("journal_mode", "").upper() == "WAL"
+            and DB_CHECKPOINT_INTERVAL > 0
+        ):
+            tasks.append(
+                asyncio.create_task(checkpoint_wal_periodically(DB_CHECKPOINT_INTERVAL))
+            )
+    if CACHE_SYNC_INTERVAL_MS > 0:
+        # nothing is cached yet, only what is logged from now on needs applying
+        await sync_caches()
+        tasks.append(
+            asyncio.create_task(sync_caches_periodically(CACHE_SYNC_INTERVAL_MS / 1000))
+        )
     yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    # let another worker take over the maintenance tasks
+    maintenance_lock.release()
+    await close_repositories()
+    close_write_queue()
+    close_pool()
+    password_hasher.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+
+def pool_connections() -> dict[tuple[str, ...], float]:
+    if DB_BACKEND == "sqlite":
+        pools = (("write", get_pool()), ("read", get_read_pool()))
+    else:
+        pools = (("postgres", get_repositories().database),)
+    samples = {}
+    for name, pool in pools:
+        stats = pool.stats()
+        for state in ("in_use", "idle", "waiters"):
+            samples[(name, state)] = stats[state]
+    return samples
+
+
+register(
+    GaugeCallback(
+        "db_pool_connections",
+        "Pooled connections by state, waiters are requests waiting for one.",
+        pool_connections,
+        ("pool", "state"),
+    )
+)
+register(
+    GaugeCallback(
+        "db_write_queue_pending",
+        "Writes waiting for the writer thread.",
+        lambda: (
+            {(): get_write_queue().stats()["pending"]} if DB_BACKEND == "sqlite" else {}
+        ),
+    )
+)
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(PasswordHasherBusyError)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusyError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(WriteQueueBusyError)
+async def write_queue_busy_handler(request: Request, exc: WriteQueueBusyError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"},
+    )
 
 
 # Helper/demo endpoints below
@@ -36,9 +198,33 @@ async def check():
     return {"content:": "I work, from Next.js too... how cool?"}
 
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """
+    Hit, miss and eviction counts of the in-process caches, for this worker only.
+    """
+    return {
+        "auth": user_cache.stats(),
+        "roles": roles_cache.stats(),
+        "invalidation_log": follower.stats(),
+        **entity_cache_stats(),
+    }
+
+
+@app.get("/api/metrics")
+async def metrics():
+    """
+    Request, SQL and pool metrics of this worker in the Prometheus text format.
+    """
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 # include nested routers here
 app.include_router(auth_router, prefix="/api")
 app.include_router(users_router, prefix="/api")
 app.include_router(organization_router, prefix="/api")
 app.include_router(events_router, prefix="/api")
 app.include_router(event_registrations_router, prefix="/api")
+app.include_router(imports_router, prefix="/api")
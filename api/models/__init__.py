@@ -1,5 +1,12 @@
+from .bulk_import import ImportResult, ImportRowError
 from .event import Event, EventIn, EventUpdate
-from .event_registration import EventRegistrationIn
+from .event_registration import (
+    EventRegistrationBulkResult,
+    EventRegistrationConflict,
+    EventRegistrationIn,
+    EventWaitlistEntry,
+    EventWaitlistIn,
+)
 from .organization import Organization, OrganizationCreate, OrganizationUpdate
 from .role import Role, RoleAndUser, RoleCreate, RoleUpdate
 from .user import User
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, NonNegativeInt, PositiveInt
+
+
+class ImportRowError(BaseModel):
+    # 1 based position of the record in the file, the CSV header is not counted
+    row: PositiveInt
+    detail: str
+
+
+class ImportResult(BaseModel):
+    inserted: NonNegativeInt
+    failed: NonNegativeInt
+    # at most MAX_REPORTED_ERRORS of the failed rows, in file order
+    errors: list[ImportRowError]
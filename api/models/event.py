@@ -1,5 +1,11 @@
-from pydantic import BaseModel, PositiveInt
-from typing import Optional
+from pydantic import BaseModel, NonNegativeInt, PositiveInt
+from typing import Literal, Optional
+
+# matches the scope filter options in the client, "myOrgs" and "admin" are resolved
+# through the user's roles
+EventScope = Literal["all", "myOrgs", "admin"]
+# hour ranges are 06-11, 12-16 and 17-21, see the events time_of_day column
+TimeOfDay = Literal["Mornings", "Afternoons", "Evenings"]
 
 
 class EventIn(BaseModel):
@@ -8,6 +14,8 @@ class EventIn(BaseModel):
     location: str
     time: str
     organization_id: PositiveInt
+    # max number of registrations, None is unlimited
+    capacity: Optional[NonNegativeInt] = None
 
 
 class EventUpdate(BaseModel):
@@ -16,6 +24,8 @@ class EventUpdate(BaseModel):
     location: Optional[str] = None
     time: Optional[str] = None
     organization_id: Optional[PositiveInt] = None
+    # unlike the other fields an explicit null is applied, it removes the limit
+    capacity: Optional[NonNegativeInt] = None
 
 
 class Event(BaseModel):
@@ -25,3 +35,15 @@ class Event(BaseModel):
     location: str
     time: str
     organization_id: PositiveInt
+    capacity: Optional[NonNegativeInt] = None
+    registered_count: NonNegativeInt = 0
+
+
+class EventSearchResult(Event):
+    """
+    An event matched by a full text search, snippet is a short excerpt of the best
+    matching column with the matched words wrapped in <mark></mark>, the rest of the
+    text is not escaped.
+    """
+
+    snippet: str
@@ -8,3 +8,25 @@ class EventRegistrationIn(BaseModel):
     # **note** does not include timezone, we completely ignore it and assume all users
     # for an event are in the same timezone as the event itself.
     registration_time: str  # ISO 8601 format, e.g., "2024-06-01T12:00:00"
+
+
+class EventRegistrationConflict(BaseModel):
+    # position of the registration in the request body
+    index: int
+    detail: str
+
+
+class EventRegistrationBulkResult(BaseModel):
+    created: int
+    conflicts: list[EventRegistrationConflict]
+
+
+class EventWaitlistIn(BaseModel):
+    user_id: PositiveInt
+    event_id: PositiveInt
+    organization_id: PositiveInt
+
+
+class EventWaitlistEntry(EventWaitlistIn):
+    # when the user joined the waitlist, in UTC, the waitlist is served in this order
+    waitlist_time: str
@@ -0,0 +1,92 @@
+import os
+import threading
+
+from .base import (
+    EVENT_COLUMNS,
+    EVENT_FULL,
+    EVENT_NOT_FULL,
+    ORGANIZATION_COLUMNS,
+    REGISTRATION_COLUMNS,
+    REGISTRATION_EXISTS,
+    REGISTRATION_EXPORT_COLUMNS,
+    USER_COLUMNS,
+    WAITLIST_COLUMNS,
+    CacheInvalidationRepository,
+    ConstraintError,
+    EventFilters,
+    EventRepository,
+    ImportKind,
+    ImportRepository,
+    OrganizationRepository,
+    RegistrationRepository,
+    Repositories,
+    RoleRepository,
+    UserRepository,
+)
+
+# where every router reads and writes: "sqlite" (the DATABASE_PATH file) or "postgres"
+# (DATABASE_URL), see get_repositories
+DB_BACKEND = os.environ.get("DB_BACKEND", "sqlite")
+
+_repositories: Repositories | None = None
+_repositories_lock = threading.Lock()
+
+
+def get_repositories() -> Repositories:
+    """
+    Return the process wide repositories of DB_BACKEND, creating them on first use.
+    PostgreSQL is only imported when it is used.
+
+    :raises ValueError: if DB_BACKEND isn't sqlite or postgres
+    """
+    global _repositories
+    with _repositories_lock:
+        if _repositories is None:
+            if DB_BACKEND == "sqlite":
+                from .sqlite import SqliteRepositories
+
+                _repositories = SqliteRepositories()
+            elif DB_BACKEND == "postgres":
+                from .postgres import PostgresRepositories
+
+                _repositories = PostgresRepositories()
+            else:
+                raise ValueError(
+                    f"Unknown DB_BACKEND {DB_BACKEND!r}, expected sqlite or postgres"
+                )
+        return _repositories
+
+
+# Route dependencies, one per repository so tests can override any of them.
+
+
+def get_event_repository() -> EventRepository:
+    return get_repositories().events
+
+
+def get_user_repository() -> UserRepository:
+    return get_repositories().users
+
+
+def get_organization_repository() -> OrganizationRepository:
+    return get_repositories().organizations
+
+
+def get_role_repository() -> RoleRepository:
+    return get_repositories().roles
+
+
+def get_registration_repository() -> RegistrationRepository:
+    return get_repositories().registrations
+
+
+def get_import_repository() -> ImportRepository:
+    return get_repositories().imports
+
+
+async def close_repositories() -> None:
+    global _repositories
+    with _repositories_lock:
+        repositories, _repositories = _repositories, None
+    if repositories is not None:
+        await repositories.close()
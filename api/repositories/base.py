@@ -0,0 +1,496 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Literal, Mapping, Sequence
+
+from pydantic import BaseModel
+
+from models import (
+    EventIn,
+    EventRegistrationBulkResult,
+    EventRegistrationConflict,
+    EventRegistrationIn,
+    EventUpdate,
+    EventWaitlistIn,
+    OrganizationCreate,
+    RoleCreate,
+)
+from models.auth import SignupRequest
+from models.event import EventScope, TimeOfDay
+from models.user import Availability, UserIn
+from utils.conditional import Validators
+
+ImportKind = Literal["users", "organizations", "events"]
+
+# the columns of each resource as the API returns it, every backend selects them by
+# name so the routes can hand the rows to rows_response and the exports
+EVENT_COLUMNS = (
+    "id",
+    "name",
+    "description",
+    "location",
+    "time",
+    "organization_id",
+    "capacity",
+    "registered_count",
+)
+USER_COLUMNS = ("user_id", "email", "first_name", "last_name", "availability")
+ORGANIZATION_COLUMNS = ("organization_id", "name", "description", "created_by_user_id")
+REGISTRATION_COLUMNS = ("user_id", "event_id", "organization_id", "registration_time")
+# registrations exported with the attendee
+REGISTRATION_EXPORT_COLUMNS = (
+    *REGISTRATION_COLUMNS,
+    "email",
+    "first_name",
+    "last_name",
+)
+WAITLIST_COLUMNS = ("user_id", "event_id", "organization_id", "waitlist_time")
+
+# raised by the capacity and waitlist triggers of every backend, see migration 5 in
+# utils/db_schema.py
+EVENT_FULL = "Event is full"
+REGISTRATION_EXISTS = "Registration already exists"
+EVENT_NOT_FULL = "Event is not full"
+
+
+class ConstraintError(Exception):
+    """
+    Raised when the database refuses a write: a duplicate key, a foreign key to a row
+    that doesn't exist, or one of the capacity and waitlist triggers. The message is
+    the trigger's own for the triggers, they raise the same messages on every backend.
+    """
+
+
+class EventFilters:
+    """The filters shared by listing and searching events, None means unfiltered."""
+
+    def __init__(
+        self,
+        organization_id: int | None = None,
+        scope: EventScope = "all",
+        user_id: int | None = None,
+        start: str | None = None,
+        end: str | None = None,
+        time_of_day: Sequence[TimeOfDay] | None = None,
+        weekend_only: bool = False,
+    ):
+        self.organization_id = organization_id
+        self.scope = scope
+        self.user_id = user_id
+        self.start = start
+        self.end = end
+        self.time_of_day = time_of_day
+        self.weekend_only = weekend_only
+
+
+def merge_event_update(row: Mapping, payload: EventUpdate) -> dict:
+    """
+    The columns of an event after applying a partial update, fields that weren't sent
+    keep their current value.
+    """
+    merged = {
+        column: getattr(payload, column)
+        if getattr(payload, column) is not None
+        else row[column]
+        for column in ("name", "description", "location", "time", "organization_id")
+    }
+    # null is a valid capacity (unlimited), so only leave it alone if it wasn't sent
+    merged["capacity"] = (
+        payload.capacity if "capacity" in payload.model_fields_set else row["capacity"]
+    )
+    return merged
+
+
+def plan_registrations(
+    payload: Sequence[EventRegistrationIn],
+    existing: set[tuple[int, int, int]],
+    spots: dict[int, int],
+) -> tuple[list[EventRegistrationIn], list[EventRegistrationConflict]]:
+    """
+    Split a bulk registration into the registrations to insert and the conflicts,
+    given the (user_id, organization_id, event_id) keys already registered and the
+    spots left on the events that have a capacity. Both are updated as registrations
+    are accepted, the caller must hold the locks that keep them current.
+    """
+    accepted = []
+    conflicts = []
+    for index, registration in enumerate(payload):
+        key = (
+            registration.user_id,
+            registration.organization_id,
+            registration.event_id,
+        )
+        if key in existing:
+            conflicts.append(
+                EventRegistrationConflict(index=index, detail=REGISTRATION_EXISTS)
+            )
+            continue
+        if registration.event_id in spots:
+            if spots[registration.event_id] <= 0:
+                conflicts.append(
+                    EventRegistrationConflict(index=index, detail=EVENT_FULL)
+                )
+                continue
+            spots[registration.event_id] -= 1
+        # later duplicates within the request conflict with the first one
+        existing.add(key)
+        accepted.append(registration)
+    return accepted, conflicts
+
+
+class EventRepository(ABC):
+    """
+    Data access for events, the events router only talks to the database through
+    this. Rows are returned as mappings of EVENT_COLUMNS (plus `rank` and `snippet`
+    for searches), so the routes can hand them to rows_response whatever the driver.
+
+    Pages are keyed: `after` is the sort key of the last row of the previous page,
+    (time, id) for listings and (rank, id) for searches, lower ranks are better.
+    """
+
+    @abstractmethod
+    async def list_events(
+        self, filters: EventFilters, after: Sequence | None, limit: int
+    ) -> list[Mapping]: ...
+
+    @abstractmethod
+    async def search_events(
+        self,
+        query: str | None,
+        location: str | None,
+        filters: EventFilters,
+        after: Sequence | None,
+        limit: int,
+    ) -> list[Mapping]:
+        """
+        Events matching every word of `query` (in any column) and of `location` (in
+        the location), words match as prefixes. Each row has a `snippet` of the match
+        with the matched words wrapped in <mark></mark>.
+        """
+
+    @abstractmethod
+    def export_events(self, filters: EventFilters) -> AsyncIterator[list[Mapping]]:
+        """
+        Every event matching the filters ordered by (time, id), in batches of rows.
+        The connection is only checked out once the iteration starts.
+        """
+
+    @abstractmethod
+    async def get_event(self, event_id: int) -> Mapping | None: ...
+
+    @abstractmethod
+    async def get_validators(self, event_id: int) -> Validators | None:
+        """The ETag and Last-Modified of an event, without reading the event."""
+
+    @abstractmethod
+    async def insert_event(self, payload: EventIn) -> int:
+        """Create an event, returns its id."""
+
+    @abstractmethod
+    async def update_event(self, event_id: int, payload: EventUpdate) -> Mapping | None:
+        """Apply a partial update, returns the updated event or None if it doesn't exist."""
+
+    @abstractmethod
+    async def delete_event(self, event_id: int) -> bool:
+        """Delete an event, returns False if it doesn't exist."""
+
+
+class UserRepository(ABC):
+    """
+    Data access for users and their credentials, for the users and auth routers and
+    the authentication dependency. Rows are mappings of USER_COLUMNS.
+
+    The lookups authentication depends on (get_auth_user, get_login) always see the
+    latest writes, the others may lag behind them where reads are served from a copy.
+    """
+
+    @abstractmethod
+    async def list_users(
+        self,
+        query: str | None,
+        availability: Availability | None,
+        after: Sequence | None,
+        skip: int,
+        limit: int,
+    ) -> list[Mapping]:
+        """
+        Users ordered by user_id, or with a `query` the users matching every word of it
+        (as prefixes) ordered by (rank, user_id), each row then has its `rank`, lower is
+        better. `after` is the sort key of the last row of the previous page.
+        """
+
+    @abstractmethod
+    def export_users(
+        self, availability: Availability | None
+    ) -> AsyncIterator[list[Mapping]]:
+        """Every user ordered by user_id, in batches of rows."""
+
+    @abstractmethod
+    async def get_user(self, user_id: int) -> Mapping | None: ...
+
+    @abstractmethod
+    async def get_validators(self, user_id: int) -> Validators | None: ...
+
+    @abstractmethod
+    async def insert_user(self, payload: UserIn) -> int:
+        """
+        Create a user without credentials, returns its id.
+
+        :raises ConstraintError: if the email is taken
+        """
+
+    @abstractmethod
+    async def get_auth_user(self, user_id: int) -> Mapping | None:
+        """The user_id, email, first_name and last_name of a user, for authentication."""
+
+    @abstractmethod
+    async def get_login(self, email: str) -> Mapping | None:
+        """
+        The user_id and hashed_password of the user with an email, hashed_password is
+        None for users without credentials.
+        """
+
+    @abstractmethod
+    async def insert_user_with_password(
+        self, payload: SignupRequest, hashed_password: str
+    ) -> int:
+        """
+        Create a user and their credentials, returns its id.
+
+        :raises ConstraintError: if the email is taken
+        """
+
+    @abstractmethod
+    async def update_password(self, user_id: int, hashed_password: str) -> bool:
+        """Replace a user's password hash, returns False if they have no credentials."""
+
+    @abstractmethod
+    async def delete_user(self, user_id: int) -> None:
+        """Delete a user together with their credentials."""
+
+
+class OrganizationRepository(ABC):
+    """
+    Data access for organizations, rows are mappings of ORGANIZATION_COLUMNS.
+    """
+
+    @abstractmethod
+    async def list_organizations(
+        self, query: str | None, after: Sequence | None, skip: int, limit: int
+    ) -> list[Mapping]:
+        """
+        Organizations ordered by organization_id, or with a `query` the ones matching
+        every word of it (as prefixes) ordered by (rank, organization_id), each row then
+        has its `rank`, lower is better.
+        """
+
+    @abstractmethod
+    async def get_list_validators(self) -> Validators:
+        """The validators of the organization list, any write to the table bumps them."""
+
+    @abstractmethod
+    async def get_organization(self, organization_id: int) -> Mapping | None: ...
+
+    @abstractmethod
+    async def get_validators(self, organization_id: int) -> Validators | None: ...
+
+    @abstractmethod
+    async def insert_organization(self, payload: OrganizationCreate) -> int | None:
+        """
+        Create an organization with its creator as admin, returns its id or None if
+        the creator doesn't exist.
+        """
+
+    @abstractmethod
+    async def update_organization(
+        self, organization_id: int, name: str | None, description: str | None
+    ) -> Mapping | None:
+        """
+        Update the name and description, None keeps the current value. Returns the
+        updated organization or None if it doesn't exist.
+        """
+
+    @abstractmethod
+    async def delete_organization(self, organization_id: int) -> bool:
+        """Delete an organization and its roles, returns False if it doesn't exist."""
+
+
+class RoleRepository(ABC):
+    """
+    Data access for the roles of users in organizations. Members are mappings of
+    user_id, organization_id, permission_level and the user's name.
+    """
+
+    @abstractmethod
+    async def list_members(self, organization_id: int) -> list[Mapping]: ...
+
+    @abstractmethod
+    async def get_validators(self, organization_id: int) -> Validators | None:
+        """The validators of an organization's member list."""
+
+    @abstractmethod
+    async def get_user_roles(self, user_id: int) -> dict[int, str]:
+        """
+        The permission level of a user in each of their organizations, keyed by
+        organization_id. Used to authorize writes, so it always sees the latest writes.
+        """
+
+    @abstractmethod
+    async def add_member(
+        self, organization_id: int, payload: RoleCreate
+    ) -> Mapping | None:
+        """
+        Give a user a role, returns the member or None if the user doesn't exist.
+
+        :raises ConstraintError: if the user already has a role in the organization
+        """
+
+    @abstractmethod
+    async def update_member(
+        self, organization_id: int, user_id: int, permission_level: str
+    ) -> Mapping | None:
+        """Change a member's role, returns the updated member or None if not a member."""
+
+    @abstractmethod
+    async def remove_member(self, organization_id: int, user_id: int) -> Mapping | None:
+        """Delete a member's role, returns the removed member or None if not a member."""
+
+
+class RegistrationRepository(ABC):
+    """
+    Data access for event registrations and waitlists. Registrations are mappings of
+    REGISTRATION_COLUMNS and waitlist entries of WAITLIST_COLUMNS.
+
+    The capacity of events is enforced by the database, a registration for a full
+    event raises ConstraintError(EVENT_FULL) and a freed spot goes to the first user
+    on the waitlist, however the registration or the capacity was changed.
+    """
+
+    @abstractmethod
+    async def list_registrations(
+        self,
+        organization_id: int | None,
+        event_id: int | None,
+        user_id: int | None,
+        after: Sequence | None,
+        skip: int,
+        limit: int,
+    ) -> list[Mapping]:
+        """
+        Registrations newest first, `after` is the (registration_time, user_id,
+        event_id) of the last row of the previous page.
+        """
+
+    @abstractmethod
+    def export_registrations(
+        self,
+        organization_id: int | None,
+        event_id: int | None,
+        user_id: int | None,
+    ) -> AsyncIterator[list[Mapping]]:
+        """
+        Every matching registration newest first, with the attendee's email and name,
+        in batches of rows of REGISTRATION_EXPORT_COLUMNS.
+        """
+
+    @abstractmethod
+    async def get_registration(
+        self, organization_id: int, event_id: int, user_id: int
+    ) -> Mapping | None: ...
+
+    @abstractmethod
+    async def insert_registration(self, payload: EventRegistrationIn) -> None:
+        """
+        :raises ConstraintError: if the registration exists or the event is full
+        """
+
+    @abstractmethod
+    async def insert_registrations(
+        self, payload: Sequence[EventRegistrationIn]
+    ) -> EventRegistrationBulkResult:
+        """
+        Create many registrations in one transaction. Existing registrations,
+        duplicates within `payload` and registrations for full events are skipped and
+        reported as conflicts by their index.
+        """
+
+    @abstractmethod
+    async def delete_registration(
+        self, organization_id: int, event_id: int, user_id: int
+    ) -> Mapping | None:
+        """Returns the deleted registration, or None if it doesn't exist."""
+
+    @abstractmethod
+    async def list_waitlist(
+        self, event_id: int, after: Sequence | None, limit: int
+    ) -> list[Mapping]:
+        """
+        The waitlist of an event in the order spots are handed out, `after` is the
+        (waitlist_time, user_id) of the last row of the previous page.
+        """
+
+    @abstractmethod
+    async def join_waitlist(self, payload: EventWaitlistIn, waitlist_time: str) -> bool:
+        """
+        Put a user on the waitlist of an event, returns False if the event doesn't
+        exist.
+
+        :raises ConstraintError: if the user is registered or already waiting, or the
+            event isn't full
+        """
+
+    @abstractmethod
+    async def leave_waitlist(
+        self, organization_id: int, event_id: int, user_id: int
+    ) -> Mapping | None:
+        """Returns the removed entry, or None if the user wasn't on the waitlist."""
+
+
+class ImportRepository(ABC):
+    """Bulk inserts for utils/bulk_import.py."""
+
+    @abstractmethod
+    async def insert_records(
+        self, kind: ImportKind, records: Sequence[tuple[int, BaseModel]]
+    ) -> list[tuple[int, str]]:
+        """
+        Insert validated (row, record) pairs of one kind in one transaction, like the
+        create endpoint of the kind would (an organization's creator becomes its
+        admin). Records refused by a constraint are skipped, returns their (row,
+        reason), the others are inserted.
+        """
+
+
+class CacheInvalidationRepository(ABC):
+    """
+    The cache_invalidations log the users, credentials and roles triggers append to,
+    see utils/cache_sync.py. Ids are assigned in commit order without gaps.
+    """
+
+    @abstractmethod
+    async def last_id(self) -> int:
+        """The id of the last entry ever logged, even if it has been pruned since."""
+
+    @abstractmethod
+    async def list_after(self, last_id: int) -> list[Mapping]:
+        """The id, cache and key of the entries after `last_id`, in order."""
+
+    @abstractmethod
+    async def prune(self, before: int) -> int:
+        """Delete the entries logged before the unix time `before`, returns how many."""
+
+
+class Repositories:
+    """
+    The repositories of one backend, every router reads and writes through them.
+    Backends share what the repositories hold (a connection pool), `close` releases it.
+    """
+
+    events: EventRepository
+    users: UserRepository
+    organizations: OrganizationRepository
+    roles: RoleRepository
+    registrations: RegistrationRepository
+    imports: ImportRepository
+    invalidations: CacheInvalidationRepository
+
+    async def close(self) -> None:
+        """Release what the repositories hold, called when the app shuts down."""
@@ -0,0 +1,1169 @@
+import sqlite3
+from typing import AsyncIterator, Callable, Sequence
+
+from pydantic import BaseModel
+
+from db import read_connection, run_primary, run_read
+from models import (
+    EventIn,
+    EventRegistrationBulkResult,
+    EventRegistrationIn,
+    EventUpdate,
+    EventWaitlistIn,
+    OrganizationCreate,
+    RoleCreate,
+)
+from models.auth import SignupRequest
+from models.user import Availability, UserIn
+from repositories.base import (
+    CacheInvalidationRepository,
+    ConstraintError,
+    EventFilters,
+    EventRepository,
+    ImportKind,
+    ImportRepository,
+    OrganizationRepository,
+    RegistrationRepository,
+    Repositories,
+    RoleRepository,
+    UserRepository,
+    merge_event_update,
+    plan_registrations,
+)
+from utils.batch_insert import insert_in_batches
+from utils.conditional import Validators, get_validators
+from utils.export import EXPORT_BATCH_SIZE
+from utils.search import build_match_query
+from utils.writer import get_write_queue
+
+# registrations looked up per query when checking for existing ones, 3 parameters each
+# keeps a query under SQLite's default limit of 999 parameters
+_EXISTING_LOOKUP_SIZE = 300
+# events looked up per query when checking how many spots are left
+_CAPACITY_LOOKUP_SIZE = 900
+
+_SELECT_EVENT = """
+    SELECT id, name, description, location, time, organization_id, capacity,
+        registered_count
+    FROM events
+"""
+
+
+async def _write(fn: Callable, *args):
+    """Run a write through the write queue, constraint errors become ConstraintError."""
+    try:
+        return await get_write_queue().execute_async(fn, *args)
+    except sqlite3.IntegrityError as exc:
+        raise ConstraintError(str(exc)) from exc
+
+
+def _fetchmany(conn: sqlite3.Connection, cursor: sqlite3.Cursor) -> list[sqlite3.Row]:
+    return cursor.fetchmany(EXPORT_BATCH_SIZE)
+
+
+async def _stream(query: str, params: Sequence) -> AsyncIterator[list[sqlite3.Row]]:
+    # the read connection is held until the export is done or the client disconnects
+    async with read_connection() as conn:
+        cursor = await conn.execute(query, params)
+        try:
+            while rows := await conn.run(_fetchmany, cursor):
+                yield rows
+        finally:
+            cursor.close()
+
+
+class SqliteEventRepository(EventRepository):
+    """
+    Events in the sqlite database. Reads run on the read-only pool, writes go through
+    the write queue and are group committed.
+    """
+
+    async def list_events(
+        self, filters: EventFilters, after: Sequence | None, limit: int
+    ) -> list[sqlite3.Row]:
+        return await run_read(_list_events, filters, after, limit)
+
+    async def search_events(
+        self,
+        query: str | None,
+        location: str | None,
+        filters: EventFilters,
+        after: Sequence | None,
+        limit: int,
+    ) -> list[sqlite3.Row]:
+        match_terms = [
+            term
+            for term in (
+                build_match_query(query) if query else None,
+                build_match_query(location, column="location") if location else None,
+            )
+            if term is not None
+        ]
+        if not match_terms:
+            return []
+        return await run_read(
+            _search_events, " ".join(match_terms), filters, after, limit
+        )
+
+    def export_events(self, filters: EventFilters) -> AsyncIterator[list[sqlite3.Row]]:
+        conditions, params = _filter_conditions(filters)
+        query = _SELECT_EVENT
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return _stream(query + " ORDER BY time, id", params)
+
+    async def get_event(self, event_id: int) -> sqlite3.Row | None:
+        return await run_read(_get_event, event_id)
+
+    async def get_validators(self, event_id: int) -> Validators | None:
+        return await run_read(get_validators, "event", event_id)
+
+    async def insert_event(self, payload: EventIn) -> int:
+        return await _write(_insert_event, payload)
+
+    async def update_event(
+        self, event_id: int, payload: EventUpdate
+    ) -> sqlite3.Row | None:
+        return await _write(_update_event, event_id, payload)
+
+    async def delete_event(self, event_id: int) -> bool:
+        return await _write(_delete_event, event_id)
+
+
+def _filter_conditions(
+    filters: EventFilters, table: str = ""
+) -> tuple[list[str], list[int | str]]:
+    conditions: list[str] = []
+    params: list[int | str] = []
+    prefix = f"{table}." if table else ""
+
+    if filters.organization_id is not None:
+        conditions.append(f"{prefix}organization_id = ?")
+        params.append(filters.organization_id)
+    if filters.scope == "myOrgs":
+        conditions.append(
+            f"{prefix}organization_id IN (SELECT organization_id FROM roles WHERE user_id = ?)"
+        )
+        params.append(filters.user_id)
+    elif filters.scope == "admin":
+        conditions.append(
+            f"""{prefix}organization_id IN (
+                SELECT organization_id FROM roles
+                WHERE user_id = ? AND permission_level = 'admin'
+            )"""
+        )
+        params.append(filters.user_id)
+    if filters.start is not None:
+        conditions.append(f"{prefix}time >= ?")
+        params.append(filters.start)
+    if filters.end is not None:
+        conditions.append(f"{prefix}time < ?")
+        params.append(filters.end)
+    # the times of day and the weekend are alternatives, an event matches any of them
+    availability = []
+    if filters.time_of_day:
+        placeholders = ", ".join("?" for _ in filters.time_of_day)
+        availability.append(f"{prefix}time_of_day IN ({placeholders})")
+        params.extend(filters.time_of_day)
+    if filters.weekend_only:
+        availability.append(f"{prefix}is_weekend = 1")
+    if availability:
+        conditions.append(f"({' OR '.join(availability)})")
+    return conditions, params
+
+
+def _list_events(
+    conn: sqlite3.Connection,
+    filters: EventFilters,
+    after: Sequence | None,
+    limit: int,
+) -> list[sqlite3.Row]:
+    # every filter is served by an index on the events table, so a page costs the same
+    # regardless of table size
+    conditions, params = _filter_conditions(filters)
+    if after:
+        conditions.append("(time, id) > (?, ?)")
+        params.extend(after)
+
+    query = _SELECT_EVENT
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY time, id LIMIT ?"
+    params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+
+def _search_events(
+    conn: sqlite3.Connection,
+    match: str,
+    filters: EventFilters,
+    after: Sequence | None,
+    limit: int,
+) -> list[sqlite3.Row]:
+    # the full text index drives the query and the organization/time filters are
+    # applied to the matched rows, so the whole search is a single indexed query
+    query = """
+        SELECT e.id, e.name, e.description, e.location, e.time, e.organization_id,
+            e.capacity, e.registered_count, f.rank, snippet(events_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet
+        FROM events_fts f
+        JOIN events e ON e.id = f.rowid
+    """
+    filter_conditions, filter_params = _filter_conditions(filters, "e")
+    conditions = ["events_fts MATCH ?", *filter_conditions]
+    params: list[int | str | float] = [match, *filter_params]
+    if after:
+        conditions.append("(f.rank, e.id) > (?, ?)")
+        params.extend(after)
+
+    query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY f.rank, e.id LIMIT ?"
+    params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+
+def _get_event(conn: sqlite3.Connection, event_id: int) -> sqlite3.Row | None:
+    return conn.execute(_SELECT_EVENT + " WHERE id = ?", (event_id,)).fetchone()
+
+
+def _insert_event(conn: sqlite3.Connection, payload: EventIn) -> int:
+    cursor = conn.execute(
+        """
+        INSERT INTO events (name, description, location, time, organization_id, capacity)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (
+            payload.name,
+            payload.description,
+            payload.location,
+            payload.time,
+            payload.organization_id,
+            payload.capacity,
+        ),
+    )
+    return cursor.lastrowid
+
+
+def _update_event(
+    conn: sqlite3.Connection, event_id: int, payload: EventUpdate
+) -> sqlite3.Row | None:
+    row = _get_event(conn, event_id)
+    if row is None:
+        return None
+    updated = merge_event_update(row, payload)
+    conn.execute(
+        """
+        UPDATE events
+        SET name = ?, description = ?, location = ?, time = ?, organization_id = ?,
+            capacity = ?
+        WHERE id = ?
+        """,
+        (
+            updated["name"],
+            updated["description"],
+            updated["location"],
+            updated["time"],
+            updated["organization_id"],
+            updated["capacity"],
+            event_id,
+        ),
+    )
+    # raising the capacity registers users from the waitlist, read the event after it
+    return _get_event(conn, event_id)
+
+
+def _delete_event(conn: sqlite3.Connection, event_id: int) -> bool:
+    return conn.execute("DELETE FROM events WHERE id = ?", (event_id,)).rowcount > 0
+
+
+class SqliteUserRepository(UserRepository):
+    """
+    Users in the sqlite database. Reads run on the read-only pool, except for the
+    authentication lookups, and writes go through the write queue.
+    """
+
+    async def list_users(
+        self,
+        query: str | None,
+        availability: Availability | None,
+        after: Sequence | None,
+        skip: int,
+        limit: int,
+    ) -> list[sqlite3.Row]:
+        match = build_match_query(query) if query else None
+        if query and match is None:
+            return []
+        return await run_read(_list_users, match, availability, after, skip, limit)
+
+    def export_users(
+        self, availability: Availability | None
+    ) -> AsyncIterator[list[sqlite3.Row]]:
+        query = "SELECT user_id, email, first_name, last_name, availability FROM users"
+        params: list[str] = []
+        if availability:
+            query += " WHERE availability = ?"
+            params.append(availability)
+        return _stream(query + " ORDER BY user_id", params)
+
+    async def get_user(self, user_id: int) -> sqlite3.Row | None:
+        return await run_read(_get_user, user_id)
+
+    async def get_validators(self, user_id: int) -> Validators | None:
+        return await run_read(get_validators, "user", user_id)
+
+    async def insert_user(self, payload: UserIn) -> int:
+        return await _write(_insert_user, payload)
+
+    async def get_auth_user(self, user_id: int) -> sqlite3.Row | None:
+        return await run_primary(_get_auth_user, user_id)
+
+    async def get_login(self, email: str) -> sqlite3.Row | None:
+        return await run_primary(_get_login, email)
+
+    async def insert_user_with_password(
+        self, payload: SignupRequest, hashed_password: str
+    ) -> int:
+        return await _write(_insert_user_with_password, payload, hashed_password)
+
+    async def update_password(self, user_id: int, hashed_password: str) -> bool:
+        return await _write(_update_password, user_id, hashed_password)
+
+    async def delete_user(self, user_id: int) -> None:
+        await _write(_delete_user, user_id)
+
+
+def _list_users(
+    conn: sqlite3.Connection,
+    match: str | None,
+    availability: Availability | None,
+    after: Sequence | None,
+    skip: int,
+    limit: int,
+) -> list[sqlite3.Row]:
+    params: list[object] = []
+    conditions: list[str] = []
+
+    if match:
+        # search results are ranked with bm25 (lower is better) and keyed on
+        # (rank, user_id) rather than just user_id
+        query = """
+            SELECT u.user_id, u.email, u.first_name, u.last_name, u.availability, f.rank
+            FROM users_fts f
+            JOIN users u ON u.user_id = f.rowid
+        """
+        conditions.append("users_fts MATCH ?")
+        params.append(match)
+        order_by = "f.rank, u.user_id"
+    else:
+        query = """
+            SELECT u.user_id, u.email, u.first_name, u.last_name, u.availability
+            FROM users u
+        """
+        order_by = "u.user_id"
+
+    if availability:
+        conditions.append("u.availability = ?")
+        params.append(availability)
+
+    if after and match:
+        conditions.append("(f.rank, u.user_id) > (?, ?)")
+        params.extend(after)
+    elif after:
+        conditions.append("u.user_id > ?")
+        params.extend(after)
+
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {order_by} LIMIT ? OFFSET ?"
+    params.extend([limit, skip])
+    return conn.execute(query, params).fetchall()
+
+
+def _get_user(conn: sqlite3.Connection, user_id: int) -> sqlite3.Row | None:
+    return conn.execute(
+        "SELECT user_id, email, first_name, last_name, availability FROM users WHERE user_id = ?",
+        (user_id,),
+    ).fetchone()
+
+
+def _insert_user(conn: sqlite3.Connection, payload: UserIn) -> int:
+    return conn.execute(
+        "INSERT INTO users (email, first_name, last_name, availability) VALUES (?, ?, ?, ?)",
+        (payload.email, payload.first_name, payload.last_name, payload.availability),
+    ).lastrowid
+
+
+def _get_auth_user(conn: sqlite3.Connection, user_id: int) -> sqlite3.Row | None:
+    return conn.execute(
+        "SELECT user_id, email, first_name, last_name FROM users WHERE user_id = ?",
+        (user_id,),
+    ).fetchone()
+
+
+def _get_login(conn: sqlite3.Connection, email: str) -> sqlite3.Row | None:
+    return conn.execute(
+        """
+        SELECT u.user_id, c.hashed_password
+        FROM users u
+        LEFT JOIN credentials c ON c.user_id = u.user_id
+        WHERE u.email = ?
+        """,
+        (email,),
+    ).fetchone()
+
+
+def _insert_user_with_password(
+    conn: sqlite3.Connection, payload: SignupRequest, hashed_password: str
+) -> int:
+    user_id = conn.execute(
+        "INSERT INTO users (email, first_name, last_name) VALUES (?, ?, ?)",
+        (payload.email, payload.first_name, payload.last_name),
+    ).lastrowid
+    conn.execute(
+        "INSERT INTO credentials (user_id, hashed_password) VALUES (?, ?)",
+        (user_id, hashed_password),
+    )
+    return user_id
+
+
+def _update_password(
+    conn: sqlite3.Connection, user_id: int, hashed_password: str
+) -> bool:
+    return (
+        conn.execute(
+            "UPDATE credentials SET hashed_password = ? WHERE user_id = ?",
+            (hashed_password, user_id),
+        ).rowcount
+        > 0
+    )
+
+
+def _delete_user(conn: sqlite3.Connection, user_id: int) -> None:
+    conn.execute("DELETE FROM credentials WHERE user_id = ?", (user_id,))
+    conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
+
+
+_SELECT_ORGANIZATION = """
+    SELECT organization_id, name, description, created_by_user_id
+    FROM organizations
+"""
+
+
+class SqliteOrganizationRepository(OrganizationRepository):
+    """
+    Organizations in the sqlite database. Reads run on the read-only pool, writes go
+    through the write queue.
+    """
+
+    async def list_organizations(
+        self, query: str | None, after: Sequence | None, skip: int, limit: int
+    ) -> list[sqlite3.Row]:
+        match = build_match_query(query) if query else None
+        if query and match is None:
+            return []
+        return await run_read(_list_organizations, match, after, skip, limit)
+
+    async def get_list_validators(self) -> Validators:
+        return await run_read(get_validators, "organizations")
+
+    async def get_organization(self, organization_id: int) -> sqlite3.Row | None:
+        return await run_read(_get_organization, organization_id)
+
+    async def get_validators(self, organization_id: int) -> Validators | None:
+        return await run_read(get_validators, "organization", organization_id)
+
+    async def insert_organization(self, payload: OrganizationCreate) -> int | None:
+        return await _write(_insert_organization, payload)
+
+    async def update_organization(
+        self, organization_id: int, name: str | None, description: str | None
+    ) -> sqlite3.Row | None:
+        return await _write(_update_organization, organization_id, name, description)
+
+    async def delete_organization(self, organization_id: int) -> bool:
+        return await _write(_delete_organization, organization_id)
+
+
+def _list_organizations(
+    conn: sqlite3.Connection,
+    match: str | None,
+    after: Sequence | None,
+    skip: int,
+    limit: int,
+) -> list[sqlite3.Row]:
+    params: list[object] = []
+    conditions: list[str] = []
+    if match:
+        # search results are ranked with bm25 (lower is better) and keyed on
+        # (rank, organization_id) rather than just organization_id
+        query = """
+            SELECT o.organization_id, o.name, o.description, o.created_by_user_id, f.rank
+            FROM organizations_fts f
+            JOIN organizations o ON o.organization_id = f.rowid
+        """
+        conditions.append("organizations_fts MATCH ?")
+        params.append(match)
+        order_by = "f.rank, o.organization_id"
+    else:
+        query = """
+            SELECT o.organization_id, o.name, o.description, o.created_by_user_id
+            FROM organizations o
+        """
+        order_by = "o.organization_id"
+
+    if after and match:
+        conditions.append("(f.rank, o.organization_id) > (?, ?)")
+        params.extend(after)
+    elif after:
+        conditions.append("o.organization_id > ?")
+        params.extend(after)
+
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY {order_by} LIMIT ? OFFSET ?"
+    params.extend([limit, skip])
+    return conn.execute(query, params).fetchall()
+
+
+def _get_organization(
+    conn: sqlite3.Connection, organization_id: int
+) -> sqlite3.Row | None:
+    return conn.execute(
+        _SELECT_ORGANIZATION + " WHERE organization_id = ?", (organization_id,)
+    ).fetchone()
+
+
+def _insert_organization(
+    conn: sqlite3.Connection, payload: OrganizationCreate
+) -> int | None:
+    user_row = conn.execute(
+        "SELECT user_id FROM users WHERE user_id = ?", (payload.user_id,)
+    ).fetchone()
+    if user_row is None:
+        return None
+    organization_id = conn.execute(
+        """
+        INSERT INTO organizations (name, description, created_by_user_id)
+        VALUES (?, ?, ?)
+        """,
+        (payload.name, payload.description, payload.user_id),
+    ).lastrowid
+    conn.execute(
+        """
+        INSERT INTO roles (user_id, organization_id, permission_level)
+        VALUES (?, ?, 'admin')
+        """,
+        (payload.user_id, organization_id),
+    )
+    return organization_id
+
+
+def _update_organization(
+    conn: sqlite3.Connection,
+    organization_id: int,
+    name: str | None,
+    description: str | None,
+) -> sqlite3.Row | None:
+    conn.execute(
+        """
+        UPDATE organizations
+        SET name = coalesce(?, name), description = coalesce(?, description)
+        WHERE organization_id = ?
+        """,
+        (name, description, organization_id),
+    )
+    return _get_organization(conn, organization_id)
+
+
+def _delete_organization(conn: sqlite3.Connection, organization_id: int) -> bool:
+    return (
+        conn.execute(
+            "DELETE FROM organizations WHERE organization_id = ?", (organization_id,)
+        ).rowcount
+        > 0
+    )
+
+
+_SELECT_MEMBER = """
+    SELECT r.user_id, r.organization_id, r.permission_level,
+        u.first_name || ' ' || u.last_name AS name
+    FROM roles r
+    JOIN users u ON r.user_id = u.user_id
+"""
+
+
+class SqliteRoleRepository(RoleRepository):
+    """
+    Roles in the sqlite database. Member lists are read from the read-only pool, the
+    roles of a user from the read-write pool (a DB_READ_PATH snapshot could still list
+    a role that was revoked since), writes go through the write queue.
+    """
+
+    async def list_members(self, organization_id: int) -> list[sqlite3.Row]:
+        return await run_read(_list_members, organization_id)
+
+    async def get_validators(self, organization_id: int) -> Validators | None:
+        return await run_read(get_validators, "organization_members", organization_id)
+
+    async def get_user_roles(self, user_id: int) -> dict[int, str]:
+        return await run_primary(_get_user_roles, user_id)
+
+    async def add_member(
+        self, organization_id: int, payload: RoleCreate
+    ) -> sqlite3.Row | None:
+        return await _write(_add_member, organization_id, payload)
+
+    async def update_member(
+        self, organization_id: int, user_id: int, permission_level: str
+    ) -> sqlite3.Row | None:
+        return await _write(_update_member, organization_id, user_id, permission_level)
+
+    async def remove_member(
+        self, organization_id: int, user_id: int
+    ) -> sqlite3.Row | None:
+        return await _write(_remove_member, organization_id, user_id)
+
+
+def _list_members(conn: sqlite3.Connection, organization_id: int) -> list[sqlite3.Row]:
+    return conn.execute(
+        _SELECT_MEMBER + " WHERE r.organization_id = ?", (organization_id,)
+    ).fetchall()
+
+
+def _get_member(
+    conn: sqlite3.Connection, organization_id: int, user_id: int
+) -> sqlite3.Row | None:
+    return conn.execute(
+        _SELECT_MEMBER + " WHERE r.organization_id = ? AND r.user_id = ?",
+        (organization_id, user_id),
+    ).fetchone()
+
+
+def _get_user_roles(conn: sqlite3.Connection, user_id: int) -> dict[int, str]:
+    return {
+        row["organization_id"]: row["permission_level"]
+        for row in conn.execute(
+            "SELECT organization_id, permission_level FROM roles WHERE user_id = ?",
+            (user_id,),
+        )
+    }
+
+
+def _add_member(
+    conn: sqlite3.Connection, organization_id: int, payload: RoleCreate
+) -> sqlite3.Row | None:
+    user_row = conn.execute(
+        "SELECT user_id FROM users WHERE user_id = ?", (payload.user_id,)
+    ).fetchone()
+    if user_row is None:
+        return None
+    conn.execute(
+        """
+        INSERT INTO roles (user_id, organization_id, permission_level)
+        VALUES (?, ?, ?)
+        """,
+        (payload.user_id, organization_id, payload.permission_level),
+    )
+    return _get_member(conn, organization_id, payload.user_id)
+
+
+def _update_member(
+    conn: sqlite3.Connection, organization_id: int, user_id: int, permission_level: str
+) -> sqlite3.Row | None:
+    conn.execute(
+        """
+        UPDATE roles
+        SET permission_level = ?
+        WHERE organization_id = ? AND user_id = ?
+        """,
+        (permission_level, organization_id, user_id),
+    )
+    return _get_member(conn, organization_id, user_id)
+
+
+def _remove_member(
+    conn: sqlite3.Connection, organization_id: int, user_id: int
+) -> sqlite3.Row | None:
+    row = _get_member(conn, organization_id, user_id)
+    if row is not None:
+        conn.execute(
+            "DELETE FROM roles WHERE organization_id = ? AND user_id = ?",
+            (organization_id, user_id),
+        )
+    return row
+
+
+_SELECT_REGISTRATION = """
+    SELECT user_id, event_id, organization_id, registration_time
+    FROM event_registrations
+"""
+_SELECT_WAITLIST_ENTRY = """
+    SELECT user_id, event_id, organization_id, waitlist_time
+    FROM event_waitlist
+"""
+
+
+def _registration_conditions(
+    organization_id: int | None,
+    event_id: int | None,
+    user_id: int | None,
+    table: str = "",
+) -> tuple[list[str], list[int]]:
+    prefix = f"{table}." if table else ""
+    conditions = []
+    params = []
+    for column, value in (
+        ("organization_id", organization_id),
+        ("event_id", event_id),
+        ("user_id", user_id),
+    ):
+        if value is not None:
+            conditions.append(f"{prefix}{column} = ?")
+            params.append(value)
+    return conditions, params
+
+
+class SqliteRegistrationRepository(RegistrationRepository):
+    """
+    Registrations and waitlists in the sqlite database. Reads run on the read-only
+    pool, writes go through the write queue: during a registration rush the
+    registrations are group committed instead of each waiting for the write lock, and
+    the capacity trigger still checks every one of them, in commit order.
+    """
+
+    async def list_registrations(
+        self,
+        organization_id: int | None,
+        event_id: int | None,
+        user_id: int | None,
+        after: Sequence | None,
+        skip: int,
+        limit: int,
+    ) -> list[sqlite3.Row]:
+        return await run_read(
+            _list_registrations,
+            organization_id,
+            event_id,
+            user_id,
+            after,
+            skip,
+            limit,
+        )
+
+    def export_registrations(
+        self,
+        organization_id: int | None,
+        event_id: int | None,
+        user_id: int | None,
+    ) -> AsyncIterator[list[sqlite3.Row]]:
+        query = """
+            SELECT r.user_id, r.event_id, r.organization_id, r.registration_time,
+                u.email, u.first_name, u.last_name
+            FROM event_registrations r
+            JOIN users u ON u.user_id = r.user_id
+        """
+        conditions, params = _registration_conditions(
+            organization_id, event_id, user_id, "r"
+        )
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY r.registration_time DESC, r.user_id DESC, r.event_id DESC"
+        return _stream(query, params)
+
+    async def get_registration(
+        self, organization_id: int, event_id: int, user_id: int
+    ) -> sqlite3.Row | None:
+        return await run_read(_get_registration, organization_id, event_id, user_id)
+
+    async def insert_registration(self, payload: EventRegistrationIn) -> None:
+        await _write(_insert_registration, payload)
+
+    async def insert_registrations(
+        self, payload: Sequence[EventRegistrationIn]
+    ) -> EventRegistrationBulkResult:
+        return await _write(_insert_registrations, payload)
+
+    async def delete_registration(
+        self, organization_id: int, event_id: int, user_id: int
+    ) -> sqlite3.Row | None:
+        return await _write(_delete_registration, organization_id, event_id, user_id)
+
+    async def list_waitlist(
+        self, event_id: int, after: Sequence | None, limit: int
+    ) -> list[sqlite3.Row]:
+        return await run_read(_list_waitlist, event_id, after, limit)
+
+    async def join_waitlist(self, payload: EventWaitlistIn, waitlist_time: str) -> bool:
+        return await _write(_join_waitlist, payload, waitlist_time)
+
+    async def leave_waitlist(
+        self, organization_id: int, event_id: int, user_id: int
+    ) -> sqlite3.Row | None:
+        return await _write(_leave_waitlist, organization_id, event_id, user_id)
+
+
+def _list_registrations(
+    conn: sqlite3.Connection,
+    organization_id: int | None,
+    event_id: int | None,
+    user_id: int | None,
+    after: Sequence | None,
+    skip: int,
+    limit: int,
+) -> list[sqlite3.Row]:
+    conditions, params = _registration_conditions(organization_id, event_id, user_id)
+    if after:
+        conditions.append("(registration_time, user_id, event_id) < (?, ?, ?)")
+        params.extend(after)
+
+    query = _SELECT_REGISTRATION
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY registration_time DESC, user_id DESC, event_id DESC"
+    query += " LIMIT ? OFFSET ?"
+    params.extend([limit, skip])
+    return conn.execute(query, params).fetchall()
+
+
+def _get_registration(
+    conn: sqlite3.Connection, organization_id: int, event_id: int, user_id: int
+) -> sqlite3.Row | None:
+    return conn.execute(
+        _SELECT_REGISTRATION
+        + " WHERE organization_id = ? AND event_id = ? AND user_id = ?",
+        (organization_id, event_id, user_id),
+    ).fetchone()
+
+
+_INSERT_REGISTRATION = """
+    INSERT INTO event_registrations (user_id, event_id, organization_id, registration_time)
+    VALUES (?, ?, ?, ?)
+"""
+
+
+def _insert_registration(
+    conn: sqlite3.Connection, payload: EventRegistrationIn
+) -> None:
+    conn.execute(
+        _INSERT_REGISTRATION,
+        (
+            payload.user_id,
+            payload.event_id,
+            payload.organization_id,
+            payload.registration_time,
+        ),
+    )
+
+
+def _existing_registrations(
+    conn: sqlite3.Connection, keys: list[tuple[int, int, int]]
+) -> set[tuple[int, int, int]]:
+    """
+    The (user_id, organization_id, event_id) keys out of `keys` that are already
+    registered, looked up through the primary key a few hundred at a time.
+    """
+    existing = set()
+    for start in range(0, len(keys), _EXISTING_LOOKUP_SIZE):
+        chunk = keys[start : start + _EXISTING_LOOKUP_SIZE]
+        # an OR of primary keys rather than a row value IN (VALUES ...), which older
+        # SQLite versions answer with a full scan
+        rows = conn.execute(
+            f"""
+            SELECT user_id, organization_id, event_id
+            FROM event_registrations
+            WHERE {" OR ".join("(user_id = ? AND organization_id = ? AND event_id = ?)" for _ in chunk)}
+            """,
+            [value for key in chunk for value in key],
+        ).fetchall()
+        existing.update(tuple(row) for row in rows)
+    return existing
+
+
+def _remaining_spots(conn: sqlite3.Connection, event_ids: list[int]) -> dict[int, int]:
+    """
+    Spots left on each of the events that have a capacity, events without one (or
+    that don't exist) are left out.
+    """
+    spots = {}
+    for start in range(0, len(event_ids), _CAPACITY_LOOKUP_SIZE):
+        chunk = event_ids[start : start + _CAPACITY_LOOKUP_SIZE]
+        rows = conn.execute(
+            f"""
+            SELECT id, capacity - registered_count AS spots
+            FROM events
+            WHERE id IN ({", ".join("?" for _ in chunk)}) AND capacity IS NOT NULL
+            """,
+            chunk,
+        ).fetchall()
+        spots.update((row["id"], row["spots"]) for row in rows)
+    return spots
+
+
+def _insert_registrations(
+    conn: sqlite3.Connection, payload: Sequence[EventRegistrationIn]
+) -> EventRegistrationBulkResult:
+    # the write queue holds the write lock, nothing can register between the checks
+    # and the insert
+    keys = [
+        (registration.user_id, registration.organization_id, registration.event_id)
+        for registration in payload
+    ]
+    accepted, conflicts = plan_registrations(
+        payload,
+        _existing_registrations(conn, keys),
+        _remaining_spots(conn, list({key[2] for key in keys})),
+    )
+    conn.executemany(
+        _INSERT_REGISTRATION,
+        [
+            (
+                registration.user_id,
+                registration.event_id,
+                registration.organization_id,
+                registration.registration_time,
+            )
+            for registration in accepted
+        ],
+    )
+    return EventRegistrationBulkResult(created=len(accepted), conflicts=conflicts)
+
+
+def _delete_registration(
+    conn: sqlite3.Connection, organization_id: int, event_id: int, user_id: int
+) -> sqlite3.Row | None:
+    row = _get_registration(conn, organization_id, event_id, user_id)
+    if row is not None:
+        conn.execute(
+            """
+            DELETE FROM event_registrations
+            WHERE organization_id = ? AND event_id = ? AND user_id = ?
+            """,
+            (organization_id, event_id, user_id),
+        )
+    return row
+
+
+def _list_waitlist(
+    conn: sqlite3.Connection, event_id: int, after: Sequence | None, limit: int
+) -> list[sqlite3.Row]:
+    query = _SELECT_WAITLIST_ENTRY + " WHERE event_id = ?"
+    params: list[int | str] = [event_id]
+    if after:
+        query += " AND (waitlist_time, user_id) > (?, ?)"
+        params.extend(after)
+    query += " ORDER BY waitlist_time, user_id LIMIT ?"
+    params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+
+def _join_waitlist(
+    conn: sqlite3.Connection, payload: EventWaitlistIn, waitlist_time: str
+) -> bool:
+    event = conn.execute(
+        "SELECT id FROM events WHERE id = ?", (payload.event_id,)
+    ).fetchone()
+    if event is None:
+        return False
+    # the trigger rejects registered users and events with open spots
+    conn.execute(
+        """
+        INSERT INTO event_waitlist (user_id, event_id, organization_id, waitlist_time)
+        VALUES (?, ?, ?, ?)
+        """,
+        (payload.user_id, payload.event_id, payload.organization_id, waitlist_time),
+    )
+    return True
+
+
+def _leave_waitlist(
+    conn: sqlite3.Connection, organization_id: int, event_id: int, user_id: int
+) -> sqlite3.Row | None:
+    row = conn.execute(
+        _SELECT_WAITLIST_ENTRY
+        + " WHERE organization_id = ? AND event_id = ? AND user_id = ?",
+        (organization_id, event_id, user_id),
+    ).fetchone()
+    if row is not None:
+        conn.execute(
+            """
+            DELETE FROM event_waitlist
+            WHERE organization_id = ? AND event_id = ? AND user_id = ?
+            """,
+            (organization_id, event_id, user_id),
+        )
+    return row
+
+
+class _ImportTarget:
+    """
+    How validated records of one kind are inserted: the table, the insert statement
+    and its parameters for a record.
+
+    `after_insert` runs in the same transaction after the records are inserted, with
+    the largest rowid the table had before them, for side effects the single create
+    endpoint has as well.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        insert_query: str,
+        to_params: Callable[[BaseModel], tuple],
+        after_insert: Callable[[sqlite3.Connection, int], None] | None = None,
+    ):
+        self.table = table
+        self.insert_query = insert_query
+        self.to_params = to_params
+        self.after_insert = after_insert
+
+
+def _grant_creators_admin(conn: sqlite3.Connection, last_id: int) -> None:
+    # like create_organization, the creator of each new organization is its admin
+    conn.execute(
+        """
+        INSERT INTO roles (user_id, organization_id, permission_level)
+        SELECT created_by_user_id, organization_id, 'admin'
+        FROM organizations
+        WHERE organization_id > ?
+        """,
+        (last_id,),
+    )
+
+
+_IMPORT_TARGETS: dict[str, _ImportTarget] = {
+    "users": _ImportTarget(
+        "users",
+        """
+        INSERT INTO users (email, first_name, last_name, availability)
+        VALUES (?, ?, ?, ?)
+        """,
+        lambda user: (user.email, user.first_name, user.last_name, user.availability),
+    ),
+    "organizations": _ImportTarget(
+        "organizations",
+        """
+        INSERT INTO organizations (name, description, created_by_user_id)
+        VALUES (?, ?, ?)
+        """,
+        lambda organization: (
+            organization.name,
+            organization.description,
+            organization.user_id,
+        ),
+        after_insert=_grant_creators_admin,
+    ),
+    "events": _ImportTarget(
+        "events",
+        """
+        INSERT INTO events (name, description, location, time, organization_id, capacity)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        lambda event: (
+            event.name,
+            event.description,
+            event.location,
+            event.time,
+            event.organization_id,
+            event.capacity,
+        ),
+    ),
+}
+
+
+class SqliteImportRepository(ImportRepository):
+    """Imports into the sqlite database, each chunk is one write of the write queue."""
+
+    async def insert_records(
+        self, kind: ImportKind, records: Sequence[tuple[int, BaseModel]]
+    ) -> list[tuple[int, str]]:
+        return await _write(_insert_records, _IMPORT_TARGETS[kind], records)
+
+
+def _insert_records(
+    conn: sqlite3.Connection,
+    target: _ImportTarget,
+    records: Sequence[tuple[int, BaseModel]],
+) -> list[tuple[int, str]]:
+    """
+    Insert the records with a single executemany. If any row violates a constraint
+    they are rolled back to a savepoint and inserted one row at a time instead, to
+    keep the good rows and report the bad ones.
+    """
+    errors = []
+    params = [(row, target.to_params(record)) for row, record in records]
+    # the write queue holds the write lock, after_insert only sees these rows
+    if target.after_insert is not None:
+        last_id = conn.execute(
+            f"SELECT coalesce(max(rowid), 0) FROM {target.table}"
+        ).fetchone()[0]
+    conn.execute("SAVEPOINT import_chunk")
+    try:
+        insert_in_batches(
+            conn,
+            target.insert_query,
+            (values for _, values in params),
+            batch_size=len(params),
+        )
+    except sqlite3.IntegrityError:
+        conn.execute("ROLLBACK TO import_chunk")
+        for row, values in params:
+            try:
+                conn.execute(target.insert_query, values)
+            except sqlite3.IntegrityError as e:
+                errors.append((row, str(e)))
+    conn.execute("RELEASE import_chunk")
+    if target.after_insert is not None:
+        target.after_insert(conn, last_id)
+    return errors
+
+
+class SqliteCacheInvalidationRepository(CacheInvalidationRepository):
+    """
+    The invalidation log of the sqlite database, read through the read-write pool,
+    a DB_READ_PATH snapshot may be behind.
+    """
+
+    async def last_id(self) -> int:
+        return await run_primary(_last_invalidation_id)
+
+    async def list_after(self, last_id: int) -> list[sqlite3.Row]:
+        return await run_primary(_list_invalidations, last_id)
+
+    async def prune(self, before: int) -> int:
+        return await _write(_prune_invalidations, before)
+
+
+def _last_invalidation_id(conn: sqlite3.Connection) -> int:
+    # the last id handed out, rows may have been pruned since
+    row = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'cache_invalidations'"
+    ).fetchone()
+    return row[0] if row is not None else 0
+
+
+def _list_invalidations(conn: sqlite3.Connection, last_id: int) -> list[sqlite3.Row]:
+    return conn.execute(
+        "SELECT id, cache, key FROM cache_invalidations WHERE id > ? ORDER BY id",
+        (last_id,),
+    ).fetchall()
+
+
+def _prune_invalidations(conn: sqlite3.Connection, before: int) -> int:
+    return conn.execute(
+        "DELETE FROM cache_invalidations WHERE created_at < ?", (before,)
+    ).rowcount
+
+
+class SqliteRepositories(Repositories):
+    """
+    The repositories of the sqlite database at DATABASE_PATH. They share the process
+    wide pools and write queue, which the app closes itself.
+    """
+
+    def __init__(self):
+        self.events = SqliteEventRepository()
+        self.users = SqliteUserRepository()
+        self.organizations = SqliteOrganizationRepository()
+        self.roles = SqliteRoleRepository()
+        self.registrations = SqliteRegistrationRepository()
+        self.imports = SqliteImportRepository()
+        self.invalidations = SqliteCacheInvalidationRepository()
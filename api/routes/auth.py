@@ -1,49 +1,58 @@
 import logging
-import sqlite3
 from datetime import timedelta
 
 import jwt
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 
-from db import get_connection
-from models.auth import RequestResetBody, ResetPasswordBody, SignupRequest, SignupResponse
-from utils.auth import get_current_user
-from utils.security import create_access_token, decode_access_token, hash_password, verify_password
+from models.auth import (
+    RequestResetBody,
+    ResetPasswordBody,
+    SignupRequest,
+    SignupResponse,
+)
+from repositories import ConstraintError, UserRepository, get_user_repository
+from utils.auth import get_current_user, invalidate_user
+from utils.security import (
+    create_access_token,
+    decode_access_token,
+    hash_password_async,
+    password_needs_rehash,
+    verify_password_async,
+)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/signup", response_model=SignupResponse, status_code=status.HTTP_201_CREATED)
-def signup(payload: SignupRequest, conn: sqlite3.Connection = Depends(get_connection)):
+# The routes hashing passwords are async, bcrypt runs in the password hasher's
+# processes and is awaited, so a wave of logins doesn't tie up Starlette's threadpool.
+@router.post(
+    "/signup", response_model=SignupResponse, status_code=status.HTTP_201_CREATED
+)
+async def signup(
+    payload: SignupRequest, repository: UserRepository = Depends(get_user_repository)
+):
     """
     Register a new user.
     """
     # Check for duplicate email
-    existing = conn.execute(
-        "SELECT user_id FROM users WHERE email = ?",
-        (payload.email,),
-    ).fetchone()
+    existing = await repository.get_login(payload.email)
     if existing:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="A user with this email already exists",
         )
 
-    # Create the user
-    user_cursor = conn.execute(
-        "INSERT INTO users (email, first_name, last_name) VALUES (?, ?, ?)",
-        (payload.email, payload.first_name, payload.last_name),
-    )
-    user_id = user_cursor.lastrowid
-
-    # Store hashed password in credentials table
-    conn.execute(
-        "INSERT INTO credentials (user_id, hashed_password) VALUES (?, ?)",
-        (user_id, hash_password(payload.password)),
-    )
-
-    conn.commit()
+    # Hash before queueing the insert, the write queue must never wait on bcrypt
+    hashed_password = await hash_password_async(payload.password)
+    try:
+        user_id = await repository.insert_user_with_password(payload, hashed_password)
+    except ConstraintError:
+        # signed up with the same email since the check above
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A user with this email already exists",
+        )
 
     return SignupResponse(
         user_id=user_id,
@@ -54,39 +63,34 @@ def signup(payload: SignupRequest, conn: sqlite3.Connection = Depends(get_connec
 
 
 @router.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    conn: sqlite3.Connection = Depends(get_connection),
+    repository: UserRepository = Depends(get_user_repository),
 ):
     """
     Authenticate a user and return a JWT access token.
 
     Accepts `username` (the user's email) and `password` via OAuth2 form data.
     """
-    # Look up user by email 
+    # Look up user by email, with their password from the credentials table
     # Note: Auth2 spec uses "username" field
-    user = conn.execute(
-        "SELECT user_id, email FROM users WHERE email = ?",
-        (form_data.username,),
-    ).fetchone()
-    if user is None:
+    user = await repository.get_login(form_data.username)
+    if (
+        user is None
+        or user["hashed_password"] is None
+        or not await verify_password_async(form_data.password, user["hashed_password"])
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Verify password from credentials table
-    cred = conn.execute(
-        "SELECT hashed_password FROM credentials WHERE user_id = ?",
-        (user["user_id"],),
-    ).fetchone()
-    if cred is None or not verify_password(form_data.password, cred["hashed_password"]):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    # upgrade the stored hash when the configured bcrypt cost has changed, this is the
+    # only time we have the plain text password
+    if password_needs_rehash(user["hashed_password"]):
+        hashed_password = await hash_password_async(form_data.password)
+        await repository.update_password(user["user_id"], hashed_password)
 
     token = create_access_token({"sub": str(user["user_id"])})
     return {"access_token": token, "token_type": "bearer"}
@@ -97,17 +101,16 @@ logger = logging.getLogger(__name__)
 
 
 @router.post("/request-reset")
-def request_reset(payload: RequestResetBody, conn: sqlite3.Connection = Depends(get_connection)):
+async def request_reset(
+    payload: RequestResetBody, repository: UserRepository = Depends(get_user_repository)
+):
     """
     Request a password reset. If the email exists, a short-lived reset token is
     generated and logged to the console.
 
     Always returns 200 with a generic message to prevent email enumeration.
     """
-    user = conn.execute(
-        "SELECT user_id FROM users WHERE email = ?",
-        (payload.email,),
-    ).fetchone()
+    user = await repository.get_login(payload.email)
 
     if user:
         reset_token = create_access_token(
@@ -120,7 +123,10 @@ def request_reset(payload: RequestResetBody, conn: sqlite3.Connection = Depends(
 
 
 @router.post("/reset-password")
-def reset_password(payload: ResetPasswordBody, conn: sqlite3.Connection = Depends(get_connection)):
+async def reset_password(
+    payload: ResetPasswordBody,
+    repository: UserRepository = Depends(get_user_repository),
+):
     """
     Reset a user's password using a valid reset token.
     """
@@ -142,24 +148,22 @@ def reset_password(payload: ResetPasswordBody, conn: sqlite3.Connection = Depend
     user_id = claims.get("sub")
 
     # Update the hashed password in credentials
-    result = conn.execute(
-        "UPDATE credentials SET hashed_password = ? WHERE user_id = ?",
-        (hash_password(payload.new_password), user_id),
-    )
-    if result.rowcount == 0:
+    hashed_password = await hash_password_async(payload.new_password)
+    updated = await repository.update_password(int(user_id), hashed_password)
+    if not updated:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
-    conn.commit()
+    invalidate_user(user_id)
 
     return {"message": "Password has been reset successfully"}
 
 
 @router.delete("/delete-account")
-def delete_account(
+async def delete_account(
     current_user: dict = Depends(get_current_user),
-    conn: sqlite3.Connection = Depends(get_connection),
+    repository: UserRepository = Depends(get_user_repository),
 ):
     """
     Delete the currently authenticated user's account.
@@ -168,12 +172,8 @@ def delete_account(
     """
     user_id = current_user["user_id"]
 
-    # Delete credentials (password hash)
-    conn.execute("DELETE FROM credentials WHERE user_id = ?", (user_id,))
-
-    # Delete the user record
-    conn.execute("DELETE FROM users WHERE user_id = ?", (user_id,))
-
-    conn.commit()
+    # Delete the credentials (password hash) and the user record
+    await repository.delete_user(user_id)
+    invalidate_user(user_id)
 
     return {"message": "Account deleted successfully"}
@@ -1,90 +1,148 @@
-import sqlite3
+from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
 
-from db import get_connection
-from models import EventRegistrationIn
+from models import (
+    EventRegistrationBulkResult,
+    EventRegistrationIn,
+    EventWaitlistEntry,
+    EventWaitlistIn,
+)
+from repositories import (
+    EVENT_FULL,
+    EVENT_NOT_FULL,
+    REGISTRATION_EXISTS,
+    REGISTRATION_EXPORT_COLUMNS,
+    ConstraintError,
+    RegistrationRepository,
+    RoleRepository,
+    get_registration_repository,
+    get_role_repository,
+)
+from utils.auth import get_current_user
+from utils.export import ExportFormat, stream_export
+from utils.pagination import (
+    decode_cursor,
+    encode_cursor,
+    set_next_cursor,
+    validate_page,
+)
+from utils.permissions import check_org_admin
+from utils.responses import rows_response
 
 router = APIRouter(prefix="/event-registrations", tags=["event_registrations"])
 
+# max registrations accepted by one bulk request
+BULK_MAX_REGISTRATIONS = 1000
+
 
 @router.get("", response_model=list[EventRegistrationIn])
-def list_event_registrations(
+async def list_event_registrations(
+    response: Response,
     organization_id: int | None = None,
     event_id: int | None = None,
     user_id: int | None = None,
-    skip: int = 0,
+    skip: int = Query(0, deprecated=True),
     limit: int = 10,
-    conn: sqlite3.Connection = Depends(get_connection),
+    cursor: str | None = None,
+    repository: RegistrationRepository = Depends(get_registration_repository),
 ):
     """
     List event registrations, optionally filtered by organization, event, or user.
 
+    Registrations are returned newest first and pages are keyed on
+    (registration_time, user_id, event_id), if there are more results the cursor for
+    the next page is returned in the `X-Next-Cursor` header.
+
     :param organization_id: filter by organization ID
     :type organization_id: int | None
     :param event_id: filter by event ID
     :type event_id: int | None
     :param user_id: filter by user ID
     :type user_id: int | None
-    :param conn: the connection to the database
-    :type conn: sqlite3.Connection
-    :param skip: number of rows to skip before returning results
+    :param skip: deprecated, number of rows to skip before returning results, use cursor instead
     :type skip: int
     :param limit: max number of rows to return
     :type limit: int
+    :param cursor: the cursor returned with the previous page
+    :type cursor: str | None
+    :param repository: where the registrations are read from
+    :type repository: RegistrationRepository
     """
-    if skip < 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Skip cannot be negative"
-        )
-    if limit < 1:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Limit must be at least 1"
+    validate_page(limit, skip, cursor)
+
+    after = decode_cursor(cursor, str, int, int) if cursor else None
+    # fetch one extra row to know if there is a next page
+    rows = await repository.list_registrations(
+        organization_id, event_id, user_id, after, skip, limit + 1
+    )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        set_next_cursor(
+            response,
+            encode_cursor(last["registration_time"], last["user_id"], last["event_id"]),
         )
+    return rows_response(rows, EventRegistrationIn, response)
+
 
-    query = """
-		SELECT user_id, event_id, organization_id, registration_time
-		FROM event_registrations
-	"""
-    conditions = []
-    params: list[int] = []
+@router.get("/export")
+async def export_event_registrations(
+    export_format: ExportFormat = Query("ndjson", alias="format"),
+    organization_id: int | None = None,
+    event_id: int | None = None,
+    user_id: int | None = None,
+    current_user: dict = Depends(get_current_user),
+    roles: RoleRepository = Depends(get_role_repository),
+    repository: RegistrationRepository = Depends(get_registration_repository),
+):
+    """
+    Export event registrations together with the attendee's name and email, as a
+    streamed NDJSON or CSV download, newest first. Rows are sent as they are read, so
+    memory use doesn't grow with the number of registrations.
+
+    The attendees' emails are only exported to the admins of an organization (with
+    its organization_id), or to a user exporting their own registrations (with their
+    user_id).
 
+    :param export_format: "ndjson" (one JSON object per line) or "csv", passed as `format`
+    :type export_format: ExportFormat
+    :param organization_id: filter by organization ID
+    :type organization_id: int | None
+    :param event_id: filter by event ID
+    :type event_id: int | None
+    :param user_id: filter by user ID
+    :type user_id: int | None
+    :param current_user: the authenticated user
+    :type current_user: dict
+    :param roles: where the user's roles are read from
+    :type roles: RoleRepository
+    :param repository: where the registrations are read from
+    :type repository: RegistrationRepository
+    """
     if organization_id is not None:
-        conditions.append("organization_id = ?")
-        params.append(organization_id)
-    if event_id is not None:
-        conditions.append("event_id = ?")
-        params.append(event_id)
-    if user_id is not None:
-        conditions.append("user_id = ?")
-        params.append(user_id)
-
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
-    query += " ORDER BY registration_time DESC"
-    query += " LIMIT ? OFFSET ?"
-    params.extend([limit, skip])
-
-    rows = conn.execute(query, params).fetchall()
-    return [
-        EventRegistrationIn(
-            user_id=row["user_id"],
-            event_id=row["event_id"],
-            organization_id=row["organization_id"],
-            registration_time=row["registration_time"],
+        await check_org_admin(roles, current_user["user_id"], organization_id)
+    elif user_id != current_user["user_id"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Export the registrations of an organization you administer, or your own",
         )
-        for row in rows
-    ]
+    return stream_export(
+        repository.export_registrations(organization_id, event_id, user_id),
+        REGISTRATION_EXPORT_COLUMNS,
+        export_format,
+        "event_registrations",
+    )
 
 
 @router.get(
     "/{organization_id}/{event_id}/{user_id}", response_model=EventRegistrationIn
 )
-def get_event_registration(
+async def get_event_registration(
     organization_id: int,
     event_id: int,
     user_id: int,
-    conn: sqlite3.Connection = Depends(get_connection),
+    repository: RegistrationRepository = Depends(get_registration_repository),
 ):
     """
     Get a specific event registration by its composite identifiers.
@@ -95,76 +153,77 @@ def get_event_registration(
     :type event_id: int
     :param user_id: the user ID for the registration
     :type user_id: int
-    :param conn: the connection to the database
-    :type conn: sqlite3.Connection
-    """
-    row = conn.execute(
-        """
-		SELECT user_id, event_id, organization_id, registration_time
-		FROM event_registrations
-		WHERE organization_id = ? AND event_id = ? AND user_id = ?
-		""",
-        (organization_id, event_id, user_id),
-    ).fetchone()
+    :param repository: where the registration is read from
+    :type repository: RegistrationRepository
+    """
+    row = await repository.get_registration(organization_id, event_id, user_id)
     if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Registration not found"
         )
 
-    return EventRegistrationIn(
-        user_id=row["user_id"],
-        event_id=row["event_id"],
-        organization_id=row["organization_id"],
-        registration_time=row["registration_time"],
-    )
+    return EventRegistrationIn(**row)
 
 
 @router.post(
     "", response_model=EventRegistrationIn, status_code=status.HTTP_201_CREATED
 )
-def create_event_registration(
+async def create_event_registration(
     payload: EventRegistrationIn,
-    conn: sqlite3.Connection = Depends(get_connection),
+    repository: RegistrationRepository = Depends(get_registration_repository),
 ):
     """
     Create a new event registration.
 
+    On SQLite the insert goes through the write queue, during a registration rush the
+    registrations are group committed instead of each waiting for the write lock. The
+    capacity trigger still checks every registration, in commit order.
+
     :param payload: the event registration details
     :type payload: EventRegistrationIn
-    :param conn: the connection to the database
-    :type conn: sqlite3.Connection
+    :param repository: where the registration is created
+    :type repository: RegistrationRepository
     """
     try:
-        conn.execute(
-            """
-			INSERT INTO event_registrations (user_id, event_id, organization_id, registration_time)
-			VALUES (?, ?, ?, ?)
-			""",
-            (
-                payload.user_id,
-                payload.event_id,
-                payload.organization_id,
-                payload.registration_time,
-            ),
-        )
-        conn.commit()
-    except sqlite3.IntegrityError:
+        await repository.insert_registration(payload)
+    except ConstraintError as e:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
-            detail="Registration already exists",
+            detail=EVENT_FULL if str(e) == EVENT_FULL else REGISTRATION_EXISTS,
         )
 
     return payload
 
 
+@router.post("/bulk", response_model=EventRegistrationBulkResult)
+async def create_event_registrations_bulk(
+    payload: list[EventRegistrationIn] = Body(max_length=BULK_MAX_REGISTRATIONS),
+    repository: RegistrationRepository = Depends(get_registration_repository),
+):
+    """
+    Create many event registrations at once, in a single transaction.
+
+    Registrations that already exist, appear more than once in the request, or are for
+    an event that is full don't fail the batch. They are skipped and reported in
+    `conflicts` by their position in the request body, the same conflicts
+    create_event_registration answers 409 for.
+
+    :param payload: the event registrations to create, at most BULK_MAX_REGISTRATIONS
+    :type payload: list[EventRegistrationIn]
+    :param repository: where the registrations are created
+    :type repository: RegistrationRepository
+    """
+    return await repository.insert_registrations(payload)
+
+
 @router.delete(
     "/{organization_id}/{event_id}/{user_id}", response_model=EventRegistrationIn
 )
-def delete_event_registration(
+async def delete_event_registration(
     organization_id: int,
     event_id: int,
     user_id: int,
-    conn: sqlite3.Connection = Depends(get_connection),
+    repository: RegistrationRepository = Depends(get_registration_repository),
 ):
     """
     Delete an event registration.
@@ -175,34 +234,117 @@ def delete_event_registration(
     :type event_id: int
     :param user_id: the user ID for the registration
     :type user_id: int
-    :param conn: the connection to the database
-    :type conn: sqlite3.Connection
-    """
-    row = conn.execute(
-        """
-		SELECT user_id, event_id, organization_id, registration_time
-		FROM event_registrations
-		WHERE organization_id = ? AND event_id = ? AND user_id = ?
-		""",
-        (organization_id, event_id, user_id),
-    ).fetchone()
+    :param repository: where the registration is deleted
+    :type repository: RegistrationRepository
+    """
+    row = await repository.delete_registration(organization_id, event_id, user_id)
     if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Registration not found"
         )
 
-    conn.execute(
-        """
-		DELETE FROM event_registrations
-		WHERE organization_id = ? AND event_id = ? AND user_id = ?
-		""",
-        (organization_id, event_id, user_id),
-    )
-    conn.commit()
+    return EventRegistrationIn(**row)
 
-    return EventRegistrationIn(
-        user_id=row["user_id"],
-        event_id=row["event_id"],
-        organization_id=row["organization_id"],
-        registration_time=row["registration_time"],
-    )
+
+@router.get("/waitlist", response_model=list[EventWaitlistEntry])
+async def list_event_waitlist(
+    response: Response,
+    event_id: int,
+    limit: int = 10,
+    cursor: str | None = None,
+    repository: RegistrationRepository = Depends(get_registration_repository),
+):
+    """
+    List the waitlist of an event, in the order spots are handed out as they free up.
+
+    Pages are keyed on (waitlist_time, user_id), if there are more results the cursor
+    for the next page is returned in the `X-Next-Cursor` header.
+
+    :param event_id: the event to list the waitlist of
+    :type event_id: int
+    :param limit: max number of rows to return
+    :type limit: int
+    :param cursor: the cursor returned with the previous page
+    :type cursor: str | None
+    :param repository: where the waitlist is read from
+    :type repository: RegistrationRepository
+    """
+    validate_page(limit, cursor=cursor)
+
+    after = decode_cursor(cursor, str, int) if cursor else None
+    # fetch one extra row to know if there is a next page
+    rows = await repository.list_waitlist(event_id, after, limit + 1)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        set_next_cursor(
+            response, encode_cursor(rows[-1]["waitlist_time"], rows[-1]["user_id"])
+        )
+    return rows_response(rows, EventWaitlistEntry, response)
+
+
+@router.post(
+    "/waitlist", response_model=EventWaitlistEntry, status_code=status.HTTP_201_CREATED
+)
+async def join_event_waitlist(
+    payload: EventWaitlistIn,
+    repository: RegistrationRepository = Depends(get_registration_repository),
+):
+    """
+    Join the waitlist of a full event. When a spot frees up, or the capacity is raised,
+    the first user on the waitlist is registered automatically.
+
+    :param payload: the user and event
+    :type payload: EventWaitlistIn
+    :param repository: where the waitlist entry is created
+    :type repository: RegistrationRepository
+    """
+    waitlist_time = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    try:
+        joined = await repository.join_waitlist(payload, waitlist_time)
+    except ConstraintError as e:
+        # the trigger rejects registered users and events with open spots
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=(
+                str(e)
+                if str(e) in (REGISTRATION_EXISTS, EVENT_NOT_FULL)
+                else "Already on the waitlist"
+            ),
+        )
+    if not joined:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Event not found"
+        )
+
+    return EventWaitlistEntry(**payload.model_dump(), waitlist_time=waitlist_time)
+
+
+@router.delete(
+    "/waitlist/{organization_id}/{event_id}/{user_id}",
+    response_model=EventWaitlistEntry,
+)
+async def leave_event_waitlist(
+    organization_id: int,
+    event_id: int,
+    user_id: int,
+    repository: RegistrationRepository = Depends(get_registration_repository),
+):
+    """
+    Leave the waitlist of an event.
+
+    :param organization_id: the organization ID of the event
+    :type organization_id: int
+    :param event_id: the event ID
+    :type event_id: int
+    :param user_id: the user ID
+    :type user_id: int
+    :param repository: where the waitlist entry is deleted
+    :type repository: RegistrationRepository
+    """
+    row = await repository.leave_waitlist(organization_id, event_id, user_id)
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Not on the waitlist"
+        )
+
+    return EventWaitlistEntry(**row)
@@ -1,48 +1,241 @@
-import sqlite3
-
-from fastapi import APIRouter, Depends, HTTPException, status
-from db import get_connection
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from models import Event, EventIn, EventUpdate
+from models.event import EventScope, EventSearchResult, TimeOfDay
+from repositories import (
+    EVENT_COLUMNS,
+    EventFilters,
+    EventRepository,
+    RoleRepository,
+    get_event_repository,
+    get_role_repository,
+)
+from utils.auth import get_current_user
+from utils.conditional import not_modified_response
+from utils.entity_cache import event_cache
+from utils.export import ExportFormat, stream_export
+from utils.pagination import (
+    decode_cursor,
+    encode_cursor,
+    set_next_cursor,
+    validate_page,
+)
+from utils.permissions import check_org_admin
+from utils.responses import rows_response
 
 router = APIRouter(prefix="/events", tags=["events"])
 
 
-# Get a list of all events.
-@router.get("", response_model=None)
-def list_events(conn=Depends(get_connection)):
+# max page size of list_events, pages are returned chronologically so clients should
+# follow the cursor rather than asking for everything at once
+EVENTS_MAX_LIMIT = 200
+
+
+# Get a list of events, filtered and paginated.
+@router.get("", response_model=list[Event])
+async def list_events(
+    response: Response,
+    limit: int = 50,
+    cursor: str | None = None,
+    organization_id: int | None = None,
+    scope: EventScope = "all",
+    user_id: int | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    time_of_day: list[TimeOfDay] | None = Query(None),
+    weekend_only: bool = False,
+    repository: EventRepository = Depends(get_event_repository),
+):
     """
-    TODO: Empty
+    List events ordered by time, with optional filters. Every filter is served by an
+    index on the events table, so a page costs the same regardless of table size.
+
+    Pages are keyed on (time, id), if there are more results the cursor for the next
+    page is returned in the `X-Next-Cursor` header.
+
+    TODO: replace user_id with current user from authentication middleware.
+
+    :param limit: maximum number of events to return, defaults to 50
+    :type limit: int
+    :param cursor: the cursor returned with the previous page
+    :type cursor: str | None
+    :param organization_id: only return events of this organization
+    :type organization_id: int | None
+    :param scope: "myOrgs" for events of organizations the user has a role in, "admin"
+        for events of organizations the user is an admin of, defaults to "all"
+    :type scope: EventScope
+    :param user_id: the user the scope is resolved for, required unless scope is "all"
+    :type user_id: int | None
+    :param start: only return events at or after this ISO 8601 time
+    :type start: str | None
+    :param end: only return events before this ISO 8601 time
+    :type end: str | None
+    :param time_of_day: only return events in any of these parts of the day, or on a
+        weekend when weekend_only is also set
+    :type time_of_day: list[TimeOfDay] | None
+    :param weekend_only: only return events on a saturday or sunday, or in one of the
+        time_of_day parts of the day when those are also set
+    :type weekend_only: bool
     """
-    rows = conn.execute(
-        "SELECT id, name, description, location, time, organization_id FROM events ORDER BY id"
-    ).fetchall()
-    return [
-        Event(
-            id=row["id"],
-            name=row["name"],
-            description=row["description"],
-            location=row["location"],
-            time=row["time"],
-            organization_id=row["organization_id"],
+    validate_page(limit, cursor=cursor, max_limit=EVENTS_MAX_LIMIT)
+    if scope != "all" and user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="user_id is required to filter by scope",
         )
-        for row in rows
-    ]
+
+    filters = EventFilters(
+        organization_id=organization_id,
+        scope=scope,
+        user_id=user_id,
+        start=start,
+        end=end,
+        time_of_day=time_of_day,
+        weekend_only=weekend_only,
+    )
+    after = decode_cursor(cursor, str, int) if cursor else None
+    # fetch one extra row to know if there is a next page
+    rows = await repository.list_events(filters, after, limit + 1)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        set_next_cursor(response, encode_cursor(rows[-1]["time"], rows[-1]["id"]))
+    return rows_response(rows, Event, response)
+
+
+# Full text search over events.
+@router.get("/search", response_model=list[EventSearchResult])
+async def search_events(
+    response: Response,
+    q: str | None = None,
+    location: str | None = None,
+    organization_id: int | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    limit: int = 20,
+    cursor: str | None = None,
+    repository: EventRepository = Depends(get_event_repository),
+):
+    """
+    Search events by name, description and location, ordered by relevance (bm25 on
+    sqlite, ts_rank on PostgreSQL). The full text index drives the query and the
+    organization/time filters are applied to the matched rows, so the whole search is
+    a single indexed query.
+
+    Pages are keyed on (rank, id), if there are more results the cursor for the next
+    page is returned in the `X-Next-Cursor` header. A rank depends on the whole search
+    index, so events added or changed between two pages can move the ranks and the
+    cursor is best-effort: such a change can skip or repeat an event across pages.
+
+    :param q: words to search for in the name, description and location, matched as prefixes
+    :type q: str | None
+    :param location: words to search for in the location only, matched as prefixes
+    :type location: str | None
+    :param organization_id: only return events of this organization
+    :type organization_id: int | None
+    :param start: only return events at or after this ISO 8601 time
+    :type start: str | None
+    :param end: only return events before this ISO 8601 time
+    :type end: str | None
+    :param limit: maximum number of events to return, defaults to 20
+    :type limit: int
+    :param cursor: the cursor returned with the previous page
+    :type cursor: str | None
+    """
+    validate_page(limit, cursor=cursor, max_limit=EVENTS_MAX_LIMIT)
+    if not q and not location:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide a search query or a location",
+        )
+
+    filters = EventFilters(organization_id=organization_id, start=start, end=end)
+    after = decode_cursor(cursor, float, int) if cursor else None
+    # fetch one extra row to know if there is a next page
+    rows = await repository.search_events(q, location, filters, after, limit + 1)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        set_next_cursor(response, encode_cursor(rows[-1]["rank"], rows[-1]["id"]))
+    return rows_response(rows, EventSearchResult, response)
+
+
+# Export events as a file download.
+@router.get("/export")
+async def export_events(
+    export_format: ExportFormat = Query("ndjson", alias="format"),
+    organization_id: int | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    current_user: dict = Depends(get_current_user),
+    roles: RoleRepository = Depends(get_role_repository),
+    repository: EventRepository = Depends(get_event_repository),
+):
+    """
+    Export events as a streamed NDJSON or CSV download, ordered by time. Rows are sent
+    as they are read, so memory use doesn't grow with the number of events.
+
+    Only for authenticated users, the events of one organization only for its admins.
+
+    :param export_format: "ndjson" (one JSON object per line) or "csv", passed as `format`
+    :type export_format: ExportFormat
+    :param organization_id: only export events of this organization
+    :type organization_id: int | None
+    :param start: only export events at or after this ISO 8601 time
+    :type start: str | None
+    :param end: only export events before this ISO 8601 time
+    :type end: str | None
+    :param current_user: the authenticated user
+    :type current_user: dict
+    :param roles: where the user's roles are read from
+    :type roles: RoleRepository
+    :param repository: where the events are read from
+    :type repository: EventRepository
+    """
+    if organization_id is not None:
+        await check_org_admin(roles, current_user["user_id"], organization_id)
+    filters = EventFilters(organization_id=organization_id, start=start, end=end)
+    return stream_export(
+        repository.export_events(filters), EVENT_COLUMNS, export_format, "events"
+    )
 
 
 # Get a single event.
 @router.get("/{event_id}", response_model=None)
-def get_event(event_id: int, conn=Depends(get_connection)):
+async def get_event(
+    event_id: int,
+    request: Request,
+    response: Response,
+    repository: EventRepository = Depends(get_event_repository),
+):
     """
     TODO: this has no response object as this router is incomplete. Implement
+
+    The response has ETag and Last-Modified headers, a conditional request for an
+    unchanged event is answered with a 304 without reading the event. Otherwise the
+    event is served from event_cache while its version is unchanged.
     """
-    row = conn.execute(
-        "SELECT id, name, description, location, time, organization_id FROM events WHERE id = ?",
-        (event_id,),
-    ).fetchone()
-    if row is None:
+    validators = await repository.get_validators(event_id)
+    not_modified = not_modified_response(request, response, validators)
+    if not_modified is not None:
+        return not_modified
+    if validators is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Event not found"
+        )
+
+    async def load_event() -> Event | None:
+        row = await repository.get_event(event_id)
+        if row is None:
+            return None
+        return _event_from_row(row)
+
+    event = await event_cache.get_or_load_async(event_id, load_event, validators.etag)
+    if event is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Event not found"
         )
+    return event
+
+
+def _event_from_row(row) -> Event:
     return Event(
         id=row["id"],
         name=row["name"],
@@ -50,113 +243,53 @@ def get_event(event_id: int, conn=Depends(get_connection)):
         location=row["location"],
         time=row["time"],
         organization_id=row["organization_id"],
+        capacity=row["capacity"],
+        registered_count=row["registered_count"],
     )
 
 
-# Add an event to the db.
+# Add an event to the db, through the repository (the write queue on sqlite).
 @router.post("", status_code=status.HTTP_201_CREATED)
-def add_event(payload: EventIn, conn=Depends(get_connection)):
-    cursor = conn.execute(
-        "INSERT INTO events (name, description, location, time, organization_id) VALUES (?, ?, ?, ?, ?)",
-        (
-            payload.name,
-            payload.description,
-            payload.location,
-            payload.time,
-            payload.organization_id,
-        ),
-    )
-    conn.commit()
+async def add_event(
+    payload: EventIn, repository: EventRepository = Depends(get_event_repository)
+):
+    event_id = await repository.insert_event(payload)
     return Event(
-        id=cursor.lastrowid,
+        id=event_id,
         name=payload.name,
         description=payload.description,
         location=payload.location,
         time=payload.time,
         organization_id=payload.organization_id,
+        capacity=payload.capacity,
     )
 
 
 # Put/update request
 @router.put("/{event_id}", response_model=None)
-# def update_event(event_id: int, conn=Depends(get_connection)):
-def update_event(
+async def update_event(
     event_id: int,
     payload: EventUpdate,
-    conn: sqlite3.Connection = Depends(get_connection),
+    repository: EventRepository = Depends(get_event_repository),
 ):
-    row = conn.execute(
-        """
-        SELECT id, name, description, location, time, organization_id
-        FROM events
-        WHERE id = ?
-        """,
-        (event_id,),
-    ).fetchone()
+    # raising the capacity registers users from the waitlist, the repository returns
+    # the event as it is after the update
+    row = await repository.update_event(event_id, payload)
     if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Event not found"
         )
-
-    updated_name = payload.name if payload.name is not None else row["name"]
-    updated_description = (
-        payload.description if payload.description is not None else row["description"]
-    )
-    updated_location = (
-        payload.location if payload.location is not None else row["location"]
-    )
-    updated_time = payload.time if payload.time is not None else row["time"]
-    updated_organization_id = (
-        payload.organization_id
-        if payload.organization_id is not None
-        else row["organization_id"]
-    )
-
-    conn.execute(
-        """
-        UPDATE events
-        SET name = ?, description = ?, location = ?, time = ?, organization_id = ?
-        WHERE id = ?
-        """,
-        (
-            updated_name,
-            updated_description,
-            updated_location,
-            updated_time,
-            updated_organization_id,
-            event_id,
-        ),
-    )
-    conn.commit()
-
-    return Event(
-        id=event_id,
-        name=updated_name,
-        description=updated_description,
-        location=updated_location,
-        time=updated_time,
-        organization_id=row["organization_id"],
-    )
+    event_cache.invalidate(event_id)
+    return _event_from_row(row)
 
 
 # Destroy event
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_event(event_id: int, conn=Depends(get_connection)):
-    row = conn.execute(
-        """
-        SELECT id, name, description, location, time, organization_id
-        FROM events
-        WHERE id = ?
-        """,
-        (event_id,),
-    ).fetchone()
-    if row is None:
+async def delete_event(
+    event_id: int, repository: EventRepository = Depends(get_event_repository)
+):
+    if not await repository.delete_event(event_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Event not found"
         )
-
-    conn.execute(
-        "DELETE FROM events WHERE id = ?",
-        (event_id,),
-    )
-    conn.commit()
+    event_cache.invalidate(event_id)
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, status
+
+from models import ImportResult
+from repositories import ImportKind, ImportRepository, get_import_repository
+from utils.bulk_import import ImportFormat, guess_format, import_records
+from utils.permissions import roles_cache
+
+router = APIRouter(prefix="/import", tags=["import"])
+
+
+@router.post("/{kind}", response_model=ImportResult)
+async def import_file(
+    kind: ImportKind,
+    file: UploadFile,
+    import_format: ImportFormat | None = Query(None, alias="format"),
+    repository: ImportRepository = Depends(get_import_repository),
+):
+    """
+    Import users, organizations, or events from an uploaded CSV or NDJSON file.
+
+    Every record is validated like the body of the matching create endpoint (UserIn,
+    OrganizationCreate, EventIn), CSV files need a header row naming the fields. The
+    file is read and inserted in chunks as it is parsed, so it is never held in memory
+    whole. Records that fail validation or a constraint (a duplicate email, an unknown
+    organization) are skipped and reported by row, the rest are inserted.
+
+    :param kind: what the file contains, users, organizations, or events
+    :type kind: ImportKind
+    :param file: the CSV or NDJSON file, UTF-8 encoded
+    :type file: UploadFile
+    :param import_format: ndjson or csv, defaults to guessing from the file extension
+    :type import_format: ImportFormat | None, optional
+    :param repository: where the records are inserted
+    :type repository: ImportRepository
+    """
+    import_format = import_format or guess_format(file.filename)
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown file format, pass format=csv or format=ndjson",
+        )
+    result = await import_records(repository, kind, file.file, import_format)
+    if kind == "organizations" and result.inserted:
+        # the creators of the imported organizations are now their admins
+        roles_cache.clear()
+    return result
@@ -1,65 +1,100 @@
-import sqlite3
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
-from fastapi import APIRouter, Depends, HTTPException, status
-
-from db import get_connection
 from models import Organization, OrganizationCreate, OrganizationUpdate
+from repositories import (
+    OrganizationRepository,
+    RoleRepository,
+    get_organization_repository,
+    get_role_repository,
+)
 from routes.organization_roles import router as organization_roles_router
+from utils.conditional import not_modified_response
+from utils.entity_cache import members_cache, organization_cache
+from utils.pagination import (
+    decode_cursor,
+    encode_cursor,
+    set_next_cursor,
+    validate_page,
+)
+from utils.permissions import (
+    invalidate_organization_roles,
+    invalidate_user_roles,
+    is_org_admin,
+)
+from utils.responses import rows_response
 
 router = APIRouter(prefix="/organization", tags=["organization"])
 
 
 @router.get("", response_model=list[Organization])
-def list_organizations(
-    conn: sqlite3.Connection = Depends(get_connection),
-    skip: int = 0,
+async def list_organizations(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, deprecated=True),
     limit: int = 10,
+    cursor: str | None = None,
     query: str | None = None,
+    repository: OrganizationRepository = Depends(get_organization_repository),
 ):
     """
     List organizations with pagination and optional search query.
 
-    :param conn: the connection to the database
-    :type conn: sqlite3.Connection
-    :param skip: number of records to skip for pagination, defaults to 0
+    Pages are keyed on organization_id, if there are more results the cursor for the next
+    page is returned in the `X-Next-Cursor` header.
+
+    Search results are keyed on (rank, organization_id) instead. A rank depends on the
+    whole search index, so organizations added or changed between two pages can move
+    the ranks and a search cursor is best-effort: such a change can skip or repeat an
+    organization across pages.
+
+    Every page has an ETag and Last-Modified header from a version counter of the whole
+    organizations table, a conditional request is answered with a 304 until an
+    organization is created, updated or deleted.
+
+    :param skip: deprecated, number of records to skip for pagination, use cursor instead
     :type skip: int, optional
     :param limit: maximum number of records to return, defaults to 10
     :type limit: int, optional
-    :param query: optional search query to filter organizations by name or description, defaults to None
+    :param cursor: the cursor returned with the previous page, defaults to None
+    :type cursor: str | None, optional
+    :param query: optional full text search by name or description, words are matched as prefixes and results are ordered by relevance, defaults to None
     :type query: str | None, optional
+    :param repository: where the organizations are read from
+    :type repository: OrganizationRepository
     """
-    base_sql = """
-        SELECT organization_id, name, description, created_by_user_id
-        FROM organizations
-    """
-    params: list[object] = []
-    if query:
-        base_sql += """
-            WHERE lower(name) LIKE ?
-               OR lower(description) LIKE ?
-        """
-        term = f"%{query.lower()}%"
-        params.extend([term, term])
-
-    base_sql += " ORDER BY organization_id LIMIT ? OFFSET ?"
-    params.extend([limit, skip])
-
-    rows = conn.execute(base_sql, params).fetchall()
-    return [
-        Organization(
-            organization_id=row["organization_id"],
-            name=row["name"],
-            description=row["description"],
-            created_by_user_id=row["created_by_user_id"],
+    validate_page(limit, skip, cursor)
+    not_modified = not_modified_response(
+        request, response, await repository.get_list_validators()
+    )
+    if not_modified is not None:
+        return not_modified
+
+    # search results are keyed on (rank, organization_id) rather than just
+    # organization_id
+    after = None
+    if cursor:
+        after = (
+            decode_cursor(cursor, float, int) if query else decode_cursor(cursor, int)
         )
-        for row in rows
-    ]
+
+    # fetch one extra row to know if there is a next page
+    rows = await repository.list_organizations(query, after, skip, limit + 1)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        set_next_cursor(
+            response,
+            encode_cursor(last["rank"], last["organization_id"])
+            if query
+            else encode_cursor(last["organization_id"]),
+        )
+    return rows_response(rows, Organization, response)
 
 
 @router.post("", response_model=Organization, status_code=status.HTTP_201_CREATED)
-def create_organization(
+async def create_organization(
     payload: OrganizationCreate,
-    conn: sqlite3.Connection = Depends(get_connection),
+    repository: OrganizationRepository = Depends(get_organization_repository),
 ):
     """
     Create an organization and grant the creator admin permissions.
@@ -68,35 +103,15 @@ def create_organization(
 
     :param payload: organization details and user ID for the creator
     :type payload: OrganizationCreate
-    :param conn: the connection to the database
-    :type conn: sqlite3.Connection
+    :param repository: where the organization is created
+    :type repository: OrganizationRepository
     """
-    user_row = conn.execute(
-        "SELECT user_id FROM users WHERE user_id = ?",
-        (payload.user_id,),
-    ).fetchone()
-    if user_row is None:
+    organization_id = await repository.insert_organization(payload)
+    if organization_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
-
-    cursor = conn.execute(
-        """
-        INSERT INTO organizations (name, description, created_by_user_id)
-        VALUES (?, ?, ?)
-        """,
-        (payload.name, payload.description, payload.user_id),
-    )
-    organization_id = cursor.lastrowid
-
-    conn.execute(
-        """
-        INSERT INTO roles (user_id, organization_id, permission_level)
-        VALUES (?, ?, ?)
-        """,
-        (payload.user_id, organization_id, "admin"),
-    )
-    conn.commit()
+    invalidate_user_roles(payload.user_id)
 
     return Organization(
         organization_id=organization_id,
@@ -106,11 +121,57 @@ def create_organization(
     )
 
 
+@router.get("/{organization_id}", response_model=Organization)
+async def get_organization(
+    organization_id: int,
+    request: Request,
+    response: Response,
+    repository: OrganizationRepository = Depends(get_organization_repository),
+):
+    """
+    Get the profile of a single organization.
+
+    The ETag and Last-Modified headers come from the version counter of the
+    organization's row, writes to other organizations don't change them. Otherwise the
+    organization is served from organization_cache while that version is unchanged.
+
+    :param organization_id: the organization to get
+    :type organization_id: int
+    :param repository: where the organization is read from
+    :type repository: OrganizationRepository
+    """
+    validators = await repository.get_validators(organization_id)
+    not_modified = not_modified_response(request, response, validators)
+    if not_modified is not None:
+        return not_modified
+    if validators is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found"
+        )
+
+    async def load_organization() -> Organization | None:
+        row = await repository.get_organization(organization_id)
+        if row is None:
+            return None
+        return Organization(**row)
+
+    # keyed on the row's own version, a write to another organization leaves this
+    # entry a hit
+    organization = await organization_cache.get_or_load_async(
+        organization_id, load_organization, validators.etag
+    )
+    if organization is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found"
+        )
+    return organization
+
+
 @router.delete("/{organization_id}", response_model=Organization)
-def delete_organization(
+async def delete_organization(
     organization_id: int,
     user_id: int,
-    conn: sqlite3.Connection = Depends(get_connection),
+    repository: OrganizationRepository = Depends(get_organization_repository),
 ):
     """
     Delete an organization if the requesting user is the creator.
@@ -121,17 +182,10 @@ def delete_organization(
     :type organization_id: int
     :param user_id: the user attempting deletion
     :type user_id: int
-    :param conn: the connection to the database
-    :type conn: sqlite3.Connection
+    :param repository: where the organization is deleted
+    :type repository: OrganizationRepository
     """
-    row = conn.execute(
-        """
-        SELECT organization_id, name, description, created_by_user_id
-        FROM organizations
-        WHERE organization_id = ?
-        """,
-        (organization_id,),
-    ).fetchone()
+    row = await repository.get_organization(organization_id)
     if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found"
@@ -143,25 +197,20 @@ def delete_organization(
             detail="Only the organization creator can delete this organization",
         )
 
-    conn.execute(
-        "DELETE FROM organizations WHERE organization_id = ?",
-        (organization_id,),
-    )
-    conn.commit()
+    await repository.delete_organization(organization_id)
+    organization_cache.invalidate(organization_id)
+    members_cache.invalidate(organization_id)
+    invalidate_organization_roles(organization_id)
 
-    return Organization(
-        organization_id=row["organization_id"],
-        name=row["name"],
-        description=row["description"],
-        created_by_user_id=row["created_by_user_id"],
-    )
+    return Organization(**row)
 
 
 @router.put("/{organization_id}", response_model=Organization)
-def update_organization(
+async def update_organization(
     organization_id: int,
     payload: OrganizationUpdate,
-    conn: sqlite3.Connection = Depends(get_connection),
+    repository: OrganizationRepository = Depends(get_organization_repository),
+    roles: RoleRepository = Depends(get_role_repository),
 ):
     """
     Update organization name/description if the user is an admin.
@@ -172,57 +221,33 @@ def update_organization(
     :type organization_id: int
     :param payload: updated organization data and user ID
     :type payload: OrganizationUpdate
-    :param conn: the connection to the database
-    :type conn: sqlite3.Connection
+    :param repository: where the organization is updated
+    :type repository: OrganizationRepository
+    :param roles: where the user's roles are read from
+    :type roles: RoleRepository
     """
-    row = conn.execute(
-        """
-        SELECT organization_id, name, description, created_by_user_id
-        FROM organizations
-        WHERE organization_id = ?
-        """,
-        (organization_id,),
-    ).fetchone()
-    if row is None:
+    if await repository.get_organization(organization_id) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found"
         )
 
-    role_row = conn.execute(
-        """
-        SELECT permission_level
-        FROM roles
-        WHERE organization_id = ? AND user_id = ?
-        """,
-        (organization_id, payload.user_id),
-    ).fetchone()
-    if role_row is None or role_row["permission_level"] != "admin":
+    if not await is_org_admin(roles, payload.user_id, organization_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only organization admins can update this organization",
         )
 
-    updated_name = payload.name if payload.name is not None else row["name"]
-    updated_description = (
-        payload.description if payload.description is not None else row["description"]
+    row = await repository.update_organization(
+        organization_id, payload.name, payload.description
     )
+    if row is None:
+        # deleted since the check above
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found"
+        )
+    organization_cache.invalidate(organization_id)
 
-    conn.execute(
-        """
-        UPDATE organizations
-        SET name = ?, description = ?
-        WHERE organization_id = ?
-        """,
-        (updated_name, updated_description, organization_id),
-    )
-    conn.commit()
-
-    return Organization(
-        organization_id=row["organization_id"],
-        name=updated_name,
-        description=updated_description,
-        created_by_user_id=row["created_by_user_id"],
-    )
+    return Organization(**row)
 
 
 # TODO: not sure if this is the right pattern or not?
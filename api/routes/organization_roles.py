@@ -1,53 +1,57 @@
-import sqlite3
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 
-from fastapi import APIRouter, Depends, HTTPException, status
-
-from db import get_connection
 from models import RoleAndUser, RoleCreate, RoleUpdate
+from repositories import ConstraintError, RoleRepository, get_role_repository
+from utils.conditional import not_modified_response
+from utils.entity_cache import members_cache
+from utils.permissions import invalidate_user_roles, require_org_admin
+from utils.responses import rows_response
 
 router = APIRouter(prefix="")
 
 
 @router.get("", response_model=list[RoleAndUser])
-def list_organization_users(
-    organization_id: int, conn: sqlite3.Connection = Depends(get_connection)
+async def list_organization_users(
+    organization_id: int,
+    request: Request,
+    response: Response,
+    repository: RoleRepository = Depends(get_role_repository),
 ):
     """
     List all users in an organization, along with their role. This is used to manage users in an organization, and to display the list of users in an organization.
 
+    The response has ETag and Last-Modified headers, bumped whenever a role of the organization or the
+    name of one of its members changes, a conditional request for an unchanged list is answered with a 304.
+
     TODO: add pagination/filtering against role
 
     :param organization_id: the ID of the organization to list users for
     :type organization_id: int
-    :param conn: the connection to the database
-    :type conn: sqlite3.Connection
+    :param repository: where the roles are read from
+    :type repository: RoleRepository
     """
-    rows = conn.execute(
-        """
-        SELECT r.user_id, r.organization_id,  r.permission_level, u.first_name, u.last_name
-        FROM roles r
-        JOIN users u ON r.user_id = u.user_id
-        WHERE r.organization_id = ?
-        """,
-        (organization_id,),
-    ).fetchall()
-
-    return [
-        RoleAndUser(
-            user_id=row["user_id"],
-            organization_id=organization_id,
-            name=f'{row["first_name"]} {row["last_name"]}',
-            permission_level=row["permission_level"],
-        )
-        for row in rows
-    ]
+    validators = await repository.get_validators(organization_id)
+    not_modified = not_modified_response(request, response, validators)
+    if not_modified is not None:
+        return not_modified
+    if validators is None:
+        # no such organization, no members and nothing to cache
+        return rows_response([], RoleAndUser, response)
+
+    async def load_members() -> list[dict]:
+        return [dict(row) for row in await repository.list_members(organization_id)]
+
+    members = await members_cache.get_or_load_async(
+        organization_id, load_members, validators.etag
+    )
+    return rows_response(members, RoleAndUser, response)
 
 
 @router.post("", response_model=RoleAndUser, status_code=status.HTTP_201_CREATED)
-def add_organization_user(
+async def add_organization_user(
     organization_id: int,
     payload: RoleCreate,
-    conn: sqlite3.Connection = Depends(get_connection),
+    repository: RoleRepository = Depends(get_role_repository),
 ):
     """
     Add a user to an organization by creating a role record. This can currently be done by anyone, even those not in the organization.
@@ -58,39 +62,24 @@ def add_organization_user(
     :type organization_id: int
     :param payload: the user ID and permission level for the role
     :type payload: RoleCreate
-    :param conn: the connection to the database
-    :type conn: sqlite3.Connection
+    :param repository: where the role is created
+    :type repository: RoleRepository
     """
-    user_row = conn.execute(
-        "SELECT user_id, first_name, last_name FROM users WHERE user_id = ?",
-        (payload.user_id,),
-    ).fetchone()
-    if user_row is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
-        )
-
     try:
-        conn.execute(
-            """
-            INSERT INTO roles (user_id, organization_id, permission_level)
-            VALUES (?, ?, ?)
-            """,
-            (payload.user_id, organization_id, payload.permission_level),
-        )
-        conn.commit()
-    except sqlite3.IntegrityError:
+        row = await repository.add_member(organization_id, payload)
+    except ConstraintError:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="User already has a role in this organization",
         )
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    members_cache.invalidate(organization_id)
+    invalidate_user_roles(payload.user_id)
 
-    return RoleAndUser(
-        user_id=payload.user_id,
-        organization_id=organization_id,
-        name=f"{user_row["first_name"]} {user_row["last_name"]}",
-        permission_level=payload.permission_level,
-    )
+    return RoleAndUser(**row)
 
 
 @router.delete(
@@ -98,10 +87,10 @@ def add_organization_user(
     response_model=RoleAndUser,
     summary="Remove a user from an organization",
 )
-def remove_organization_user(
+async def remove_organization_user(
     organization_id: int,
     user_id: int,
-    conn: sqlite3.Connection = Depends(get_connection),
+    repository: RoleRepository = Depends(get_role_repository),
 ):
     """
     Remove a user from an organization by deleting their role connecting the user and the organization. This can only be performed by users within the organization with the role of admin, or
@@ -111,39 +100,22 @@ def remove_organization_user(
     :type organization_id: int
     :param user_id: the user to remove
     :type user_id: int
-    :param conn: the connection to the database
-    :type conn: sqlite3.Connection
+    :param repository: where the role is deleted
+    :type repository: RoleRepository
     """
 
     # TODO: verify the user making the request has permissions to remove this user, either by being an admin or the user themselves. This will require auth, which is not yet implemented, so for now this endpoint is unprotected.
 
-    row = conn.execute(
-        """
-        SELECT r.user_id, r.organization_id, r.permission_level, u.first_name, last_name
-        FROM roles r
-        JOIN users u ON r.user_id = u.user_id
-        WHERE r.organization_id = ? AND r.user_id = ?
-        """,
-        (organization_id, user_id),
-    ).fetchone()
+    # TODO: verify the organization creator cannot be removed.
+    row = await repository.remove_member(organization_id, user_id)
     if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
+    members_cache.invalidate(organization_id)
+    invalidate_user_roles(user_id)
 
-    # TODO: verify the organization creator cannot be removed.
-    conn.execute(
-        "DELETE FROM roles WHERE organization_id = ? AND user_id = ?",
-        (organization_id, user_id),
-    )
-    conn.commit()
-
-    return RoleAndUser(
-        user_id=row["user_id"],
-        organization_id=organization_id,
-        name=f'{row["first_name"]} {row["last_name"]}',
-        permission_level=row["permission_level"],
-    )
+    return RoleAndUser(**row)
 
 
 @router.put(
@@ -151,14 +123,16 @@ def remove_organization_user(
     response_model=RoleAndUser,
     summary="Update a user's role in an organization",
 )
-def update_organization_user_role(
+async def update_organization_user_role(
     organization_id: int,
     user_id: int,
     payload: RoleUpdate,
-    conn: sqlite3.Connection = Depends(get_connection),
+    repository: RoleRepository = Depends(get_role_repository),
+    current_user: dict = Depends(require_org_admin),
 ):
     """
-    Update a user's permission level in an organization.
+    Update a user's permission level in an organization, only the organization's
+    admins can do this.
 
     :param organization_id: the organization to update the user in
     :type organization_id: int
@@ -166,36 +140,19 @@ def update_organization_user_role(
     :type user_id: int
     :param payload: the new permission level
     :type payload: RoleUpdate
-    :param conn: the connection to the database
-    :type conn: sqlite3.Connection
+    :param repository: where the role is updated
+    :type repository: RoleRepository
+    :param current_user: the authenticated user, an admin of the organization
+    :type current_user: dict
     """
-    row = conn.execute(
-        """
-        SELECT r.user_id, r.organization_id, r.permission_level, u.first_name, u.last_name
-        FROM roles r
-        JOIN users u ON r.user_id = u.user_id
-        WHERE r.organization_id = ? AND r.user_id = ?
-        """,
-        (organization_id, user_id),
-    ).fetchone()
+    row = await repository.update_member(
+        organization_id, user_id, payload.permission_level
+    )
     if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
+    members_cache.invalidate(organization_id)
+    invalidate_user_roles(user_id)
 
-    conn.execute(
-        """
-        UPDATE roles
-        SET permission_level = ?
-        WHERE organization_id = ? AND user_id = ?
-        """,
-        (payload.permission_level, organization_id, user_id),
-    )
-    conn.commit()
-
-    return RoleAndUser(
-        user_id=row["user_id"],
-        organization_id=organization_id,
-        name=f"{row["first_name"]} {row["last_name"]}",
-        permission_level=payload.permission_level,
-    )
+    return RoleAndUser(**row)
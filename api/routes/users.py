@@ -1,89 +1,135 @@
-import sqlite3
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
-from fastapi import APIRouter, Depends, HTTPException, status
-
-from db import get_connection
 from models import User
 from models.user import Availability, UserIn
+from repositories import (
+    USER_COLUMNS,
+    ConstraintError,
+    UserRepository,
+    get_user_repository,
+)
+from utils.auth import get_current_user
+from utils.conditional import not_modified_response
+from utils.export import ExportFormat, stream_export
+from utils.pagination import (
+    decode_cursor,
+    encode_cursor,
+    set_next_cursor,
+    validate_page,
+)
+from utils.responses import rows_response
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.get("", response_model=list[User])
-def list_users(
-    conn: sqlite3.Connection = Depends(get_connection),
-    skip: int = 0,
+async def list_users(
+    response: Response,
+    skip: int = Query(0, deprecated=True),
     limit: int = 10,
+    cursor: str | None = None,
     query: str | None = None,
     availability: Availability | None = None,
+    repository: UserRepository = Depends(get_user_repository),
 ):
     """
     List users with pagination, optional search query and the ability to filter by specific properties, currently supporting:
 
     - availability
 
-    :param conn: the connection to the database
-    :type conn: sqlite3.Connection
-    :param skip: number of records to skip for pagination, defaults to 0
+    Pages are keyed on user_id, if there are more results the cursor for the next page is
+    returned in the `X-Next-Cursor` header.
+
+    Search results are keyed on (rank, user_id) instead. A rank depends on the whole
+    search index, so users added or changed between two pages can move the ranks and a
+    search cursor is best-effort: such a change can skip or repeat a user across pages.
+
+    :param skip: deprecated, number of records to skip for pagination, use cursor instead
     :type skip: int, optional
     :param limit: maximum number of records to return, defaults to 10
     :type limit: int, optional
-    :param query: optional search query to filter users by email, first name, or last name, defaults to None
+    :param cursor: the cursor returned with the previous page, defaults to None
+    :type cursor: str | None, optional
+    :param query: optional full text search by email, first name, or last name, words are matched as prefixes and results are ordered by relevance, defaults to None
     :type query: str | None, optional
+    :param repository: where the users are read from
+    :type repository: UserRepository
     """
+    validate_page(limit, skip, cursor)
 
-    base_sql = """
-        SELECT user_id, email, first_name, last_name, availability
-        FROM users
-    """
-    params: list[object] = []
-    conditions: list[str] = []
-
-    if query:
-        conditions.append(
-            "(lower(email) LIKE ? OR lower(first_name) LIKE ? OR lower(last_name) LIKE ?)"
+    # search results are keyed on (rank, user_id) rather than just user_id
+    after = None
+    if cursor:
+        after = (
+            decode_cursor(cursor, float, int) if query else decode_cursor(cursor, int)
         )
-        term = f"%{query.lower()}%"
-        params.extend([term, term, term])
-
-    if availability:
-        conditions.append("availability = ?")
-        params.append(availability)
-
-    if conditions:
-        base_sql += " WHERE " + " AND ".join(conditions)
-
-    base_sql += " ORDER BY user_id LIMIT ? OFFSET ?"
-    params.extend([limit, skip])
-
-    rows = conn.execute(base_sql, params).fetchall()
-    return [
-        User(
-            user_id=row["user_id"],
-            email=row["email"],
-            first_name=row["first_name"],
-            last_name=row["last_name"],
-            availability=row["availability"],
+
+    # fetch one extra row to know if there is a next page
+    rows = await repository.list_users(query, availability, after, skip, limit + 1)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        set_next_cursor(
+            response,
+            encode_cursor(last["rank"], last["user_id"])
+            if query
+            else encode_cursor(last["user_id"]),
         )
-        for row in rows
-    ]
+    return rows_response(rows, User, response)
+
+
+@router.get("/export")
+async def export_users(
+    export_format: ExportFormat = Query("ndjson", alias="format"),
+    availability: Availability | None = None,
+    current_user: dict = Depends(get_current_user),
+    repository: UserRepository = Depends(get_user_repository),
+):
+    """
+    Export users as a streamed NDJSON or CSV download, ordered by user ID. Rows are
+    sent as they are read, so memory use doesn't grow with the number of users. Only
+    for authenticated users.
+
+    :param export_format: "ndjson" (one JSON object per line) or "csv", passed as `format`
+    :type export_format: ExportFormat
+    :param availability: only export users with this availability
+    :type availability: Availability | None
+    :param current_user: the authenticated user
+    :type current_user: dict
+    :param repository: where the users are read from
+    :type repository: UserRepository
+    """
+    return stream_export(
+        repository.export_users(availability), USER_COLUMNS, export_format, "users"
+    )
 
 
 @router.get("/{user_id}", response_model=User)
-def get_user(user_id: int, conn: sqlite3.Connection = Depends(get_connection)):
+async def get_user(
+    user_id: int,
+    request: Request,
+    response: Response,
+    repository: UserRepository = Depends(get_user_repository),
+):
     """
     Get a single user by their user ID. This should be mostly used for the current logged in user to get
     their own information, but again might change.
 
+    The response has ETag and Last-Modified headers, a conditional request for an unchanged user is
+    answered with a 304 without reading the user.
+
     :param user_id: Description
     :type user_id: int
-    :param conn: the connection to the database
-    :type conn: sqlite3.Connection
+    :param repository: where the user is read from
+    :type repository: UserRepository
     """
-    row = conn.execute(
-        "SELECT user_id, email, first_name, last_name, availability FROM users WHERE user_id = ?",
-        (user_id,),
-    ).fetchone()
+    not_modified = not_modified_response(
+        request, response, await repository.get_validators(user_id)
+    )
+    if not_modified is not None:
+        return not_modified
+
+    row = await repository.get_user(user_id)
     if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
@@ -98,25 +144,29 @@ def get_user(user_id: int, conn: sqlite3.Connection = Depends(get_connection)):
 
 
 @router.post("", response_model=User, status_code=status.HTTP_201_CREATED)
-def create_user(payload: UserIn, conn: sqlite3.Connection = Depends(get_connection)):
+async def create_user(
+    payload: UserIn, repository: UserRepository = Depends(get_user_repository)
+):
     """
     TEMPORARY endpoint to create a new user in the database.
     This will change completely/get deleted once auth is implemented, as part of a registration flow, as
     that will create a user in the database
 
-    TODO: document how to handle duplicate emails, which will result in an error currently.
+    A duplicate email is answered with a 409.
     :param payload: Description
     :type payload: UserIn
-    :param conn: Description
-    :type conn: sqlite3.Connection
+    :param repository: where the user is created
+    :type repository: UserRepository
     """
-    cursor = conn.execute(
-        "INSERT INTO users (email, first_name, last_name, availability) VALUES (?, ?, ?, ?)",
-        (payload.email, payload.first_name, payload.last_name, payload.availability),
-    )
-    conn.commit()
+    try:
+        user_id = await repository.insert_user(payload)
+    except ConstraintError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A user with this email already exists",
+        )
     return User(
-        user_id=cursor.lastrowid,
+        user_id=user_id,
         email=payload.email,
         first_name=payload.first_name,
         last_name=payload.last_name,
@@ -0,0 +1,93 @@
+import os
+import tempfile
+
+# the API reads its configuration when it is imported, every test runs against a
+# fresh database in a temp folder
+_tmp_dir = tempfile.TemporaryDirectory()
+os.environ["DATABASE_PATH"] = os.path.join(_tmp_dir.name, "app.db")
+os.environ["DB_BACKEND"] = "sqlite"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import repositories  # noqa: E402
+from main import app  # noqa: E402
+from utils.cache_sync import clear_synced_caches, follower  # noqa: E402
+from utils.entity_cache import event_cache  # noqa: E402
+
+# PostgreSQL database the router tests also run against, its public schema is dropped
+# and created again. The postgres tests are skipped without it.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "")
+
+BACKENDS = ["sqlite", "postgres"]
+
+
+@pytest.fixture(scope="session")
+def app_client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session", params=BACKENDS)
+def backend(request, app_client):
+    """
+    The name of the backend every router is served from, every test using it (or
+    `client`) runs once per backend. The sqlite repositories are the app's own, the
+    PostgreSQL ones are created on TEST_DATABASE_URL and swapped in for them.
+    """
+    if request.param == "sqlite":
+        yield "sqlite"
+        return
+
+    if not TEST_DATABASE_URL:
+        pytest.skip("set TEST_DATABASE_URL to run the tests against PostgreSQL")
+    psycopg = pytest.importorskip("psycopg")
+    from repositories.postgres import PostgresRepositories
+
+    # ids start over like the sqlite database's, leftovers of a previous run would
+    # show up in the listings
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+        conn.execute("DROP SCHEMA public CASCADE")
+        conn.execute("CREATE SCHEMA public")
+
+    postgres = PostgresRepositories(TEST_DATABASE_URL, min_size=0)
+    sqlite, repositories._repositories = repositories._repositories, postgres
+    # the caches hold rows of the sqlite database under the same ids
+    clear_synced_caches()
+    event_cache.backend.clear()
+    # the pool belongs to the event loop of the test client
+    app_client.portal.call(follower.start, postgres.invalidations)
+    try:
+        yield "postgres"
+    finally:
+        repositories._repositories = sqlite
+        clear_synced_caches()
+        event_cache.backend.clear()
+        app_client.portal.call(postgres.close)
+        app_client.portal.call(follower.start, sqlite.invalidations)
+
+
+@pytest.fixture
+def client(app_client, backend):
+    return app_client
+
+
+@pytest.fixture
+def organization_id(client) -> int:
+    """A new organization, created by a new user who is its admin."""
+    response = client.post(
+        "/api/users",
+        json={
+            "email": f"admin{os.urandom(4).hex()}@example.com",
+            "first_name": "Org",
+            "last_name": "Admin",
+        },
+    )
+    assert response.status_code == 201, response.text
+    response = client.post(
+        "/api/organization",
+        json={"name": "Test organization", "user_id": response.json()["user_id"]},
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["organization_id"]
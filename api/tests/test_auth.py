@@ -0,0 +1,160 @@
+import asyncio
+import os
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from utils.auth import get_current_user, invalidate_user
+from utils.security import create_access_token
+
+PASSWORD = "Password123!"
+
+
+def signup(client) -> dict:
+    payload = {
+        "email": f"user{os.urandom(4).hex()}@example.com",
+        "first_name": "Test",
+        "last_name": "User",
+        "password": PASSWORD,
+    }
+    response = client.post("/api/auth/signup", json=payload)
+    assert response.status_code == 201, response.text
+    return {**response.json(), "password": PASSWORD}
+
+
+def login(client, email: str, password: str):
+    return client.post(
+        "/api/auth/login", data={"username": email, "password": password}
+    )
+
+
+def test_signup_and_login(client):
+    user = signup(client)
+
+    response = login(client, user["email"], PASSWORD)
+    assert response.status_code == 200, response.text
+    assert response.json()["token_type"] == "bearer"
+
+
+def test_signup_duplicate_email_conflicts(client):
+    user = signup(client)
+
+    response = client.post(
+        "/api/auth/signup",
+        json={
+            "email": user["email"],
+            "first_name": "Other",
+            "last_name": "User",
+            "password": PASSWORD,
+        },
+    )
+    assert response.status_code == 409
+
+
+def test_login_refuses_bad_credentials(client):
+    user = signup(client)
+
+    assert login(client, user["email"], "wrong password").status_code == 401
+    assert login(client, "nobody@example.com", PASSWORD).status_code == 401
+
+    # users created without a password can't log in
+    response = client.post(
+        "/api/users",
+        json={
+            "email": f"user{os.urandom(4).hex()}@example.com",
+            "first_name": "No",
+            "last_name": "Password",
+        },
+    )
+    assert response.status_code == 201, response.text
+    assert login(client, response.json()["email"], PASSWORD).status_code == 401
+
+
+def test_reset_password(client):
+    user = signup(client)
+    assert client.post(
+        "/api/auth/request-reset", json={"email": user["email"]}
+    ).json() == {"message": "If that email exists, a reset link has been sent"}
+
+    token = create_access_token(
+        {"sub": str(user["user_id"]), "purpose": "password_reset"}
+    )
+    response = client.post(
+        "/api/auth/reset-password",
+        json={"token": token, "new_password": "NewPassword456!"},
+    )
+    assert response.status_code == 200, response.text
+
+    assert login(client, user["email"], PASSWORD).status_code == 401
+    assert login(client, user["email"], "NewPassword456!").status_code == 200
+
+    # a login token can't reset the password
+    token = create_access_token({"sub": str(user["user_id"])})
+    response = client.post(
+        "/api/auth/reset-password", json={"token": token, "new_password": "x"}
+    )
+    assert response.status_code == 400
+
+
+def test_delete_account(client):
+    user = signup(client)
+    token = login(client, user["email"], PASSWORD).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.delete("/api/auth/delete-account", headers=headers)
+    assert response.status_code == 200, response.text
+
+    assert login(client, user["email"], PASSWORD).status_code == 401
+    assert client.get(f"/api/users/{user['user_id']}").status_code == 404
+    assert client.delete("/api/auth/delete-account", headers=headers).status_code == 401
+
+
+class CountingUsers:
+    """A user repository that counts the lookups get_current_user makes."""
+
+    def __init__(self, user_id: int):
+        self.row = {
+            "user_id": user_id,
+            "email": "cached@example.com",
+            "first_name": "Cached",
+            "last_name": "User",
+        }
+        self.lookups = 0
+
+    async def get_auth_user(self, user_id: int) -> dict | None:
+        self.lookups += 1
+        return self.row if user_id == self.row["user_id"] else None
+
+
+def test_current_user_is_cached_per_token():
+    user_id = int.from_bytes(os.urandom(3), "big")
+    repository = CountingUsers(user_id)
+    token = create_access_token({"sub": str(user_id)})
+
+    first = asyncio.run(get_current_user(token, repository))
+    second = asyncio.run(get_current_user(token, repository))
+    assert first == second == repository.row
+    assert repository.lookups == 1
+
+    # another token of the same user has its own entry
+    other = create_access_token({"sub": str(user_id)}, timedelta(minutes=5))
+    asyncio.run(get_current_user(other, repository))
+    assert repository.lookups == 2
+
+    invalidate_user(user_id)
+    asyncio.run(get_current_user(token, repository))
+    asyncio.run(get_current_user(other, repository))
+    assert repository.lookups == 4
+
+
+def test_expired_token_is_not_cached():
+    user_id = int.from_bytes(os.urandom(3), "big")
+    repository = CountingUsers(user_id)
+    token = create_access_token({"sub": str(user_id)}, timedelta(seconds=-1))
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(get_current_user(token, repository))
+        assert exc_info.value.status_code == 401
+    assert repository.lookups == 0
@@ -0,0 +1,174 @@
+import asyncio
+import os
+import time
+
+from utils.cache import ReadThroughCache, TTLCache
+from utils.entity_cache import event_cache
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(max_size=10, ttl=60)
+
+    cache.set("short", 1, ttl=0.01)
+    cache.set("long", 2)
+    # a per-entry ttl can't extend the cache wide one
+    cache.set("capped", 3, ttl=3600)
+    time.sleep(0.02)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    assert cache.get("capped") == 3
+    assert cache.stats()["expirations"] == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_delete_where():
+    cache = TTLCache(max_size=10, ttl=60)
+    for key in range(4):
+        cache.set(key, {"user_id": key % 2})
+
+    assert cache.delete_where(lambda _, value: value["user_id"] == 1) == 2
+    assert [cache.get(key) is not None for key in range(4)] == [
+        True,
+        False,
+        True,
+        False,
+    ]
+
+
+def counting_loader(value):
+    """A loader returning value, and the list of its calls."""
+    calls = []
+
+    def loader():
+        calls.append(value)
+        return value
+
+    return loader, calls
+
+
+def test_read_through_cache_is_keyed_on_the_version():
+    cache = ReadThroughCache("thing", TTLCache(max_size=10, ttl=60))
+    loader, calls = counting_loader({"name": "first"})
+
+    assert cache.get_or_load(1, loader, 'W/"1-0"') == {"name": "first"}
+    assert cache.get_or_load(1, loader, 'W/"1-0"') == {"name": "first"}
+    assert len(calls) == 1
+
+    # a write bumped the version, the entry is stale and loaded again
+    loader, calls = counting_loader({"name": "second"})
+    assert cache.get_or_load(1, loader, 'W/"1-1"') == {"name": "second"}
+    assert cache.get_or_load(1, loader, 'W/"1-1"') == {"name": "second"}
+    assert len(calls) == 1
+    assert cache.stats() == {"hits": 2, "misses": 2, "stale": 1, "invalidations": 0}
+
+
+def test_read_through_cache_invalidate():
+    cache = ReadThroughCache("thing", TTLCache(max_size=10, ttl=60))
+    loader, calls = counting_loader({"name": "first"})
+
+    cache.get_or_load(1, loader)
+    cache.invalidate(1)
+    cache.get_or_load(1, loader)
+
+    assert len(calls) == 2
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_read_through_cache_does_not_cache_none_or_long_lists():
+    cache = ReadThroughCache("thing", TTLCache(max_size=10, ttl=60), max_items=2)
+    missing, missing_calls = counting_loader(None)
+    long, long_calls = counting_loader([1, 2, 3])
+    short, short_calls = counting_loader([1, 2])
+
+    for _ in range(2):
+        assert cache.get_or_load("missing", missing) is None
+        assert cache.get_or_load("long", long) == [1, 2, 3]
+        assert cache.get_or_load("short", short) == [1, 2]
+
+    assert (len(missing_calls), len(long_calls), len(short_calls)) == (2, 2, 1)
+
+
+def test_read_through_cache_async():
+    backend = TTLCache(max_size=10, ttl=60)
+    events = ReadThroughCache("event", backend)
+    organizations = ReadThroughCache("organization", backend)
+    calls = []
+
+    async def load(value):
+        calls.append(value)
+        return value
+
+    async def load_both():
+        # caches sharing a backend don't see each other's entries for the same key
+        await events.get_or_load_async(1, lambda: load("event"))
+        await organizations.get_or_load_async(1, lambda: load("organization"))
+        return (
+            await events.get_or_load_async(1, lambda: load("event")),
+            await organizations.get_or_load_async(1, lambda: load("organization")),
+        )
+
+    assert asyncio.run(load_both()) == ("event", "organization")
+    assert calls == ["event", "organization"]
+
+
+def test_event_cache_sees_trigger_writes(client, organization_id):
+    response = client.post(
+        "/api/events",
+        json={
+            "name": "Beach cleanup",
+            "description": "Picking up litter",
+            "location": "Santa Monica",
+            "time": "2030-06-01T09:00:00",
+            "organization_id": organization_id,
+        },
+    )
+    assert response.status_code == 201, response.text
+    event_id = response.json()["id"]
+    url = f"/api/events/{event_id}"
+    before = event_cache.stats()
+
+    assert client.get(url).json()["registered_count"] == 0
+    assert client.get(url).json()["registered_count"] == 0
+    assert event_cache.stats()["hits"] - before["hits"] == 1
+
+    # the registration trigger bumps the event's version, the cached copy isn't served
+    response = client.post(
+        "/api/users",
+        json={
+            "email": f"user{os.urandom(4).hex()}@example.com",
+            "first_name": "Test",
+            "last_name": "User",
+        },
+    )
+    assert response.status_code == 201, response.text
+    response = client.post(
+        "/api/event-registrations",
+        json={
+            "user_id": response.json()["user_id"],
+            "event_id": event_id,
+            "organization_id": organization_id,
+            "registration_time": "2030-05-01T12:00:00",
+        },
+    )
+    assert response.status_code == 201, response.text
+    assert client.get(url).json()["registered_count"] == 1
+    assert event_cache.stats()["stale"] - before["stale"] == 1
+
+    # an update through the route invalidates the entry
+    response = client.put(url, json={"name": "Park cleanup"})
+    assert response.status_code == 200, response.text
+    assert client.get(url).json()["name"] == "Park cleanup"
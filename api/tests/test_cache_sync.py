@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+import main
+from repositories import get_repositories
+from utils.auth import user_cache
+from utils.cache_sync import CacheInvalidationFollower, prune_invalidations
+from utils.permissions import roles_cache
+
+
+@pytest.fixture
+def follower(client, monkeypatch):
+    """A follower of the invalidation log, the app's own stops polling meanwhile."""
+
+    async def no_sync(prune: bool = False) -> int:
+        return 0
+
+    monkeypatch.setattr(main, "sync_caches", no_sync)
+    follower = CacheInvalidationFollower()
+    client.portal.call(follower.start, get_repositories().invalidations)
+    return follower
+
+
+def poll(client, follower) -> int:
+    return client.portal.call(follower.poll, get_repositories().invalidations)
+
+
+def create_user(client) -> int:
+    response = client.post(
+        "/api/users",
+        json={
+            "email": f"user{os.urandom(4).hex()}@example.com",
+            "first_name": "Test",
+            "last_name": "User",
+        },
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["user_id"]
+
+
+def add_member(client, organization_id: int, user_id: int) -> None:
+    response = client.post(
+        f"/api/organization/{organization_id}/users",
+        json={"user_id": user_id, "permission_level": "volunteer"},
+    )
+    assert response.status_code == 201, response.text
+
+
+def signup_and_delete(client) -> int:
+    """A user who signs up and deletes their account, returns their id."""
+    payload = {
+        "email": f"user{os.urandom(4).hex()}@example.com",
+        "first_name": "Test",
+        "last_name": "User",
+        "password": "Password123!",
+    }
+    response = client.post("/api/auth/signup", json=payload)
+    assert response.status_code == 201, response.text
+    user_id = response.json()["user_id"]
+    response = client.post(
+        "/api/auth/login",
+        data={"username": payload["email"], "password": payload["password"]},
+    )
+    assert response.status_code == 200, response.text
+    response = client.delete(
+        "/api/auth/delete-account",
+        headers={"Authorization": f"Bearer {response.json()['access_token']}"},
+    )
+    assert response.status_code == 200, response.text
+    return user_id
+
+
+def test_follower_drops_logged_entries(client, follower, organization_id):
+    member_id = create_user(client)
+    other_id = create_user(client)
+    add_member(client, organization_id, member_id)
+    deleted_id = signup_and_delete(client)
+
+    # cached again after the routes dropped them, as in another worker
+    roles_cache.set(member_id, {})
+    roles_cache.set(other_id, {})
+    user_cache.set(b"deleted token", {"user_id": deleted_id})
+    user_cache.set(b"other token", {"user_id": other_id})
+
+    # the role insert, and the user and credentials deletes
+    assert poll(client, follower) >= 3
+    assert roles_cache.get(member_id) is None
+    assert user_cache.get(b"deleted token") is None
+    assert roles_cache.get(other_id) == {}
+    assert user_cache.get(b"other token") == {"user_id": other_id}
+    assert follower.stats()["resets"] == 0
+    assert poll(client, follower) == 0
+
+
+def test_follower_clears_the_caches_after_a_prune(client, follower, organization_id):
+    add_member(client, organization_id, create_user(client))
+    # pruned before this follower read it, then more changes are logged
+    client.portal.call(prune_invalidations, get_repositories().invalidations, -3600)
+    add_member(client, organization_id, create_user(client))
+
+    other_id = create_user(client)
+    roles_cache.set(other_id, {})
+    user_cache.set(b"other token", {"user_id": other_id})
+
+    assert poll(client, follower) == 1
+    # any entry may be stale, even the ones no logged change names
+    assert roles_cache.get(other_id) is None
+    assert user_cache.get(b"other token") is None
+    assert follower.stats()["resets"] == 1
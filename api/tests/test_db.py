@@ -0,0 +1,193 @@
+import os
+import sqlite3
+
+import pytest
+
+import db
+from db import ConnectionPool, PoolTimeoutError, run_primary, run_read
+from utils.snapshot_db import snapshot
+from utils.metrics import Metric, db_statement_duration
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "pool.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+    return path
+
+
+def test_pool_reuses_connections(database):
+    pool = ConnectionPool(database, size=2)
+
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+
+    stats = pool.stats()
+    assert stats["opened"] == 1
+    assert stats["checkouts"] == 2
+    assert stats["in_use"] == 0
+    pool.close()
+
+
+def test_pool_times_out_when_exhausted(database):
+    pool = ConnectionPool(database, size=1, timeout=0.01)
+
+    with pool.connection():
+        with pytest.raises(PoolTimeoutError):
+            pool.acquire()
+
+    assert pool.stats()["timeouts"] == 1
+    # the connection is free again once released
+    with pool.connection():
+        pass
+    pool.close()
+
+
+def test_release_rolls_back_an_open_transaction(database):
+    pool = ConnectionPool(database, size=1)
+
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO items (id) VALUES (1)")
+        assert conn.in_transaction
+    with pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+    pool.close()
+
+
+def test_read_only_pool_refuses_writes(database):
+    pool = ConnectionPool(database, size=1, read_only=True)
+
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO items (id) VALUES (1)")
+    pool.close()
+
+
+def profiled_statements() -> dict[str, int]:
+    """The number of times each statement shape was profiled."""
+    return {
+        labels[0]: count
+        for suffix, _, labels, count in db_statement_duration.samples()
+        if suffix == "_count"
+    }
+
+
+def test_pool_profiles_only_the_callers_statements(database):
+    before = profiled_statements()
+    pool = ConnectionPool(database, size=1)
+
+    for _ in range(2):
+        with pool.connection() as conn:
+            conn.execute("SELECT COUNT(*) FROM items").fetchone()
+    pool.close()
+
+    after = profiled_statements()
+    changed = {
+        statement: count - before.get(statement, 0)
+        for statement, count in after.items()
+        if count != before.get(statement, 0)
+    }
+    # the PRAGMAs of the new connection and the health check aren't profiled
+    assert changed == {"SELECT COUNT(*) FROM items": 2}
+
+
+def test_metric_needs_samples():
+    with pytest.raises(TypeError):
+        Metric("incomplete", "A metric without samples.")
+
+
+def test_pool_timeout_is_a_503(client, backend, monkeypatch):
+    if backend != "sqlite":
+        pytest.skip("the sqlite connection pools")
+    pool = ConnectionPool(db.DB_READ_PATH, size=1, timeout=0.01, read_only=True)
+    monkeypatch.setattr(db, "_read_pool", pool)
+
+    held = pool.acquire()
+    try:
+        response = client.get("/api/users/1")
+    finally:
+        pool.release(held)
+        pool.close()
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+@pytest.fixture
+def read_snapshot(backend, tmp_path, monkeypatch):
+    """Serve the reads from a snapshot of the database, like DB_READ_PATH does."""
+    if backend != "sqlite":
+        pytest.skip("the sqlite read pool")
+    path = tmp_path / "snapshot.db"
+    snapshot(str(db.DATABASE_PATH), path)
+    pool = ConnectionPool(path, size=2, read_only=True)
+    monkeypatch.setattr(db, "_read_pool", pool)
+    yield path
+    pool.close()
+
+
+def create_table(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")
+
+
+def count_users(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+def test_reads_go_to_the_read_pool(client, read_snapshot):
+    with pytest.raises(sqlite3.OperationalError):
+        client.portal.call(run_read, create_table)
+
+    response = client.post(
+        "/api/users",
+        json={
+            "email": f"user{os.urandom(4).hex()}@example.com",
+            "first_name": "Test",
+            "last_name": "User",
+        },
+    )
+    assert response.status_code == 201, response.text
+
+    # the write isn't in the snapshot, run_primary sees it
+    assert client.get(f"/api/users/{response.json()['user_id']}").status_code == 404
+    read = client.portal.call(run_read, count_users)
+    assert client.portal.call(run_primary, count_users) == read + 1
+
+
+def test_auth_reads_the_primary(client, read_snapshot):
+    payload = {
+        "email": f"admin{os.urandom(4).hex()}@example.com",
+        "first_name": "Org",
+        "last_name": "Admin",
+        "password": "Password123!",
+    }
+    response = client.post("/api/auth/signup", json=payload)
+    assert response.status_code == 201, response.text
+    user_id = response.json()["user_id"]
+    response = client.post(
+        "/api/organization", json={"name": "Replica", "user_id": user_id}
+    )
+    assert response.status_code == 201, response.text
+    organization_id = response.json()["organization_id"]
+
+    # neither the user nor their organization are in the snapshot yet, the login, the
+    # signed in user and their admin role are read from the primary
+    response = client.post(
+        "/api/auth/login",
+        data={"username": payload["email"], "password": payload["password"]},
+    )
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert client.get(f"/api/organization/{organization_id}").status_code == 404
+    response = client.get(
+        "/api/events/export",
+        params={"organization_id": organization_id},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    assert response.text == ""
@@ -0,0 +1,252 @@
+import os
+
+
+def create_user(client) -> int:
+    response = client.post(
+        "/api/users",
+        json={
+            "email": f"user{os.urandom(4).hex()}@example.com",
+            "first_name": "Test",
+            "last_name": "User",
+        },
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["user_id"]
+
+
+def create_event(client, organization_id: int, **fields) -> int:
+    response = client.post(
+        "/api/events",
+        json={
+            "name": "Beach cleanup",
+            "description": "Picking up litter",
+            "location": "Santa Monica",
+            "time": "2030-06-01T09:00:00",
+            "organization_id": organization_id,
+            **fields,
+        },
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def registration(user_id: int, event_id: int, organization_id: int, **fields) -> dict:
+    return {
+        "user_id": user_id,
+        "event_id": event_id,
+        "organization_id": organization_id,
+        "registration_time": "2030-05-01T12:00:00",
+        **fields,
+    }
+
+
+def test_create_get_and_delete_registration(client, organization_id):
+    event_id = create_event(client, organization_id)
+    user_id = create_user(client)
+    payload = registration(user_id, event_id, organization_id)
+    url = f"/api/event-registrations/{organization_id}/{event_id}/{user_id}"
+
+    response = client.post("/api/event-registrations", json=payload)
+    assert response.status_code == 201, response.text
+    assert client.get(url).json() == payload
+    assert client.get(f"/api/events/{event_id}").json()["registered_count"] == 1
+
+    response = client.post("/api/event-registrations", json=payload)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Registration already exists"
+
+    response = client.delete(url)
+    assert response.status_code == 200, response.text
+    assert response.json() == payload
+    assert client.get(url).status_code == 404
+    assert client.delete(url).status_code == 404
+    assert client.get(f"/api/events/{event_id}").json()["registered_count"] == 0
+
+
+def test_list_registrations_newest_first(client, organization_id):
+    event_id = create_event(client, organization_id)
+    times = [f"2030-05-0{day}T12:00:00" for day in (2, 1, 3)]
+    for time in times:
+        response = client.post(
+            "/api/event-registrations",
+            json=registration(
+                create_user(client),
+                event_id,
+                organization_id,
+                registration_time=time,
+            ),
+        )
+        assert response.status_code == 201, response.text
+
+    listed = []
+    params = {"event_id": event_id, "limit": 2}
+    while True:
+        response = client.get("/api/event-registrations", params=params)
+        assert response.status_code == 200, response.text
+        listed += response.json()
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        params["cursor"] = cursor
+
+    assert [r["registration_time"] for r in listed] == sorted(times, reverse=True)
+
+
+def test_bulk_registrations(client, organization_id):
+    event_id = create_event(client, organization_id)
+    user_ids = [create_user(client) for _ in range(2)]
+
+    response = client.post(
+        "/api/event-registrations/bulk",
+        json=[registration(user_id, event_id, organization_id) for user_id in user_ids],
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == {"created": 2, "conflicts": []}
+    assert client.get(f"/api/events/{event_id}").json()["registered_count"] == 2
+
+
+def test_bulk_registrations_report_conflicts(client, organization_id):
+    event_id = create_event(client, organization_id)
+    full_event_id = create_event(client, organization_id, capacity=1)
+    registered, new, late = (create_user(client) for _ in range(3))
+    response = client.post(
+        "/api/event-registrations",
+        json=registration(registered, event_id, organization_id),
+    )
+    assert response.status_code == 201, response.text
+
+    response = client.post(
+        "/api/event-registrations/bulk",
+        json=[
+            registration(registered, event_id, organization_id),
+            registration(new, event_id, organization_id),
+            # the same registration twice in one request
+            registration(new, event_id, organization_id),
+            registration(new, full_event_id, organization_id),
+            registration(late, full_event_id, organization_id),
+        ],
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == {
+        "created": 2,
+        "conflicts": [
+            {"index": 0, "detail": "Registration already exists"},
+            {"index": 2, "detail": "Registration already exists"},
+            {"index": 4, "detail": "Event is full"},
+        ],
+    }
+    assert client.get(f"/api/events/{event_id}").json()["registered_count"] == 2
+    assert client.get(f"/api/events/{full_event_id}").json()["registered_count"] == 1
+
+
+def test_waitlist_needs_a_full_event(client, organization_id):
+    event_id = create_event(client, organization_id, capacity=5)
+    payload = {
+        "user_id": create_user(client),
+        "event_id": event_id,
+        "organization_id": organization_id,
+    }
+
+    response = client.post("/api/event-registrations/waitlist", json=payload)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Event is not full"
+
+    response = client.post(
+        "/api/event-registrations/waitlist", json={**payload, "event_id": 999999}
+    )
+    assert response.status_code == 404
+    url = f"/api/event-registrations/waitlist/{organization_id}/{event_id}/{payload['user_id']}"
+    assert client.delete(url).status_code == 404
+
+
+def register(client, user_id: int, event_id: int, organization_id: int):
+    return client.post(
+        "/api/event-registrations",
+        json=registration(user_id, event_id, organization_id),
+    )
+
+
+def join_waitlist(client, user_id: int, event_id: int, organization_id: int):
+    return client.post(
+        "/api/event-registrations/waitlist",
+        json={
+            "user_id": user_id,
+            "event_id": event_id,
+            "organization_id": organization_id,
+        },
+    )
+
+
+def waitlisted(client, event_id: int) -> list[int]:
+    response = client.get(
+        "/api/event-registrations/waitlist", params={"event_id": event_id}
+    )
+    assert response.status_code == 200, response.text
+    return [entry["user_id"] for entry in response.json()]
+
+
+def registered_count(client, event_id: int) -> int:
+    return client.get(f"/api/events/{event_id}").json()["registered_count"]
+
+
+def test_full_event_refuses_registrations(client, organization_id):
+    event_id = create_event(client, organization_id, capacity=1)
+
+    assert (
+        register(client, create_user(client), event_id, organization_id).status_code
+        == 201
+    )
+    response = register(client, create_user(client), event_id, organization_id)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Event is full"
+    assert registered_count(client, event_id) == 1
+
+
+def test_waitlist_is_promoted_when_a_spot_frees(client, organization_id):
+    event_id = create_event(client, organization_id, capacity=1)
+    registered, first, second = (create_user(client) for _ in range(3))
+    assert register(client, registered, event_id, organization_id).status_code == 201
+
+    for user_id in (first, second):
+        response = join_waitlist(client, user_id, event_id, organization_id)
+        assert response.status_code == 201, response.text
+    assert waitlisted(client, event_id) == [first, second]
+
+    response = join_waitlist(client, first, event_id, organization_id)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Already on the waitlist"
+    response = join_waitlist(client, registered, event_id, organization_id)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Registration already exists"
+
+    # the first user on the waitlist takes the freed spot
+    url = f"/api/event-registrations/{organization_id}/{event_id}"
+    assert client.delete(f"{url}/{registered}").status_code == 200
+    assert client.get(f"{url}/{first}").status_code == 200
+    assert client.get(f"{url}/{second}").status_code == 404
+    assert waitlisted(client, event_id) == [second]
+    assert registered_count(client, event_id) == 1
+
+
+def test_waitlist_is_promoted_when_the_capacity_is_raised(client, organization_id):
+    event_id = create_event(client, organization_id, capacity=1)
+    registered, first, second, third = (create_user(client) for _ in range(4))
+    assert register(client, registered, event_id, organization_id).status_code == 201
+    for user_id in (first, second, third):
+        response = join_waitlist(client, user_id, event_id, organization_id)
+        assert response.status_code == 201, response.text
+
+    response = client.put(f"/api/events/{event_id}", json={"capacity": 3})
+    assert response.status_code == 200, response.text
+
+    url = f"/api/event-registrations/{organization_id}/{event_id}"
+    assert client.get(f"{url}/{first}").status_code == 200
+    assert client.get(f"{url}/{second}").status_code == 200
+    assert waitlisted(client, event_id) == [third]
+    assert registered_count(client, event_id) == 3
+
+    # removing the capacity registers everyone left
+    response = client.put(f"/api/events/{event_id}", json={"capacity": None})
+    assert response.status_code == 200, response.text
+    assert client.get(f"{url}/{third}").status_code == 200
+    assert waitlisted(client, event_id) == []
@@ -0,0 +1,170 @@
+import os
+
+
+def create_event(client, organization_id: int, **fields) -> dict:
+    payload = {
+        "name": "Beach cleanup",
+        "description": "Picking up litter",
+        "location": "Santa Monica",
+        "time": "2030-06-01T09:00:00",
+        "organization_id": organization_id,
+        **fields,
+    }
+    response = client.post("/api/events", json=payload)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_add_and_get_event(client, organization_id):
+    event = create_event(client, organization_id, capacity=10)
+
+    response = client.get(f"/api/events/{event['id']}")
+    assert response.status_code == 200
+    assert response.json() == {**event, "registered_count": 0}
+
+
+def test_get_missing_event(client):
+    assert client.get("/api/events/999999").status_code == 404
+
+
+def test_list_events_pages_in_time_order(client, organization_id):
+    times = [f"2030-06-0{day}T09:00:00" for day in (3, 1, 2, 5, 4)]
+    for time in times:
+        create_event(client, organization_id, time=time)
+
+    listed = []
+    params = {"organization_id": organization_id, "limit": 2}
+    while True:
+        response = client.get("/api/events", params=params)
+        assert response.status_code == 200, response.text
+        listed += response.json()
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        params["cursor"] = cursor
+
+    assert [event["time"] for event in listed] == sorted(times)
+
+
+def test_list_events_filters(client, organization_id):
+    # 2030-06-01 is a saturday
+    saturday_morning = create_event(client, organization_id, time="2030-06-01T09:00:00")
+    create_event(client, organization_id, time="2030-06-03T09:00:00")
+    monday_evening = create_event(client, organization_id, time="2030-06-03T19:00:00")
+
+    def listed_ids(**params) -> list[int]:
+        response = client.get(
+            "/api/events", params={"organization_id": organization_id, **params}
+        )
+        assert response.status_code == 200, response.text
+        return [event["id"] for event in response.json()]
+
+    assert listed_ids(weekend_only=True) == [saturday_morning["id"]]
+    assert listed_ids(time_of_day="Evenings") == [monday_evening["id"]]
+    # the weekend and the times of day are alternatives
+    assert listed_ids(time_of_day="Evenings", weekend_only=True) == [
+        saturday_morning["id"],
+        monday_evening["id"],
+    ]
+    assert listed_ids(start="2030-06-03T12:00:00") == [monday_evening["id"]]
+    assert listed_ids(end="2030-06-02T00:00:00") == [saturday_morning["id"]]
+
+
+def test_list_events_scope(client, organization_id):
+    event = create_event(client, organization_id)
+    admin_id = client.get(f"/api/organization/{organization_id}").json()[
+        "created_by_user_id"
+    ]
+
+    for scope in ("myOrgs", "admin"):
+        response = client.get(
+            "/api/events", params={"scope": scope, "user_id": admin_id}
+        )
+        assert response.status_code == 200, response.text
+        assert [e["id"] for e in response.json()] == [event["id"]]
+
+    response = client.get("/api/events", params={"scope": "admin"})
+    assert response.status_code == 400
+
+
+def test_search_events(client, organization_id):
+    event = create_event(
+        client, organization_id, name="Tidepool survey", location="Malibu"
+    )
+    create_event(client, organization_id, name="Food drive", location="Pasadena")
+
+    response = client.get(
+        "/api/events/search",
+        params={"q": "tidepool", "organization_id": organization_id},
+    )
+    assert response.status_code == 200, response.text
+    assert [e["id"] for e in response.json()] == [event["id"]]
+
+    response = client.get(
+        "/api/events/search",
+        params={"location": "mali", "organization_id": organization_id},
+    )
+    assert [e["id"] for e in response.json()] == [event["id"]]
+
+    assert client.get("/api/events/search").status_code == 400
+
+
+def test_search_events_cursor_crosses_pages(client, organization_id):
+    word = f"Plover{os.urandom(3).hex()}"
+    # ties on the rank are paged by id
+    created = [create_event(client, organization_id, name=word)["id"] for _ in range(3)]
+    best = create_event(client, organization_id, name=word, description=word)["id"]
+
+    pages = []
+    params = {"q": word, "limit": 2}
+    while True:
+        response = client.get("/api/events/search", params=params)
+        assert response.status_code == 200, response.text
+        pages.append([e["id"] for e in response.json()])
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        params["cursor"] = cursor
+
+    assert pages == [[best, created[0]], created[1:]]
+
+
+def test_get_event_not_modified(client, organization_id):
+    event = create_event(client, organization_id)
+    url = f"/api/events/{event['id']}"
+    etag = client.get(url).headers["etag"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    response = client.put(url, json={"name": "Park cleanup"})
+    assert response.status_code == 200, response.text
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Park cleanup"
+
+
+def test_update_event(client, organization_id):
+    event = create_event(client, organization_id, capacity=5)
+    url = f"/api/events/{event['id']}"
+
+    response = client.put(url, json={"location": "Venice", "capacity": None})
+    assert response.status_code == 200, response.text
+    assert response.json() == {
+        **event,
+        "location": "Venice",
+        "capacity": None,
+        "registered_count": 0,
+    }
+    assert client.get(url).json() == response.json()
+
+    assert client.put("/api/events/999999", json={"name": "x"}).status_code == 404
+
+
+def test_delete_event(client, organization_id):
+    event = create_event(client, organization_id)
+    url = f"/api/events/{event['id']}"
+
+    assert client.delete(url).status_code == 204
+    assert client.get(url).status_code == 404
+    assert client.delete(url).status_code == 404
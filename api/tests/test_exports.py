@@ -0,0 +1,189 @@
+import csv
+import io
+import json
+import os
+
+import pytest
+
+
+def signup(client) -> tuple[dict, dict]:
+    """A new user, returns them and the headers authenticating as them."""
+    payload = {
+        "email": f"export{os.urandom(4).hex()}@example.com",
+        "first_name": "Export",
+        "last_name": "User",
+        "password": "Password123!",
+    }
+    response = client.post("/api/auth/signup", json=payload)
+    assert response.status_code == 201, response.text
+    user = client.get(f"/api/users/{response.json()['user_id']}").json()
+    response = client.post(
+        "/api/auth/login",
+        data={"username": payload["email"], "password": payload["password"]},
+    )
+    assert response.status_code == 200, response.text
+    return user, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def admin(client) -> tuple[dict, dict, int]:
+    """A signed in user, the headers authenticating as them and their organization."""
+    user, headers = signup(client)
+    response = client.post(
+        "/api/organization", json={"name": "Exports", "user_id": user["user_id"]}
+    )
+    assert response.status_code == 201, response.text
+    return user, headers, response.json()["organization_id"]
+
+
+def create_event(client, organization_id: int, time: str) -> dict:
+    response = client.post(
+        "/api/events",
+        json={
+            "name": "Beach cleanup",
+            "description": "Picking up litter",
+            "location": "Santa Monica",
+            "time": time,
+            "organization_id": organization_id,
+        },
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def ndjson_rows(response) -> list[dict]:
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def csv_rows(response) -> list[dict]:
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    return list(csv.DictReader(io.StringIO(response.text)))
+
+
+def test_exports_need_a_signed_in_user(client):
+    for url in (
+        "/api/users/export",
+        "/api/events/export",
+        "/api/event-registrations/export",
+    ):
+        assert client.get(url).status_code == 401
+
+
+def test_export_users(client):
+    _, headers = signup(client)
+    response = client.post(
+        "/api/users",
+        json={
+            "email": f"export{os.urandom(4).hex()}@example.com",
+            "first_name": "Export",
+            "last_name": "User",
+            "availability": "Weekends",
+        },
+    )
+    assert response.status_code == 201, response.text
+    user = response.json()
+
+    response = client.get(
+        "/api/users/export",
+        params={"format": "ndjson", "availability": "Weekends"},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    rows = ndjson_rows(response)
+    assert user in rows
+    assert all(row["availability"] == "Weekends" for row in rows)
+
+    response = client.get(
+        "/api/users/export", params={"format": "csv"}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["content-disposition"] == 'attachment; filename="users.csv"'
+    rows = csv_rows(response)
+    assert {**user, "user_id": str(user["user_id"])} in rows
+    assert [int(row["user_id"]) for row in rows] == sorted(
+        int(row["user_id"]) for row in rows
+    )
+
+
+def test_export_events_of_an_organization(client, admin):
+    _, headers, organization_id = admin
+    later = create_event(client, organization_id, "2030-06-02T09:00:00")
+    earlier = create_event(client, organization_id, "2030-06-01T09:00:00")
+    params = {"organization_id": organization_id}
+
+    response = client.get(
+        "/api/events/export", params={**params, "format": "ndjson"}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    assert [row["id"] for row in ndjson_rows(response)] == [earlier["id"], later["id"]]
+
+    response = client.get(
+        "/api/events/export", params={**params, "format": "csv"}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    rows = csv_rows(response)
+    assert [row["id"] for row in rows] == [str(earlier["id"]), str(later["id"])]
+    assert rows[0]["time"] == "2030-06-01T09:00:00"
+
+    # an empty export still has its header
+    response = client.get(
+        "/api/events/export",
+        params={**params, "format": "csv", "start": "2040-01-01T00:00:00"},
+        headers=headers,
+    )
+    assert response.text.splitlines()[0].startswith("id,name,")
+    assert csv_rows(response) == []
+
+    _, volunteer_headers = signup(client)
+    response = client.get(
+        "/api/events/export", params=params, headers=volunteer_headers
+    )
+    assert response.status_code == 403
+
+
+def test_export_registrations(client, admin):
+    _, headers, organization_id = admin
+    event = create_event(client, organization_id, "2030-06-01T09:00:00")
+    attendee, attendee_headers = signup(client)
+    response = client.post(
+        "/api/event-registrations",
+        json={
+            "user_id": attendee["user_id"],
+            "event_id": event["id"],
+            "organization_id": organization_id,
+            "registration_time": "2030-05-01T12:00:00",
+        },
+    )
+    assert response.status_code == 201, response.text
+    expected = {
+        "user_id": attendee["user_id"],
+        "event_id": event["id"],
+        "organization_id": organization_id,
+        "registration_time": "2030-05-01T12:00:00",
+        "email": attendee["email"],
+        "first_name": "Export",
+        "last_name": "User",
+    }
+
+    response = client.get(
+        "/api/event-registrations/export",
+        params={"organization_id": organization_id},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    assert ndjson_rows(response) == [expected]
+
+    # an attendee can export their own registrations, not the organization's
+    response = client.get(
+        "/api/event-registrations/export",
+        params={"user_id": attendee["user_id"], "format": "csv"},
+        headers=attendee_headers,
+    )
+    assert response.status_code == 200, response.text
+    assert csv_rows(response) == [{key: str(value) for key, value in expected.items()}]
+    for params in ({"organization_id": organization_id}, {"event_id": event["id"]}):
+        response = client.get(
+            "/api/event-registrations/export", params=params, headers=attendee_headers
+        )
+        assert response.status_code == 403
@@ -0,0 +1,119 @@
+import io
+import json
+import os
+
+from repositories import get_import_repository
+from utils.bulk_import import import_records
+
+
+def test_import_users_csv(client):
+    emails = [f"import{os.urandom(4).hex()}@example.com" for _ in range(2)]
+    content = "email,first_name,last_name\n" + "".join(
+        f"{email},Imported,User\n" for email in emails
+    )
+
+    response = client.post(
+        "/api/import/users", files={"file": ("users.csv", content, "text/csv")}
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == {"inserted": 2, "failed": 0, "errors": []}
+
+    response = client.get("/api/users", params={"query": "Imported", "limit": 200})
+    assert set(emails) <= {user["email"] for user in response.json()}
+
+
+def test_import_needs_a_known_format(client):
+    response = client.post(
+        "/api/import/users", files={"file": ("users.txt", "", "text/plain")}
+    )
+    assert response.status_code == 400
+
+
+def test_import_users_csv_reports_bad_rows(client):
+    existing = f"import{os.urandom(4).hex()}@example.com"
+    response = client.post(
+        "/api/users",
+        json={"email": existing, "first_name": "Already", "last_name": "Here"},
+    )
+    assert response.status_code == 201, response.text
+    emails = [f"import{os.urandom(4).hex()}@example.com" for _ in range(2)]
+    content = (
+        "email,first_name,last_name\n"
+        f"{emails[0]},Imported,User\n"
+        "not an email,Imported,User\n"
+        f"{existing},Imported,User\n"
+        f"{emails[1]},Imported,User,extra\n"
+        f"{emails[1]},Imported,User\n"
+    )
+
+    response = client.post(
+        "/api/import/users", files={"file": ("users.csv", content, "text/csv")}
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["inserted"], result["failed"]) == (2, 3)
+    assert [error["row"] for error in result["errors"]] == [2, 3, 4]
+    assert result["errors"][0]["detail"].startswith("email:")
+    assert result["errors"][2]["detail"] == "More values than columns in the header"
+
+    response = client.get("/api/users", params={"query": "Imported", "limit": 200})
+    assert set(emails) <= {user["email"] for user in response.json()}
+
+
+def test_import_events_ndjson_reports_bad_rows(client, organization_id):
+    event = {
+        "name": "Imported cleanup",
+        "description": "Picking up litter",
+        "location": "Venice",
+        "time": "2030-07-01T09:00:00",
+        "organization_id": organization_id,
+    }
+    lines = [
+        json.dumps(event),
+        "{not json",
+        # blank lines are skipped without counting as a row
+        "",
+        json.dumps([event]),
+        json.dumps({**event, "name": None}),
+        json.dumps({**event, "organization_id": 999999}),
+        json.dumps({**event, "time": "2030-07-02T09:00:00"}),
+    ]
+
+    response = client.post(
+        "/api/import/events",
+        files={"file": ("events.ndjson", "\n".join(lines), "application/x-ndjson")},
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["inserted"], result["failed"]) == (2, 4)
+    assert [error["row"] for error in result["errors"]] == [2, 3, 4, 5]
+    assert result["errors"][0]["detail"].startswith("Invalid JSON")
+    assert result["errors"][1]["detail"] == "Expected a JSON object"
+    assert result["errors"][2]["detail"].startswith("name:")
+
+    response = client.get("/api/events", params={"organization_id": organization_id})
+    assert [e["time"] for e in response.json()] == [
+        "2030-07-01T09:00:00",
+        "2030-07-02T09:00:00",
+    ]
+
+
+def test_import_keeps_the_rest_of_a_failed_chunk(client):
+    existing = f"import{os.urandom(4).hex()}@example.com"
+    emails = [f"import{os.urandom(4).hex()}@example.com" for _ in range(3)]
+    content = "".join(
+        json.dumps({"email": email, "first_name": "Chunked", "last_name": "User"})
+        + "\n"
+        for email in [emails[0], existing, existing, emails[1], emails[2]]
+    )
+
+    result = client.portal.call(
+        import_records,
+        get_import_repository(),
+        "users",
+        io.BytesIO(content.encode("utf-8")),
+        "ndjson",
+        2,
+    )
+    assert (result.inserted, result.failed) == (4, 1)
+    assert [error.row for error in result.errors] == [3]
@@ -0,0 +1,152 @@
+import os
+
+
+def create_user(client) -> int:
+    response = client.post(
+        "/api/users",
+        json={
+            "email": f"user{os.urandom(4).hex()}@example.com",
+            "first_name": "Test",
+            "last_name": "User",
+        },
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["user_id"]
+
+
+def create_organization(client, user_id: int, **fields) -> dict:
+    response = client.post(
+        "/api/organization",
+        json={"name": "Food bank", "user_id": user_id, **fields},
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_create_and_get_organization(client):
+    user_id = create_user(client)
+    organization = create_organization(client, user_id, description="Groceries")
+
+    response = client.get(f"/api/organization/{organization['organization_id']}")
+    assert response.status_code == 200, response.text
+    assert response.json() == {
+        **organization,
+        "description": "Groceries",
+        "created_by_user_id": user_id,
+    }
+
+    # the creator is the organization's admin
+    response = client.get(f"/api/organization/{organization['organization_id']}/users")
+    assert [(m["user_id"], m["permission_level"]) for m in response.json()] == [
+        (user_id, "admin")
+    ]
+
+
+def test_create_organization_for_missing_user(client):
+    response = client.post(
+        "/api/organization", json={"name": "Nobody's", "user_id": 999999}
+    )
+    assert response.status_code == 404
+    assert client.get("/api/organization/999999").status_code == 404
+
+
+def test_list_and_search_organizations(client):
+    name = f"Quokka{os.urandom(3).hex()}"
+    organization = create_organization(client, create_user(client), name=name)
+
+    response = client.get("/api/organization", params={"limit": 200})
+    assert response.status_code == 200, response.text
+    assert organization["organization_id"] in [
+        o["organization_id"] for o in response.json()
+    ]
+
+    response = client.get("/api/organization", params={"query": name})
+    assert [o["organization_id"] for o in response.json()] == [
+        organization["organization_id"]
+    ]
+
+
+def test_update_organization(client):
+    admin_id = create_user(client)
+    organization = create_organization(client, admin_id)
+    url = f"/api/organization/{organization['organization_id']}"
+
+    response = client.put(url, json={"user_id": create_user(client), "name": "Taken"})
+    assert response.status_code == 403
+
+    response = client.put(url, json={"user_id": admin_id, "name": "Pantry"})
+    assert response.status_code == 200, response.text
+    assert response.json() == {**organization, "name": "Pantry"}
+    assert client.get(url).json()["name"] == "Pantry"
+
+    response = client.put(
+        "/api/organization/999999", json={"user_id": admin_id, "name": "x"}
+    )
+    assert response.status_code == 404
+
+
+def test_delete_organization(client):
+    admin_id = create_user(client)
+    organization = create_organization(client, admin_id)
+    url = f"/api/organization/{organization['organization_id']}"
+
+    response = client.delete(url, params={"user_id": create_user(client)})
+    assert response.status_code == 403
+
+    response = client.delete(url, params={"user_id": admin_id})
+    assert response.status_code == 200, response.text
+    response = client.get(url)
+    assert response.status_code == 404
+    assert "etag" not in response.headers
+    response = client.get(f"{url}/users")
+    assert response.json() == []
+    assert "etag" not in response.headers
+
+
+def test_get_organization_not_modified(client):
+    organization = create_organization(client, create_user(client))
+    url = f"/api/organization/{organization['organization_id']}"
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    etag, modified_at = response.headers["etag"], response.headers["last-modified"]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": "*"}).status_code == 304
+    assert (
+        client.get(url, headers={"If-Modified-Since": modified_at}).status_code == 304
+    )
+
+    # a missing organization is a 404 whatever the client has cached
+    response = client.get("/api/organization/999999", headers={"If-None-Match": "*"})
+    assert response.status_code == 404
+
+
+def test_add_and_remove_members(client):
+    organization = create_organization(client, create_user(client))
+    url = f"/api/organization/{organization['organization_id']}/users"
+    volunteer_id = create_user(client)
+
+    response = client.post(
+        url, json={"user_id": volunteer_id, "permission_level": "volunteer"}
+    )
+    assert response.status_code == 201, response.text
+    assert response.json() == {
+        "user_id": volunteer_id,
+        "organization_id": organization["organization_id"],
+        "name": "Test User",
+        "permission_level": "volunteer",
+    }
+
+    response = client.post(
+        url, json={"user_id": volunteer_id, "permission_level": "admin"}
+    )
+    assert response.status_code == 409
+    response = client.post(url, json={"user_id": 999999, "permission_level": "admin"})
+    assert response.status_code == 404
+
+    assert volunteer_id in [m["user_id"] for m in client.get(url).json()]
+    response = client.delete(f"{url}/{volunteer_id}")
+    assert response.status_code == 200, response.text
+    assert response.json()["permission_level"] == "volunteer"
+    assert volunteer_id not in [m["user_id"] for m in client.get(url).json()]
+    assert client.delete(f"{url}/{volunteer_id}").status_code == 404
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from utils.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("2030-06-01T09:00:00", 42)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, str, int) == ["2030-06-01T09:00:00", 42]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        encode_cursor(42),
+        encode_cursor("2030-06-01T09:00:00", "42"),
+        # a bool is an int to python, but not a valid id
+        encode_cursor("2030-06-01T09:00:00", True),
+    ],
+)
+def test_invalid_cursor_is_refused(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor, str, int)
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "url, params",
+    [
+        ("/api/users", {"cursor": "not a cursor"}),
+        ("/api/users", {"limit": 0}),
+        ("/api/users", {"skip": -1}),
+        ("/api/users", {"skip": 2, "cursor": encode_cursor(1)}),
+        ("/api/events", {"cursor": encode_cursor(1)}),
+        ("/api/events", {"limit": 201}),
+        ("/api/organization", {"cursor": encode_cursor("1")}),
+    ],
+)
+def test_invalid_page_is_a_400(client, url, params):
+    assert client.get(url, params=params).status_code == 400
+
+
+def test_list_organizations_pages_by_id(client):
+    created = []
+    for _ in range(3):
+        response = client.post(
+            "/api/users",
+            json={
+                "email": f"user{os.urandom(4).hex()}@example.com",
+                "first_name": "Test",
+                "last_name": "User",
+            },
+        )
+        assert response.status_code == 201, response.text
+        response = client.post(
+            "/api/organization",
+            json={"name": "Paged", "user_id": response.json()["user_id"]},
+        )
+        assert response.status_code == 201, response.text
+        created.append(response.json()["organization_id"])
+
+    listed = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/api/organization", params=params)
+        assert response.status_code == 200, response.text
+        page = [o["organization_id"] for o in response.json()]
+        assert len(page) <= 2
+        listed += page
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        params["cursor"] = cursor
+
+    assert listed == sorted(listed)
+    assert set(created) <= set(listed)
@@ -0,0 +1,101 @@
+import os
+
+from repositories import get_role_repository
+from utils.permissions import get_current_user_roles
+
+
+def signup(client) -> tuple[int, dict]:
+    """A new user, returns their id and the headers authenticating as them."""
+    email = f"user{os.urandom(4).hex()}@example.com"
+    response = client.post(
+        "/api/auth/signup",
+        json={
+            "email": email,
+            "first_name": "Test",
+            "last_name": "User",
+            "password": "Password123!",
+        },
+    )
+    assert response.status_code == 201, response.text
+    user_id = response.json()["user_id"]
+    response = client.post(
+        "/api/auth/login", data={"username": email, "password": "Password123!"}
+    )
+    assert response.status_code == 200, response.text
+    return user_id, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def create_organization(client, admin_id: int) -> int:
+    response = client.post(
+        "/api/organization", json={"name": "Permissions test", "user_id": admin_id}
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["organization_id"]
+
+
+def add_member(client, organization_id: int, user_id: int, permission_level: str):
+    response = client.post(
+        f"/api/organization/{organization_id}/users",
+        json={"user_id": user_id, "permission_level": permission_level},
+    )
+    assert response.status_code == 201, response.text
+
+
+def test_update_role_requires_admin(client):
+    admin_id, admin_headers = signup(client)
+    volunteer_id, volunteer_headers = signup(client)
+    organization_id = create_organization(client, admin_id)
+    add_member(client, organization_id, volunteer_id, "volunteer")
+    url = f"/api/organization/{organization_id}/users/{volunteer_id}"
+
+    response = client.put(url, json={"permission_level": "admin"})
+    assert response.status_code == 401
+
+    response = client.put(
+        url, json={"permission_level": "admin"}, headers=volunteer_headers
+    )
+    assert response.status_code == 403
+
+    response = client.put(
+        url, json={"permission_level": "admin"}, headers=admin_headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["permission_level"] == "admin"
+
+
+def test_demoted_admin_is_refused(client):
+    admin_id, admin_headers = signup(client)
+    other_id, other_headers = signup(client)
+    organization_id = create_organization(client, admin_id)
+    add_member(client, organization_id, other_id, "admin")
+
+    # the other admin demotes the creator, whose roles are cached by now
+    response = client.put(
+        f"/api/organization/{organization_id}/users/{other_id}",
+        json={"permission_level": "admin"},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200, response.text
+    response = client.put(
+        f"/api/organization/{organization_id}/users/{admin_id}",
+        json={"permission_level": "volunteer"},
+        headers=other_headers,
+    )
+    assert response.status_code == 200, response.text
+
+    response = client.put(
+        f"/api/organization/{organization_id}/users/{other_id}",
+        json={"permission_level": "volunteer"},
+        headers=admin_headers,
+    )
+    assert response.status_code == 403
+
+
+def test_get_current_user_roles(client):
+    admin_id, _ = signup(client)
+    organization_id = create_organization(client, admin_id)
+
+    roles = client.portal.call(
+        get_current_user_roles, {"user_id": admin_id}, get_role_repository()
+    )
+    assert roles == {organization_id: "admin"}
@@ -0,0 +1,440 @@
+import re
+import sqlite3
+
+import pytest
+
+from utils.db_schema import DB_SCHEMA, run_migrations
+
+# The query shapes issued by the sqlite repositories, each one is ran through EXPLAIN
+# QUERY PLAN against a freshly migrated database and must be served by an index. Keep
+# this list in sync when adding or changing a query in repositories/sqlite.py.
+HOT_QUERIES: list[tuple[str, str, tuple]] = [
+    (
+        "users.list_users (cursor)",
+        """
+        SELECT user_id, email, first_name, last_name, availability
+        FROM users WHERE user_id > ? ORDER BY user_id LIMIT ? OFFSET ?
+        """,
+        (100, 11, 0),
+    ),
+    (
+        "users.list_users (availability, cursor)",
+        """
+        SELECT user_id, email, first_name, last_name, availability
+        FROM users WHERE availability = ? AND user_id > ?
+        ORDER BY user_id LIMIT ? OFFSET ?
+        """,
+        ("Weekends", 100, 11, 0),
+    ),
+    (
+        "users.list_users (search)",
+        """
+        SELECT u.user_id, u.email, u.first_name, u.last_name, u.availability, f.rank
+        FROM users_fts f
+        JOIN users u ON u.user_id = f.rowid
+        WHERE users_fts MATCH ? AND (f.rank, u.user_id) > (?, ?)
+        ORDER BY f.rank, u.user_id LIMIT ? OFFSET ?
+        """,
+        ('"jane"*', -1.5, 1, 11, 0),
+    ),
+    (
+        "users.get_user",
+        """
+        SELECT user_id, email, first_name, last_name, availability
+        FROM users WHERE user_id = ?
+        """,
+        (1,),
+    ),
+    (
+        "auth.login",
+        "SELECT user_id, email FROM users WHERE email = ?",
+        ("a@example.com",),
+    ),
+    (
+        "auth.login (credentials)",
+        "SELECT hashed_password FROM credentials WHERE user_id = ?",
+        (1,),
+    ),
+    (
+        "organization.list_organizations (cursor)",
+        """
+        SELECT organization_id, name, description, created_by_user_id
+        FROM organizations WHERE organization_id > ?
+        ORDER BY organization_id LIMIT ? OFFSET ?
+        """,
+        (100, 11, 0),
+    ),
+    (
+        "organization.list_organizations (search)",
+        """
+        SELECT o.organization_id, o.name, o.description, o.created_by_user_id, f.rank
+        FROM organizations_fts f
+        JOIN organizations o ON o.organization_id = f.rowid
+        WHERE organizations_fts MATCH ?
+        ORDER BY f.rank, o.organization_id LIMIT ? OFFSET ?
+        """,
+        ('"relief"*', 11, 0),
+    ),
+    (
+        "organization.get",
+        """
+        SELECT organization_id, name, description, created_by_user_id
+        FROM organizations WHERE organization_id = ?
+        """,
+        (1,),
+    ),
+    (
+        "permissions.get_user_roles",
+        "SELECT organization_id, permission_level FROM roles WHERE user_id = ?",
+        (1,),
+    ),
+    (
+        "organization_roles.list_organization_users",
+        """
+        SELECT r.user_id, r.organization_id, r.permission_level,
+            u.first_name || ' ' || u.last_name AS name
+        FROM roles r
+        JOIN users u ON r.user_id = u.user_id
+        WHERE r.organization_id = ?
+        """,
+        (1,),
+    ),
+    (
+        "events.get_event",
+        """
+        SELECT id, name, description, location, time, organization_id, capacity,
+            registered_count
+        FROM events WHERE id = ?
+        """,
+        (1,),
+    ),
+    (
+        "events.list_events (cursor)",
+        """
+        SELECT id, name, description, location, time, organization_id, capacity,
+            registered_count
+        FROM events WHERE (time, id) > (?, ?)
+        ORDER BY time, id LIMIT ?
+        """,
+        ("2026-01-01T00:00:00", 1, 51),
+    ),
+    (
+        "events.list_events (organization)",
+        """
+        SELECT id, name, description, location, time, organization_id, capacity,
+            registered_count
+        FROM events WHERE organization_id = ? AND (time, id) > (?, ?)
+        ORDER BY time, id LIMIT ?
+        """,
+        (1, "2026-01-01T00:00:00", 1, 51),
+    ),
+    (
+        "events.list_events (time range)",
+        """
+        SELECT id, name, description, location, time, organization_id, capacity,
+            registered_count
+        FROM events WHERE time >= ? AND time < ?
+        ORDER BY time, id LIMIT ?
+        """,
+        ("2026-01-01", "2026-02-01", 51),
+    ),
+    (
+        "events.list_events (single time of day)",
+        """
+        SELECT id, name, description, location, time, organization_id, capacity,
+            registered_count
+        FROM events WHERE time_of_day IN (?) AND time >= ?
+        ORDER BY time, id LIMIT ?
+        """,
+        ("Mornings", "2026-01-01", 51),
+    ),
+    (
+        "events.list_events (weekend)",
+        """
+        SELECT id, name, description, location, time, organization_id, capacity,
+            registered_count
+        FROM events WHERE is_weekend = 1 AND (time, id) > (?, ?)
+        ORDER BY time, id LIMIT ?
+        """,
+        ("2026-01-01T00:00:00", 1, 51),
+    ),
+    (
+        "events.list_events (time of day)",
+        """
+        SELECT id, name, description, location, time, organization_id, capacity,
+            registered_count
+        FROM events WHERE time_of_day IN (?, ?)
+        ORDER BY time, id LIMIT ?
+        """,
+        ("Mornings", "Evenings", 51),
+    ),
+    (
+        "events.list_events (time of day or weekend)",
+        """
+        SELECT id, name, description, location, time, organization_id, capacity,
+            registered_count
+        FROM events WHERE (time_of_day IN (?) OR is_weekend = 1) AND (time, id) > (?, ?)
+        ORDER BY time, id LIMIT ?
+        """,
+        ("Mornings", "2026-01-01T00:00:00", 1, 51),
+    ),
+    (
+        "events.list_events (myOrgs scope)",
+        """
+        SELECT id, name, description, location, time, organization_id, capacity,
+            registered_count
+        FROM events WHERE organization_id IN (SELECT organization_id FROM roles WHERE user_id = ?)
+        ORDER BY time, id LIMIT ?
+        """,
+        (1, 51),
+    ),
+    (
+        "events.search_events",
+        """
+        SELECT e.id, e.name, e.description, e.location, e.time, e.organization_id,
+            e.capacity, e.registered_count, f.rank, snippet(events_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet
+        FROM events_fts f
+        JOIN events e ON e.id = f.rowid
+        WHERE events_fts MATCH ? AND e.organization_id = ? AND e.time >= ?
+        ORDER BY f.rank, e.id LIMIT ?
+        """,
+        ('"beach"* location : "santa"*', 1, "2026-01-01", 21),
+    ),
+    (
+        "event_registrations.list_event_registrations (event, cursor)",
+        """
+        SELECT user_id, event_id, organization_id, registration_time
+        FROM event_registrations
+        WHERE event_id = ? AND (registration_time, user_id, event_id) < (?, ?, ?)
+        ORDER BY registration_time DESC, user_id DESC, event_id DESC LIMIT ? OFFSET ?
+        """,
+        (1, "2026-01-01T00:00:00", 1, 1, 11, 0),
+    ),
+    (
+        "event_registrations.list_event_registrations (user, cursor)",
+        """
+        SELECT user_id, event_id, organization_id, registration_time
+        FROM event_registrations
+        WHERE user_id = ? AND (registration_time, user_id, event_id) < (?, ?, ?)
+        ORDER BY registration_time DESC, user_id DESC, event_id DESC LIMIT ? OFFSET ?
+        """,
+        (1, "2026-01-01T00:00:00", 1, 1, 11, 0),
+    ),
+    (
+        "event_registrations.list_event_registrations (organization, cursor)",
+        """
+        SELECT user_id, event_id, organization_id, registration_time
+        FROM event_registrations
+        WHERE organization_id = ? AND (registration_time, user_id, event_id) < (?, ?, ?)
+        ORDER BY registration_time DESC, user_id DESC, event_id DESC LIMIT ? OFFSET ?
+        """,
+        (1, "2026-01-01T00:00:00", 1, 1, 11, 0),
+    ),
+    (
+        "event_registrations.list_event_registrations (unfiltered, cursor)",
+        """
+        SELECT user_id, event_id, organization_id, registration_time
+        FROM event_registrations
+        WHERE (registration_time, user_id, event_id) < (?, ?, ?)
+        ORDER BY registration_time DESC, user_id DESC, event_id DESC LIMIT ? OFFSET ?
+        """,
+        ("2026-01-01T00:00:00", 1, 1, 11, 0),
+    ),
+    (
+        "event_registrations.get_event_registration",
+        """
+        SELECT user_id, event_id, organization_id, registration_time
+        FROM event_registrations
+        WHERE organization_id = ? AND event_id = ? AND user_id = ?
+        """,
+        (1, 1, 1),
+    ),
+    (
+        "event_registrations.create_event_registrations_bulk (capacity lookup)",
+        """
+        SELECT id, capacity - registered_count AS spots
+        FROM events
+        WHERE id IN (?, ?) AND capacity IS NOT NULL
+        """,
+        (1, 2),
+    ),
+    (
+        "event_registrations.list_event_waitlist (cursor)",
+        """
+        SELECT user_id, event_id, organization_id, waitlist_time
+        FROM event_waitlist
+        WHERE event_id = ? AND (waitlist_time, user_id) > (?, ?)
+        ORDER BY waitlist_time, user_id LIMIT ?
+        """,
+        (1, "2026-01-01T00:00:00", 1, 11),
+    ),
+    (
+        "event_registrations waitlist promotion trigger",
+        """
+        SELECT w.user_id, w.event_id, w.organization_id
+        FROM event_waitlist w
+        JOIN events e ON e.id = w.event_id
+        WHERE w.event_id = ? AND (e.capacity IS NULL OR e.registered_count < e.capacity)
+        ORDER BY w.waitlist_time, w.user_id
+        LIMIT 1
+        """,
+        (1,),
+    ),
+    (
+        "event_registrations.create_event_registrations_bulk (existing lookup)",
+        """
+        SELECT user_id, organization_id, event_id
+        FROM event_registrations
+        WHERE (user_id = ? AND organization_id = ? AND event_id = ?)
+            OR (user_id = ? AND organization_id = ? AND event_id = ?)
+        """,
+        (1, 1, 1, 2, 1, 1),
+    ),
+    (
+        "users.export_users (availability)",
+        """
+        SELECT user_id, email, first_name, last_name, availability FROM users
+        WHERE availability = ? ORDER BY user_id
+        """,
+        ("Weekends",),
+    ),
+    (
+        "events.export_events (organization)",
+        """
+        SELECT id, name, description, location, time, organization_id, capacity,
+            registered_count
+        FROM events WHERE organization_id = ? ORDER BY time, id
+        """,
+        (1,),
+    ),
+    (
+        "event_registrations.export_event_registrations (event)",
+        """
+        SELECT r.user_id, r.event_id, r.organization_id, r.registration_time,
+            u.email, u.first_name, u.last_name
+        FROM event_registrations r
+        JOIN users u ON u.user_id = r.user_id
+        WHERE r.event_id = ?
+        ORDER BY r.registration_time DESC, r.user_id DESC, r.event_id DESC
+        """,
+        (1,),
+    ),
+    (
+        "conditional.get_validators",
+        """
+        SELECT d.version AS database_id, d.modified_at AS created_at,
+            v.version, v.modified_at,
+            EXISTS (SELECT 1 FROM events WHERE id = ?) AS found
+        FROM resource_versions d
+        LEFT JOIN resource_versions v ON v.resource = ? AND v.id = ?
+        WHERE d.resource = 'database' AND d.id = 0
+        """,
+        (1, "event", 1),
+    ),
+    (
+        "imports.import_file (organization admins)",
+        """
+        SELECT created_by_user_id, organization_id, 'admin'
+        FROM organizations
+        WHERE organization_id > ?
+        """,
+        (100,),
+    ),
+]
+
+
+# Queries that read several index ranges (an IN list, an OR or a subquery) can't return
+# rows in ORDER BY order straight from the index, so sqlite sorts the matching rows.
+# That is bounded by the size of the filter, not the table, so the temp b-tree is
+# accepted.
+SORT_ALLOWED = {
+    # full text matches are sorted by their bm25 rank
+    "users.list_users (search)",
+    "organization.list_organizations (search)",
+    "events.search_events",
+    # several index ranges merged
+    "events.list_events (time of day)",
+    "events.list_events (time of day or weekend)",
+    "events.list_events (myOrgs scope)",
+}
+
+# Unfiltered exports read the whole table by design, they have to return rows in ORDER
+# BY order (a temp b-tree sort would read every row before sending the first one)
+FULL_READS: list[tuple[str, str, tuple]] = [
+    (
+        "users.export_users (all)",
+        """
+        SELECT user_id, email, first_name, last_name, availability FROM users
+        ORDER BY user_id
+        """,
+        (),
+    ),
+    (
+        "events.export_events (all)",
+        """
+        SELECT id, name, description, location, time, organization_id, capacity,
+            registered_count
+        FROM events ORDER BY time, id
+        """,
+        (),
+    ),
+    (
+        "event_registrations.export_event_registrations (all)",
+        """
+        SELECT r.user_id, r.event_id, r.organization_id, r.registration_time,
+            u.email, u.first_name, u.last_name
+        FROM event_registrations r
+        JOIN users u ON u.user_id = r.user_id
+        ORDER BY r.registration_time DESC, r.user_id DESC, r.event_id DESC
+        """,
+        (),
+    ),
+]
+
+
+# a rowid or primary key lookup goes through the table's own b-tree index
+INDEX_SEARCH = re.compile(
+    r"^SEARCH \S+ USING (COVERING INDEX|INDEX|(INTEGER )?PRIMARY KEY)"
+)
+
+
+@pytest.fixture(scope="module")
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(DB_SCHEMA)
+    run_migrations(conn)
+    conn.execute("ANALYZE")
+    yield conn
+    conn.close()
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params: tuple) -> list[str]:
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+@pytest.mark.parametrize(
+    "name, sql, params", HOT_QUERIES, ids=[query[0] for query in HOT_QUERIES]
+)
+def test_hot_query_searches_an_index(conn, name, sql, params):
+    plan = query_plan(conn, sql, params)
+
+    # a full text match is looked up in the fts index, sqlite reports it as a scan of
+    # the virtual table
+    scans = [
+        step
+        for step in plan
+        if step.startswith("SCAN") and "VIRTUAL TABLE INDEX" not in step
+    ]
+    assert scans == [], plan
+    assert any(INDEX_SEARCH.match(step) for step in plan), plan
+    if name not in SORT_ALLOWED:
+        assert not any("USE TEMP B-TREE" in step for step in plan), plan
+
+
+@pytest.mark.parametrize(
+    "name, sql, params", FULL_READS, ids=[query[0] for query in FULL_READS]
+)
+def test_full_read_is_not_sorted(conn, name, sql, params):
+    plan = query_plan(conn, sql, params)
+
+    assert not any("USE TEMP B-TREE" in step for step in plan), plan
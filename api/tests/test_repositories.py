@@ -0,0 +1,10 @@
+import pytest
+
+import repositories
+
+
+def test_unknown_backend_is_refused(monkeypatch):
+    monkeypatch.setattr(repositories, "DB_BACKEND", "mysql")
+    monkeypatch.setattr(repositories, "_repositories", None)
+    with pytest.raises(ValueError, match="Unknown DB_BACKEND"):
+        repositories.get_repositories()
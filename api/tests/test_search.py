@@ -0,0 +1,73 @@
+import os
+
+
+def create_user(client, first_name: str, last_name: str) -> int:
+    response = client.post(
+        "/api/users",
+        json={
+            "email": f"user{os.urandom(4).hex()}@example.com",
+            "first_name": first_name,
+            "last_name": last_name,
+        },
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["user_id"]
+
+
+def create_organization(client, name: str, description: str) -> int:
+    response = client.post(
+        "/api/organization",
+        json={
+            "name": name,
+            "description": description,
+            "user_id": create_user(client, "Org", "Admin"),
+        },
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["organization_id"]
+
+
+def search_pages(client, url: str, key: str, **params) -> list[list[int]]:
+    """Follow the cursor of a search, returns the ids of each page."""
+    pages = []
+    while True:
+        response = client.get(url, params=params)
+        assert response.status_code == 200, response.text
+        pages.append([row[key] for row in response.json()])
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return pages
+        params["cursor"] = cursor
+
+
+def test_search_users_by_relevance(client):
+    word = f"Kestrel{os.urandom(3).hex()}"
+    once = create_user(client, word, "Smith")
+    twice = create_user(client, word, word)
+
+    response = client.get("/api/users", params={"query": word})
+    assert response.status_code == 200, response.text
+    assert [u["user_id"] for u in response.json()] == [twice, once]
+
+
+def test_search_users_cursor_crosses_pages(client):
+    word = f"Osprey{os.urandom(3).hex()}"
+    # ties on the rank are paged by user_id
+    created = [create_user(client, word, "Smith") for _ in range(3)]
+    best = create_user(client, word, word)
+
+    pages = search_pages(client, "/api/users", "user_id", query=word, limit=2)
+
+    assert pages == [[best, created[0]], created[1:]]
+
+
+def test_search_organizations_by_relevance_and_cursor(client):
+    word = f"Heron{os.urandom(3).hex()}"
+    created = [create_organization(client, word, "Food bank") for _ in range(2)]
+    best = create_organization(client, word, f"{word} rescue")
+
+    pages = search_pages(
+        client, "/api/organization", "organization_id", query=word, limit=2
+    )
+
+    assert pages == [[best, created[0]], [created[1]]]
@@ -0,0 +1,61 @@
+import asyncio
+import os
+
+import pytest
+
+from utils import security
+from utils.security import PasswordHasher, PasswordHasherBusyError
+
+
+def test_hash_and_verify():
+    hasher = PasswordHasher(workers=0, rounds=4)
+
+    hashed = hasher.hash("Password123!")
+    assert hasher.verify("Password123!", hashed)
+    assert not hasher.verify("wrong password", hashed)
+
+
+def test_hash_and_verify_in_the_process_pool():
+    hasher = PasswordHasher(workers=1, rounds=4)
+
+    async def hash_and_verify() -> bool:
+        hashed = await hasher.hash_async("Password123!")
+        return await hasher.verify_async("Password123!", hashed)
+
+    try:
+        assert asyncio.run(hash_and_verify())
+    finally:
+        hasher.shutdown()
+
+
+def test_needs_rehash_on_another_cost():
+    hasher = PasswordHasher(workers=0, rounds=4)
+
+    assert not hasher.needs_rehash(hasher.hash("Password123!"))
+    assert PasswordHasher(workers=0, rounds=5).needs_rehash(hasher.hash("Password123!"))
+    assert hasher.needs_rehash("not a bcrypt hash")
+
+
+def test_busy_hasher_fails_fast():
+    hasher = PasswordHasher(workers=1, max_pending=0, rounds=4)
+
+    with pytest.raises(PasswordHasherBusyError):
+        hasher.hash("Password123!")
+
+
+def test_busy_hasher_is_a_503(client, monkeypatch):
+    monkeypatch.setattr(
+        security, "password_hasher", PasswordHasher(workers=1, max_pending=0)
+    )
+
+    response = client.post(
+        "/api/auth/signup",
+        json={
+            "email": f"user{os.urandom(4).hex()}@example.com",
+            "first_name": "Test",
+            "last_name": "User",
+            "password": "Password123!",
+        },
+    )
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
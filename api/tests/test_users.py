@@ -0,0 +1,89 @@
+import os
+
+
+def create_user(client, **fields) -> dict:
+    payload = {
+        "email": f"user{os.urandom(4).hex()}@example.com",
+        "first_name": "Test",
+        "last_name": "User",
+        **fields,
+    }
+    response = client.post("/api/users", json=payload)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_create_and_get_user(client):
+    user = create_user(client, availability="Full-time")
+
+    response = client.get(f"/api/users/{user['user_id']}")
+    assert response.status_code == 200, response.text
+    assert response.json() == user
+
+
+def test_get_missing_user(client):
+    response = client.get("/api/users/999999")
+    assert response.status_code == 404
+    assert "etag" not in response.headers
+
+
+def test_get_user_not_modified(client):
+    user = create_user(client)
+    url = f"/api/users/{user['user_id']}"
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    etag, modified_at = response.headers["etag"], response.headers["last-modified"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    response = client.get(url, headers={"If-Modified-Since": modified_at})
+    assert response.status_code == 304
+    # If-None-Match wins over If-Modified-Since
+    response = client.get(
+        url, headers={"If-None-Match": 'W/"0-0"', "If-Modified-Since": modified_at}
+    )
+    assert response.status_code == 200
+
+
+def test_duplicate_email_conflicts(client):
+    user = create_user(client)
+
+    response = client.post(
+        "/api/users",
+        json={"email": user["email"], "first_name": "Other", "last_name": "User"},
+    )
+    assert response.status_code == 409
+    assert response.json()["detail"] == "A user with this email already exists"
+
+
+def test_list_users_pages_by_id(client):
+    created = [create_user(client)["user_id"] for _ in range(3)]
+
+    listed = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/api/users", params=params)
+        assert response.status_code == 200, response.text
+        listed += [user["user_id"] for user in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        params["cursor"] = cursor
+
+    assert listed == sorted(listed)
+    assert set(created) <= set(listed)
+
+
+def test_search_users(client):
+    name = f"Zephyrine{os.urandom(3).hex()}"
+    user = create_user(client, first_name=name)
+    create_user(client)
+
+    response = client.get("/api/users", params={"query": name[:8]})
+    assert response.status_code == 200, response.text
+    assert [u["user_id"] for u in response.json()] == [user["user_id"]]
+
+    response = client.get("/api/users", params={"query": "***"})
+    assert response.status_code == 200
+    assert response.json() == []
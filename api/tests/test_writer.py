@@ -0,0 +1,84 @@
+import sqlite3
+
+import pytest
+
+from utils.writer import WriteQueue, WriteQueueBusyError
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "writer.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+    return path
+
+
+def insert(conn: sqlite3.Connection, item_id: int, name: str | None) -> int:
+    conn.execute("INSERT INTO items (id, name) VALUES (?, ?)", (item_id, name))
+    return item_id
+
+
+def insert_two(conn: sqlite3.Connection, item_id: int) -> None:
+    # the first insert succeeds, the second breaks the NOT NULL constraint
+    insert(conn, item_id, "partial")
+    insert(conn, item_id + 1, None)
+
+
+def committed(database) -> dict[int, str]:
+    with sqlite3.connect(database) as conn:
+        return dict(conn.execute("SELECT id, name FROM items"))
+
+
+def test_failed_write_is_rolled_back_alone(database):
+    # a window long enough for every write below to be in the one batch
+    writes = WriteQueue(database, window=0.5)
+
+    futures = [
+        writes.submit(insert, 1, "first"),
+        writes.submit(insert_two, 10),
+        writes.submit(insert, 2, "second"),
+        # the same key as the first write, only this write is refused
+        writes.submit(insert, 1, "duplicate"),
+    ]
+
+    assert futures[0].result() == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result()
+    assert futures[2].result() == 2
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[3].result()
+    # the savepoint rolled back the failed writes' earlier statements as well
+    assert committed(database) == {1: "first", 2: "second"}
+    assert writes.stats()["batches"] == 1
+    assert writes.stats()["failed"] == 2
+    writes.close()
+
+
+def test_result_is_returned_after_the_commit(database):
+    writes = WriteQueue(database, window=0)
+
+    writes.execute(insert, 1, "first")
+
+    # visible to another connection as soon as the write returns
+    assert committed(database) == {1: "first"}
+    writes.close()
+
+
+def test_close_commits_queued_writes(database):
+    writes = WriteQueue(database, window=0.5)
+
+    futures = [writes.submit(insert, item_id, "queued") for item_id in range(3)]
+    writes.close()
+
+    assert all(future.done() for future in futures)
+    assert committed(database) == {0: "queued", 1: "queued", 2: "queued"}
+    with pytest.raises(RuntimeError):
+        writes.submit(insert, 3, "late")
+
+
+def test_busy_write_queue_fails_fast(database):
+    writes = WriteQueue(database, max_pending=0)
+
+    with pytest.raises(WriteQueueBusyError):
+        writes.submit(insert, 1, "first")
+    writes.close()
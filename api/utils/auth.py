@@ -1,19 +1,41 @@
-import sqlite3
+import hashlib
+import os
+import time
 
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
-from db import get_connection
+from repositories import UserRepository, get_user_repository
+from utils.cache import TTLCache
 from utils.security import decode_access_token
 
 # Points to our login endpoint so Swagger UI knows where to send credentials. We are telling FastAPI to look for a bearer token in the Auth header.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# authenticated users are cached per token, so repeat requests skip both the JWT
+# signature check and the users lookup. Entries never outlive the token itself.
+AUTH_CACHE_SIZE = int(os.environ.get("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL = float(os.environ.get("AUTH_CACHE_TTL", "60"))
 
-def get_current_user(
+user_cache = TTLCache(max_size=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+
+def _cache_key(token: str) -> bytes:
+    # don't keep the raw bearer tokens around in memory
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+def invalidate_user(user_id: int) -> None:
+    """
+    Drop every cached token of a user, call this whenever the user is updated or deleted.
+    """
+    user_cache.delete_where(lambda _, user: user["user_id"] == int(user_id))
+
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    conn: sqlite3.Connection = Depends(get_connection),
+    repository: UserRepository = Depends(get_user_repository),
 ) -> dict:
     """
     Decode the JWT from the Authorization header, fetch the user from the DB,
@@ -21,6 +43,11 @@ def get_current_user(
 
     Raises 401 if the token is invalid/expired or the user no longer exists.
     """
+    key = _cache_key(token)
+    cached = user_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
     try:
         claims = decode_access_token(token)
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
@@ -38,10 +65,9 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    row = conn.execute(
-        "SELECT user_id, email, first_name, last_name FROM users WHERE user_id = ?",
-        (user_id,),
-    ).fetchone()
+    # only read the user on a cache miss, from the primary so a deleted user is refused
+    # right away
+    row = await repository.get_auth_user(int(user_id))
     if row is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -49,9 +75,13 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    return {
+    user = {
         "user_id": row["user_id"],
         "email": row["email"],
         "first_name": row["first_name"],
         "last_name": row["last_name"],
     }
+    # never cache a token past its own expiry
+    ttl = claims["exp"] - time.time() if "exp" in claims else None
+    user_cache.set(key, user, ttl=ttl)
+    return dict(user)
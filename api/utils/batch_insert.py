@@ -0,0 +1,25 @@
+from itertools import islice
+from typing import Iterable
+
+# rows per executemany call, large enough to amortize the per call overhead while
+# keeping only one batch of a (possibly generated) row stream in memory at a time
+BATCH_SIZE = 10_000
+
+
+def insert_in_batches(
+    cursor, insert_query: str, rows: Iterable[tuple], batch_size: int = BATCH_SIZE
+) -> int:
+    """
+    Insert rows with one executemany per batch, rows can be any iterable (a generator
+    works) so millions of rows never have to be held in memory at once.
+
+    This does not commit, the caller decides the transaction boundaries, doing the
+    whole load in one transaction is much faster than committing every batch.
+    Returns the number of rows inserted.
+    """
+    inserted = 0
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        cursor.executemany(insert_query, batch)
+        inserted += len(batch)
+    return inserted
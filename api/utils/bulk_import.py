@@ -0,0 +1,140 @@
+import asyncio
+import csv
+import io
+import json
+from itertools import islice
+from typing import IO, Iterator, Literal
+
+from pydantic import BaseModel, ValidationError
+
+from models import EventIn, ImportResult, ImportRowError, OrganizationCreate
+from models.user import UserIn
+from repositories.base import ImportKind, ImportRepository
+
+ImportFormat = Literal["ndjson", "csv"]
+
+# rows committed per transaction, a failed row only costs re-inserting its own chunk
+# one row at a time to find it
+IMPORT_CHUNK_SIZE = 500
+# row errors kept and returned in the result, the rest are only counted so a file of
+# bad rows can't grow the import's memory
+MAX_REPORTED_ERRORS = 1000
+
+
+# the model every record of a kind is validated against, the body of its create
+# endpoint
+IMPORT_MODELS: dict[str, type[BaseModel]] = {
+    "users": UserIn,
+    "organizations": OrganizationCreate,
+    "events": EventIn,
+}
+
+
+def guess_format(filename: str | None) -> ImportFormat | None:
+    """The format of a file from its extension, None if it isn't a known one."""
+    if filename:
+        if filename.lower().endswith(".csv"):
+            return "csv"
+        if filename.lower().endswith((".ndjson", ".jsonl")):
+            return "ndjson"
+    return None
+
+
+def parse_records(
+    file: IO[bytes], import_format: ImportFormat
+) -> Iterator[tuple[int, dict | None, str | None]]:
+    """
+    Read a UTF-8 CSV (with a header row) or NDJSON file one record at a time, yields
+    (row, record, error) with either the record or the reason it couldn't be parsed.
+    Empty CSV values are left out of the record, so model defaults apply to them.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if import_format == "csv":
+        for row, record in enumerate(csv.DictReader(text), 1):
+            if None in record:
+                yield row, None, "More values than columns in the header"
+            else:
+                yield row, {key: value for key, value in record.items() if value}, None
+        return
+
+    row = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row, None, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield row, None, "Expected a JSON object"
+            continue
+        yield row, record, None
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'record'}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+async def import_records(
+    repository: ImportRepository,
+    kind: ImportKind,
+    file: IO[bytes],
+    import_format: ImportFormat,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> ImportResult:
+    """
+    Validate the records of a file against the model of `kind` and insert the valid
+    ones through the repository, committing every `chunk_size` records. The file is
+    parsed as it is inserted (on a worker thread, the file reads block), only one chunk
+    is held in memory at a time.
+
+    Records that fail to parse, validate, or insert are skipped and reported by row,
+    they never fail the rest of the import. If the file can't be read past some point
+    (not UTF-8, broken CSV quoting) the import stops there, everything before it stays
+    inserted.
+    """
+    model = IMPORT_MODELS[kind]
+    inserted = 0
+    errors: list[tuple[int, str]] = []
+    error_count = 0
+
+    def record_error(row: int, detail: str) -> None:
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append((row, detail))
+
+    def valid_rows() -> Iterator[tuple[int, BaseModel]]:
+        row = 0
+        try:
+            for row, record, error in parse_records(file, import_format):
+                if error is not None:
+                    record_error(row, error)
+                    continue
+                try:
+                    validated = model.model_validate(record)
+                except ValidationError as e:
+                    record_error(row, _format_validation_error(e))
+                    continue
+                yield row, validated
+        except (UnicodeDecodeError, csv.Error) as e:
+            record_error(row + 1, f"Stopped reading the file at this row: {e}")
+
+    rows = valid_rows()
+    while chunk := await asyncio.to_thread(lambda: list(islice(rows, chunk_size))):
+        chunk_errors = await repository.insert_records(kind, chunk)
+        inserted += len(chunk) - len(chunk_errors)
+        for row, detail in chunk_errors:
+            record_error(row, detail)
+
+    errors.sort()
+    return ImportResult(
+        inserted=inserted,
+        failed=error_count,
+        errors=[ImportRowError(row=row, detail=detail) for row, detail in errors],
+    )
@@ -0,0 +1,207 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+_MISSING = object()
+
+
+class CacheBackend(ABC):
+    """
+    Where a ReadThroughCache keeps its entries. TTLCache keeps them in this process, a
+    backend shared by every worker (e.g. Redis) can be swapped in by implementing
+    these methods, keys are hashable tuples and values must be picklable.
+    """
+
+    @abstractmethod
+    def get(self, key: Hashable, default: Any = None) -> Any: ...
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None: ...
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    @abstractmethod
+    def stats(self) -> dict: ...
+
+
+class TTLCache(CacheBackend):
+    """
+    A thread safe, bounded in-process cache.
+
+    Entries expire after `ttl` seconds (or an earlier per-entry expiry) and once the
+    cache holds `max_size` entries the least recently used one is evicted.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        if max_size < 1:
+            raise ValueError("Cache size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        # stats
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self._misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """
+        Store a value, `ttl` can shorten (never extend) the cache wide ttl for this entry.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if self._entries.pop(key, _MISSING) is not _MISSING:
+                self._invalidations += 1
+
+    def delete_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """
+        Delete every entry the predicate returns True for, this is a scan of the whole
+        cache so it is meant for rare invalidations. Returns the number deleted.
+        """
+        with self._lock:
+            keys = [
+                key
+                for key, (value, _) in self._entries.items()
+                if predicate(key, value)
+            ]
+            for key in keys:
+                del self._entries[key]
+            self._invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
+
+
+class ReadThroughCache:
+    """
+    A cache of one kind of entity in front of the database, entries are loaded on a
+    miss and dropped by the routes that change the entity (`invalidate`).
+
+    An entry can be stored with the version of the entity it was loaded at (the ETag
+    from resource_versions), it is then only a hit for that same version. That keeps
+    writes the routes don't see (database triggers, other processes) from being
+    served stale until the entry expires.
+    """
+
+    def __init__(self, name: str, backend: CacheBackend, max_items: int | None = None):
+        self.name = name
+        self.backend = backend
+        # lists longer than this are loaded every time instead of cached
+        self.max_items = max_items
+        self._lock = threading.Lock()
+
+        # stats
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._invalidations = 0
+
+    def get_or_load(
+        self, key: Hashable, loader: Callable[[], Any], version: str | None = None
+    ) -> Any:
+        """
+        Return the cached value for key, or call loader and cache what it returns.
+        None is never cached, so a missing entity is looked up again next time.
+        """
+        hit, value = self._lookup(key, version)
+        if hit:
+            return value
+        value = loader()
+        self._store(key, version, value)
+        return value
+
+    async def get_or_load_async(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        version: str | None = None,
+    ) -> Any:
+        """get_or_load for async routes, the loader is awaited on a miss."""
+        hit, value = self._lookup(key, version)
+        if hit:
+            return value
+        value = await loader()
+        self._store(key, version, value)
+        return value
+
+    def _lookup(self, key: Hashable, version: str | None) -> tuple[bool, Any]:
+        entry = self.backend.get((self.name, key))
+        if entry is not None and entry[0] == version:
+            with self._lock:
+                self._hits += 1
+            return True, entry[1]
+        with self._lock:
+            self._misses += 1
+            if entry is not None:
+                self._stale += 1
+        return False, None
+
+    def _store(self, key: Hashable, version: str | None, value: Any) -> None:
+        if value is not None and (
+            self.max_items is None or len(value) <= self.max_items
+        ):
+            self.backend.set((self.name, key), (version, value))
+
+    def invalidate(self, key: Hashable) -> None:
+        self.backend.delete((self.name, key))
+        with self._lock:
+            self._invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "invalidations": self._invalidations,
+            }
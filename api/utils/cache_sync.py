@@ -0,0 +1,106 @@
+import logging
+import os
+import time
+from typing import Callable
+
+from repositories import CacheInvalidationRepository, get_repositories
+from utils.auth import invalidate_user, user_cache
+from utils.permissions import invalidate_user_roles, roles_cache
+
+logger = logging.getLogger(__name__)
+
+# Every worker keeps its own caches of authenticated users and roles. The routes
+# invalidate the entries they change right away, but only in the worker that served the
+# request: the other workers learn about the change from the cache_invalidations log
+# the users/credentials/roles triggers append to, which they poll every
+# CACHE_SYNC_INTERVAL_MS. The entity caches don't need this, their entries are checked
+# against resource_versions on every hit.
+CACHE_SYNC_INTERVAL_MS = float(os.environ.get("CACHE_SYNC_INTERVAL_MS", "500"))
+# seconds the log is kept for, a worker that falls further behind clears its caches
+CACHE_SYNC_RETENTION = float(os.environ.get("CACHE_SYNC_RETENTION", "600"))
+# seconds between prunes of the log
+PRUNE_INTERVAL = 60
+
+# cache name in the log -> how to drop one key of it
+INVALIDATORS: dict[str, Callable[[int], None]] = {
+    "user": invalidate_user,
+    "roles": invalidate_user_roles,
+}
+
+
+def clear_synced_caches() -> None:
+    user_cache.clear()
+    roles_cache.clear()
+
+
+class CacheInvalidationFollower:
+    """
+    Applies the cache_invalidations log to this process's caches. `start` skips what
+    was logged before the process had anything cached, every `poll` then applies the
+    entries logged since the previous one.
+    """
+
+    def __init__(self):
+        self.last_id: int | None = None
+        # stats
+        self.applied = 0
+        self.resets = 0
+
+    async def start(self, repository: CacheInvalidationRepository) -> None:
+        # the last id handed out, rows may have been pruned since
+        self.last_id = await repository.last_id()
+
+    async def poll(self, repository: CacheInvalidationRepository) -> int:
+        """Apply the entries logged since the last poll, returns how many."""
+        if self.last_id is None:
+            await self.start(repository)
+            return 0
+        rows = await repository.list_after(self.last_id)
+        if not rows:
+            return 0
+
+        # ids are assigned in commit order without gaps, a gap means the entries were
+        # pruned before this worker read them, so any entry may be stale
+        if rows[0]["id"] != self.last_id + 1:
+            logger.warning(
+                "Cache invalidation log pruned past entry %s, clearing the caches",
+                self.last_id,
+            )
+            clear_synced_caches()
+            self.resets += 1
+        else:
+            for row in rows:
+                invalidate = INVALIDATORS.get(row["cache"])
+                if invalidate is not None:
+                    invalidate(row["key"])
+        self.last_id = rows[-1]["id"]
+        self.applied += len(rows)
+        return len(rows)
+
+    def stats(self) -> dict:
+        return {"last_id": self.last_id, "applied": self.applied, "resets": self.resets}
+
+
+async def prune_invalidations(
+    repository: CacheInvalidationRepository, retention: float = CACHE_SYNC_RETENTION
+) -> int:
+    """
+    Delete the log entries older than `retention` seconds, returns how many. Only one
+    worker needs to run this.
+    """
+    return await repository.prune(int(time.time() - retention))
+
+
+follower = CacheInvalidationFollower()
+
+
+async def sync_caches(prune: bool = False) -> int:
+    """
+    Apply the invalidations logged since the last call to this process's caches,
+    pruning the log first if `prune`. Reads the primary database, DB_READ_PATH may be
+    a snapshot that is behind. Returns the number of entries applied.
+    """
+    repository = get_repositories().invalidations
+    if prune:
+        await prune_invalidations(repository)
+    return await follower.poll(repository)
@@ -0,0 +1,138 @@
+import sqlite3
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request, Response, status
+
+# polled resources are always revalidated, a browser never reuses a cached response
+# without asking first, but an unchanged one costs a 304 instead of the whole body
+CACHE_CONTROL = "no-cache"
+
+
+class Validators:
+    """The ETag and Last-Modified of a resource, from its resource_versions counter."""
+
+    def __init__(self, etag: str, modified_at: int):
+        self.etag = etag
+        self.modified_at = modified_at
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.modified_at, usegmt=True),
+            "Cache-Control": CACHE_CONTROL,
+        }
+
+
+# The row each per-row resource is the version of, a resource_versions counter is
+# only created by the first change so its absence doesn't tell if the row exists.
+# Resources not listed here (the organizations list) always exist.
+RESOURCE_ROWS: dict[str, tuple[str, str]] = {
+    "event": ("events", "id"),
+    "user": ("users", "user_id"),
+    "organization": ("organizations", "organization_id"),
+    "organization_members": ("organizations", "organization_id"),
+}
+
+
+def validators_query(
+    resource: str, resource_id: int = 0, placeholder: str = "?"
+) -> tuple[str, tuple]:
+    """
+    The query get_validators runs and its parameters, `placeholder` is the driver's
+    parameter marker. It reads the database's and the resource's resource_versions
+    rows and whether the resource's row exists, all by primary key.
+    """
+    exists, params = "1", ()
+    if resource in RESOURCE_ROWS:
+        table, key = RESOURCE_ROWS[resource]
+        exists = f"EXISTS (SELECT 1 FROM {table} WHERE {key} = {placeholder})"
+        params = (resource_id,)
+    query = f"""
+        SELECT d.version AS database_id, d.modified_at AS created_at,
+            v.version, v.modified_at, {exists} AS found
+        FROM resource_versions d
+        LEFT JOIN resource_versions v
+            ON v.resource = {placeholder} AND v.id = {placeholder}
+        WHERE d.resource = 'database' AND d.id = 0
+    """
+    return query, (*params, resource, resource_id)
+
+
+def get_validators(
+    conn: sqlite3.Connection, resource: str, resource_id: int = 0
+) -> Validators | None:
+    """
+    Look up the version of a resource, primary key lookups in resource_versions and
+    the resource's table. The resource itself is not read, so this is cheap enough to
+    run before it.
+
+    Resources that were never changed have no counter, they are version 0 and last
+    modified when the database was created. A resource whose row doesn't exist has
+    no validators, None, and the route answers its 404 as usual.
+    """
+    return validators_from_row(
+        conn.execute(*validators_query(resource, resource_id)).fetchone()
+    )
+
+
+def validators_from_row(row) -> Validators | None:
+    """
+    Build the validators from a row of validators_query, whichever database it came
+    from. None if the resource's row doesn't exist.
+    """
+    if not row["found"]:
+        return None
+    # weak, the same version can be sent with a different encoding
+    return Validators(
+        etag=f'W/"{row["database_id"]:x}-{row["version"] or 0}"',
+        modified_at=row["modified_at"] or row["created_at"],
+    )
+
+
+def is_not_modified(request: Request, validators: Validators) -> bool:
+    """
+    Whether the client's cached copy is still current, from If-None-Match or, only
+    when that is absent, If-Modified-Since.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # there are only validators for a row that exists, so `*` matches them all
+        if if_none_match.strip() == "*":
+            return True
+        current = validators.etag.removeprefix("W/")
+        return any(
+            tag.strip().removeprefix("W/") == current
+            for tag in if_none_match.split(",")
+        )
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return validators.modified_at <= since
+    return False
+
+
+def not_modified_response(
+    request: Request, response: Response, validators: Validators | None
+) -> Response | None:
+    """
+    Answer a conditional GET before the resource is read. Returns a 304 response if
+    the client's copy is current, otherwise sets the validators on `response` and
+    returns None, and the route carries on building the body.
+
+    The validators come from the repository's get_validators, the ETag identifies the
+    version for caching the resource as well. Without validators (the resource doesn't
+    exist) nothing is set and the route carries on to its 404.
+    """
+    if validators is None:
+        return None
+    if is_not_modified(request, validators):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=validators.headers
+        )
+    response.headers.update(validators.headers)
+    return None
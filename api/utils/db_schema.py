@@ -1,3 +1,7 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
 # DB schema definition for sqlite3 database, is used by the initialization function  in db.py
 # and is used in the populate_db.py script, which can be ran to populate the database with fake data
 DB_SCHEMA = """
@@ -57,12 +61,486 @@ CREATE TABLE IF NOT EXISTS events (
 """
 
 
+# Versioned migrations applied on top of DB_SCHEMA by run_migrations, the version of the
+# last applied migration is tracked in the database with `PRAGMA user_version`.
+# Migrations are append-only, never edit one that has already been released, add a new
+# entry with the next version number instead.
+MIGRATIONS: list[tuple[int, str, str]] = [
+    (
+        1,
+        "secondary indexes matching the router query shapes",
+        """
+        -- list_users filtered by availability, ordered by user_id (the rowid)
+        CREATE INDEX IF NOT EXISTS idx_users_availability ON users (availability);
+        -- foreign key checks when deleting users
+        CREATE INDEX IF NOT EXISTS idx_organizations_created_by_user_id
+            ON organizations (created_by_user_id);
+        -- list_organization_users and the foreign key checks when deleting organizations
+        CREATE INDEX IF NOT EXISTS idx_roles_organization_id
+            ON roles (organization_id, permission_level, user_id);
+        -- events of an organization, ordered by time
+        CREATE INDEX IF NOT EXISTS idx_events_organization_id_time
+            ON events (organization_id, time);
+        -- list_event_registrations filters, each index covers the selected columns
+        -- and is ordered by registration_time so no temp b-tree sort is needed
+        CREATE INDEX IF NOT EXISTS idx_event_registrations_event_id
+            ON event_registrations (event_id, registration_time, user_id, organization_id);
+        CREATE INDEX IF NOT EXISTS idx_event_registrations_user_id
+            ON event_registrations (user_id, registration_time, event_id, organization_id);
+        CREATE INDEX IF NOT EXISTS idx_event_registrations_organization_id
+            ON event_registrations (organization_id, registration_time, user_id, event_id);
+        CREATE INDEX IF NOT EXISTS idx_event_registrations_registration_time
+            ON event_registrations (registration_time, user_id, event_id, organization_id);
+        """,
+    ),
+    (
+        2,
+        "generated time_of_day/is_weekend columns and indexes for filtering events",
+        """
+        -- event times are ISO 8601 strings (YYYY-MM-DDTHH:MM:SS), the buckets match
+        -- TIME_OF_DAY_RANGES in the client
+        ALTER TABLE events ADD COLUMN time_of_day TEXT GENERATED ALWAYS AS (
+            CASE
+                WHEN length(time) < 13 THEN NULL
+                WHEN CAST(substr(time, 12, 2) AS INTEGER) BETWEEN 6 AND 11 THEN 'Mornings'
+                WHEN CAST(substr(time, 12, 2) AS INTEGER) BETWEEN 12 AND 16 THEN 'Afternoons'
+                WHEN CAST(substr(time, 12, 2) AS INTEGER) BETWEEN 17 AND 21 THEN 'Evenings'
+            END
+        ) VIRTUAL;
+        ALTER TABLE events ADD COLUMN is_weekend INTEGER GENERATED ALWAYS AS (
+            strftime('%w', time) IN ('0', '6')
+        ) VIRTUAL;
+        -- list_events is ordered by (time, id), every filter has an index with time
+        -- as the next column so a page is read straight from the index
+        CREATE INDEX IF NOT EXISTS idx_events_time ON events (time);
+        CREATE INDEX IF NOT EXISTS idx_events_time_of_day_time
+            ON events (time_of_day, time);
+        CREATE INDEX IF NOT EXISTS idx_events_is_weekend_time ON events (is_weekend, time);
+        """,
+    ),
+    (
+        3,
+        "FTS5 search indexes for users and organizations",
+        """
+        -- external content tables, the text is only stored once in the base tables and
+        -- the triggers below keep the index in sync. prefix='2 3' adds prefix indexes so
+        -- the "term"* queries used for search as you type stay fast.
+        CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+            email, first_name, last_name,
+            content='users', content_rowid='user_id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        );
+        CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+            INSERT INTO users_fts (rowid, email, first_name, last_name)
+            VALUES (new.user_id, new.email, new.first_name, new.last_name);
+        END;
+        CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, email, first_name, last_name)
+            VALUES ('delete', old.user_id, old.email, old.first_name, old.last_name);
+        END;
+        CREATE TRIGGER IF NOT EXISTS users_fts_update
+        AFTER UPDATE OF user_id, email, first_name, last_name ON users BEGIN
+            INSERT INTO users_fts (users_fts, rowid, email, first_name, last_name)
+            VALUES ('delete', old.user_id, old.email, old.first_name, old.last_name);
+            INSERT INTO users_fts (rowid, email, first_name, last_name)
+            VALUES (new.user_id, new.email, new.first_name, new.last_name);
+        END;
+        INSERT INTO users_fts (users_fts) VALUES ('rebuild');
+
+        CREATE VIRTUAL TABLE IF NOT EXISTS organizations_fts USING fts5(
+            name, description,
+            content='organizations', content_rowid='organization_id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        );
+        CREATE TRIGGER IF NOT EXISTS organizations_fts_insert
+        AFTER INSERT ON organizations BEGIN
+            INSERT INTO organizations_fts (rowid, name, description)
+            VALUES (new.organization_id, new.name, new.description);
+        END;
+        CREATE TRIGGER IF NOT EXISTS organizations_fts_delete
+        AFTER DELETE ON organizations BEGIN
+            INSERT INTO organizations_fts (organizations_fts, rowid, name, description)
+            VALUES ('delete', old.organization_id, old.name, old.description);
+        END;
+        CREATE TRIGGER IF NOT EXISTS organizations_fts_update
+        AFTER UPDATE OF organization_id, name, description ON organizations BEGIN
+            INSERT INTO organizations_fts (organizations_fts, rowid, name, description)
+            VALUES ('delete', old.organization_id, old.name, old.description);
+            INSERT INTO organizations_fts (rowid, name, description)
+            VALUES (new.organization_id, new.name, new.description);
+        END;
+        INSERT INTO organizations_fts (organizations_fts) VALUES ('rebuild');
+        """,
+    ),
+    (
+        4,
+        "FTS5 search index for events",
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+            name, description, location,
+            content='events', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        );
+        CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+            INSERT INTO events_fts (rowid, name, description, location)
+            VALUES (new.id, new.name, new.description, new.location);
+        END;
+        CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+            INSERT INTO events_fts (events_fts, rowid, name, description, location)
+            VALUES ('delete', old.id, old.name, old.description, old.location);
+        END;
+        CREATE TRIGGER IF NOT EXISTS events_fts_update
+        AFTER UPDATE OF id, name, description, location ON events BEGIN
+            INSERT INTO events_fts (events_fts, rowid, name, description, location)
+            VALUES ('delete', old.id, old.name, old.description, old.location);
+            INSERT INTO events_fts (rowid, name, description, location)
+            VALUES (new.id, new.name, new.description, new.location);
+        END;
+        INSERT INTO events_fts (events_fts) VALUES ('rebuild');
+        """,
+    ),
+    (
+        5,
+        "event capacity, materialized registration counts and a waitlist",
+        """
+        -- a NULL capacity is unlimited. registered_count is maintained by the triggers
+        -- below, so listings show fill levels without a COUNT(*) per event
+        ALTER TABLE events ADD COLUMN capacity INTEGER
+            CHECK (capacity IS NULL OR capacity >= 0);
+        ALTER TABLE events ADD COLUMN registered_count INTEGER NOT NULL DEFAULT 0;
+        UPDATE events SET registered_count = (
+            SELECT COUNT(*) FROM event_registrations WHERE event_id = events.id
+        );
+
+        CREATE TABLE IF NOT EXISTS event_waitlist (
+            user_id INTEGER NOT NULL,
+            event_id INTEGER NOT NULL,
+            organization_id INTEGER NOT NULL,
+            waitlist_time TEXT NOT NULL,
+            PRIMARY KEY (user_id, organization_id, event_id)
+        );
+        -- first come first served, per event
+        CREATE INDEX IF NOT EXISTS idx_event_waitlist_event_id
+            ON event_waitlist (event_id, waitlist_time, user_id, organization_id);
+
+        -- Writers are serialized, so checking the count inside the insert itself can't
+        -- overbook however many sign ups race for the last spot. The error messages
+        -- are matched on by the event_registrations routes.
+        CREATE TRIGGER IF NOT EXISTS event_registrations_capacity
+        BEFORE INSERT ON event_registrations BEGIN
+            SELECT RAISE(ABORT, 'Event is full')
+            FROM events
+            WHERE id = new.event_id
+                AND capacity IS NOT NULL AND registered_count >= capacity;
+        END;
+        CREATE TRIGGER IF NOT EXISTS event_registrations_count_insert
+        AFTER INSERT ON event_registrations BEGIN
+            UPDATE events SET registered_count = registered_count + 1
+            WHERE id = new.event_id;
+            DELETE FROM event_waitlist
+            WHERE user_id = new.user_id
+                AND organization_id = new.organization_id
+                AND event_id = new.event_id;
+        END;
+        -- a freed spot goes to the first user on the waitlist
+        CREATE TRIGGER IF NOT EXISTS event_registrations_count_delete
+        AFTER DELETE ON event_registrations BEGIN
+            UPDATE events SET registered_count = registered_count - 1
+            WHERE id = old.event_id;
+            INSERT INTO event_registrations
+                (user_id, event_id, organization_id, registration_time)
+            SELECT w.user_id, w.event_id, w.organization_id,
+                strftime('%Y-%m-%dT%H:%M:%S', 'now')
+            FROM event_waitlist w
+            JOIN events e ON e.id = w.event_id
+            WHERE w.event_id = old.event_id
+                AND (e.capacity IS NULL OR e.registered_count < e.capacity)
+            ORDER BY w.waitlist_time, w.user_id
+            LIMIT 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS event_registrations_count_update
+        AFTER UPDATE OF event_id ON event_registrations
+        WHEN old.event_id != new.event_id BEGIN
+            UPDATE events SET registered_count = registered_count - 1
+            WHERE id = old.event_id;
+            UPDATE events SET registered_count = registered_count + 1
+            WHERE id = new.event_id;
+        END;
+        -- raising (or removing) the capacity lets in as many as now fit
+        CREATE TRIGGER IF NOT EXISTS events_capacity_update
+        AFTER UPDATE OF capacity ON events BEGIN
+            INSERT INTO event_registrations
+                (user_id, event_id, organization_id, registration_time)
+            SELECT user_id, event_id, organization_id,
+                strftime('%Y-%m-%dT%H:%M:%S', 'now')
+            FROM event_waitlist
+            WHERE event_id = new.id
+            ORDER BY waitlist_time, user_id
+            LIMIT CASE
+                WHEN new.capacity IS NULL THEN -1
+                ELSE max(new.capacity - new.registered_count, 0)
+            END;
+        END;
+        -- only full events have a waitlist, and registered users can't join it
+        CREATE TRIGGER IF NOT EXISTS event_waitlist_check
+        BEFORE INSERT ON event_waitlist BEGIN
+            SELECT RAISE(ABORT, 'Registration already exists')
+            WHERE EXISTS (
+                SELECT 1 FROM event_registrations
+                WHERE user_id = new.user_id
+                    AND organization_id = new.organization_id
+                    AND event_id = new.event_id
+            );
+            SELECT RAISE(ABORT, 'Event is not full')
+            FROM events
+            WHERE id = new.event_id
+                AND (capacity IS NULL OR registered_count < capacity);
+        END;
+        """,
+    ),
+    (
+        6,
+        "version counters for the ETag and Last-Modified headers of read routes",
+        """
+        -- One counter per resource the read routes return validators for, bumped by the
+        -- triggers below on every write so a conditional GET is answered from this
+        -- table alone. A resource without a row is version 0, unchanged since the
+        -- database was created. id is 0 for counters of a whole table.
+        CREATE TABLE IF NOT EXISTS resource_versions (
+            resource TEXT NOT NULL,
+            id INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            -- unix time of the last change
+            modified_at INTEGER NOT NULL,
+            PRIMARY KEY (resource, id)
+        ) WITHOUT ROWID;
+        -- a random id for this database, part of every ETag so counters starting over
+        -- in a recreated database can't match responses cached from the old one
+        INSERT OR IGNORE INTO resource_versions (resource, id, version, modified_at)
+        VALUES (
+            'database', 0, abs(random() % 1000000000),
+            CAST(strftime('%s', 'now') AS INTEGER)
+        );
+
+        -- events change through update_event and through the registration count
+        -- triggers, both are updates of the row
+        CREATE TRIGGER IF NOT EXISTS events_version_update AFTER UPDATE ON events BEGIN
+            INSERT INTO resource_versions (resource, id, version, modified_at)
+            VALUES ('event', new.id, 1, CAST(strftime('%s', 'now') AS INTEGER))
+            ON CONFLICT (resource, id) DO UPDATE
+            SET version = version + 1, modified_at = excluded.modified_at;
+        END;
+        CREATE TRIGGER IF NOT EXISTS events_version_delete AFTER DELETE ON events BEGIN
+            INSERT INTO resource_versions (resource, id, version, modified_at)
+            VALUES ('event', old.id, 1, CAST(strftime('%s', 'now') AS INTEGER))
+            ON CONFLICT (resource, id) DO UPDATE
+            SET version = version + 1, modified_at = excluded.modified_at;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS users_version_update AFTER UPDATE ON users BEGIN
+            INSERT INTO resource_versions (resource, id, version, modified_at)
+            VALUES ('user', new.user_id, 1, CAST(strftime('%s', 'now') AS INTEGER))
+            ON CONFLICT (resource, id) DO UPDATE
+            SET version = version + 1, modified_at = excluded.modified_at;
+        END;
+        CREATE TRIGGER IF NOT EXISTS users_version_delete AFTER DELETE ON users BEGIN
+            INSERT INTO resource_versions (resource, id, version, modified_at)
+            VALUES ('user', old.user_id, 1, CAST(strftime('%s', 'now') AS INTEGER))
+            ON CONFLICT (resource, id) DO UPDATE
+            SET version = version + 1, modified_at = excluded.modified_at;
+        END;
+        -- member lists show the user's name
+        CREATE TRIGGER IF NOT EXISTS users_members_version_update
+        AFTER UPDATE OF first_name, last_name ON users BEGIN
+            INSERT INTO resource_versions (resource, id, version, modified_at)
+            SELECT 'organization_members', organization_id, 1,
+                CAST(strftime('%s', 'now') AS INTEGER)
+            FROM roles
+            WHERE user_id = new.user_id
+            ON CONFLICT (resource, id) DO UPDATE
+            SET version = version + 1, modified_at = excluded.modified_at;
+        END;
+
+        -- the organization list is paginated and searched, any write to the table
+        -- can change a page
+        CREATE TRIGGER IF NOT EXISTS organizations_version_insert
+        AFTER INSERT ON organizations BEGIN
+            INSERT INTO resource_versions (resource, id, version, modified_at)
+            VALUES ('organizations', 0, 1, CAST(strftime('%s', 'now') AS INTEGER))
+            ON CONFLICT (resource, id) DO UPDATE
+            SET version = version + 1, modified_at = excluded.modified_at;
+        END;
+        CREATE TRIGGER IF NOT EXISTS organizations_version_update
+        AFTER UPDATE ON organizations BEGIN
+            INSERT INTO resource_versions (resource, id, version, modified_at)
+            VALUES ('organizations', 0, 1, CAST(strftime('%s', 'now') AS INTEGER))
+            ON CONFLICT (resource, id) DO UPDATE
+            SET version = version + 1, modified_at = excluded.modified_at;
+        END;
+        CREATE TRIGGER IF NOT EXISTS organizations_version_delete
+        AFTER DELETE ON organizations BEGIN
+            INSERT INTO resource_versions (resource, id, version, modified_at)
+            VALUES ('organizations', 0, 1, CAST(strftime('%s', 'now') AS INTEGER))
+            ON CONFLICT (resource, id) DO UPDATE
+            SET version = version + 1, modified_at = excluded.modified_at;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS roles_version_insert AFTER INSERT ON roles BEGIN
+            INSERT INTO resource_versions (resource, id, version, modified_at)
+            VALUES (
+                'organization_members', new.organization_id, 1,
+                CAST(strftime('%s', 'now') AS INTEGER)
+            )
+            ON CONFLICT (resource, id) DO UPDATE
+            SET version = version + 1, modified_at = excluded.modified_at;
+        END;
+        CREATE TRIGGER IF NOT EXISTS roles_version_update AFTER UPDATE ON roles BEGIN
+            INSERT INTO resource_versions (resource, id, version, modified_at)
+            SELECT 'organization_members', organization_id, 1,
+                CAST(strftime('%s', 'now') AS INTEGER)
+            FROM (SELECT new.organization_id AS organization_id
+                UNION SELECT old.organization_id)
+            WHERE true
+            ON CONFLICT (resource, id) DO UPDATE
+            SET version = version + 1, modified_at = excluded.modified_at;
+        END;
+        CREATE TRIGGER IF NOT EXISTS roles_version_delete AFTER DELETE ON roles BEGIN
+            INSERT INTO resource_versions (resource, id, version, modified_at)
+            VALUES (
+                'organization_members', old.organization_id, 1,
+                CAST(strftime('%s', 'now') AS INTEGER)
+            )
+            ON CONFLICT (resource, id) DO UPDATE
+            SET version = version + 1, modified_at = excluded.modified_at;
+        END;
+        """,
+    ),
+    (
+        7,
+        "change log of cached users and roles for invalidating the caches of every worker",
+        """
+        -- Every change to a user or a role appends the id to this log in the same
+        -- transaction, each worker follows it (utils/cache_sync.py) and drops its
+        -- cached copies, whichever process made the change. Old rows are pruned.
+        CREATE TABLE IF NOT EXISTS cache_invalidations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cache TEXT NOT NULL,
+            key INTEGER NOT NULL,
+            -- unix time of the change
+            created_at INTEGER NOT NULL
+        );
+
+        CREATE TRIGGER IF NOT EXISTS users_cache_update AFTER UPDATE ON users BEGIN
+            INSERT INTO cache_invalidations (cache, key, created_at)
+            SELECT 'user', user_id, CAST(strftime('%s', 'now') AS INTEGER)
+            FROM (SELECT new.user_id AS user_id UNION SELECT old.user_id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS users_cache_delete AFTER DELETE ON users BEGIN
+            INSERT INTO cache_invalidations (cache, key, created_at)
+            VALUES ('user', old.user_id, CAST(strftime('%s', 'now') AS INTEGER));
+        END;
+        CREATE TRIGGER IF NOT EXISTS credentials_cache_update
+        AFTER UPDATE ON credentials BEGIN
+            INSERT INTO cache_invalidations (cache, key, created_at)
+            VALUES ('user', old.user_id, CAST(strftime('%s', 'now') AS INTEGER));
+        END;
+        CREATE TRIGGER IF NOT EXISTS credentials_cache_delete
+        AFTER DELETE ON credentials BEGIN
+            INSERT INTO cache_invalidations (cache, key, created_at)
+            VALUES ('user', old.user_id, CAST(strftime('%s', 'now') AS INTEGER));
+        END;
+
+        -- also fired for the roles deleted with their organization
+        CREATE TRIGGER IF NOT EXISTS roles_cache_insert AFTER INSERT ON roles BEGIN
+            INSERT INTO cache_invalidations (cache, key, created_at)
+            VALUES ('roles', new.user_id, CAST(strftime('%s', 'now') AS INTEGER));
+        END;
+        CREATE TRIGGER IF NOT EXISTS roles_cache_update AFTER UPDATE ON roles BEGIN
+            INSERT INTO cache_invalidations (cache, key, created_at)
+            SELECT 'roles', user_id, CAST(strftime('%s', 'now') AS INTEGER)
+            FROM (SELECT new.user_id AS user_id UNION SELECT old.user_id);
+        END;
+        CREATE TRIGGER IF NOT EXISTS roles_cache_delete AFTER DELETE ON roles BEGIN
+            INSERT INTO cache_invalidations (cache, key, created_at)
+            VALUES ('roles', old.user_id, CAST(strftime('%s', 'now') AS INTEGER));
+        END;
+        """,
+    ),
+    (
+        8,
+        "version counters of single organizations",
+        """
+        -- get_organization's validators and cached profile only change with the row,
+        -- the 'organizations' counter of the whole table would invalidate every
+        -- organization on any write
+        CREATE TRIGGER IF NOT EXISTS organization_version_update
+        AFTER UPDATE ON organizations BEGIN
+            INSERT INTO resource_versions (resource, id, version, modified_at)
+            VALUES (
+                'organization', new.organization_id, 1,
+                CAST(strftime('%s', 'now') AS INTEGER)
+            )
+            ON CONFLICT (resource, id) DO UPDATE
+            SET version = version + 1, modified_at = excluded.modified_at;
+        END;
+        CREATE TRIGGER IF NOT EXISTS organization_version_delete
+        AFTER DELETE ON organizations BEGIN
+            INSERT INTO resource_versions (resource, id, version, modified_at)
+            VALUES (
+                'organization', old.organization_id, 1,
+                CAST(strftime('%s', 'now') AS INTEGER)
+            )
+            ON CONFLICT (resource, id) DO UPDATE
+            SET version = version + 1, modified_at = excluded.modified_at;
+        END;
+        """,
+    ),
+]
+
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def run_migrations(conn) -> list[int]:
+    """
+    Apply every migration newer than the database's `user_version`, each one in its
+    own transaction together with the version bump so a failed migration leaves the
+    database at the previous version.
+
+    Returns the versions that were applied.
+    """
+    current = get_schema_version(conn)
+    applied = []
+    for version, description, sql in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            conn.executescript(
+                f"BEGIN;\n{sql}\nPRAGMA user_version = {version};\nCOMMIT;"
+            )
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        logger.info("Applied migration %s: %s", version, description)
+        applied.append(version)
+    return applied
+
+
 # DB schema for nuking the database, useful for testing and development when you want to reset the database
 DROP_DB_SQL = """
+DROP TABLE IF EXISTS users_fts;
+DROP TABLE IF EXISTS organizations_fts;
+DROP TABLE IF EXISTS events_fts;
 DROP TABLE IF EXISTS users;
 DROP TABLE IF EXISTS organizations;
 DROP TABLE IF EXISTS roles;
 DROP TABLE IF EXISTS event_registrations;
+DROP TABLE IF EXISTS event_waitlist;
+DROP TABLE IF EXISTS resource_versions;
+DROP TABLE IF EXISTS cache_invalidations;
 DROP TABLE IF EXISTS credentials;
 DROP TABLE IF EXISTS events;
+PRAGMA user_version = 0;
 """
@@ -0,0 +1,41 @@
+import os
+
+from utils.cache import CacheBackend, ReadThroughCache, TTLCache
+
+# Event details, organization profiles and member lists are read far more often than
+# they change, they share one bounded LRU cache. Entries are invalidated by the routes
+# that change them and checked against the resource version on every hit, the version
+# of the one event, organization or member list so a write only misses its own entry.
+ENTITY_CACHE_SIZE = int(os.environ.get("ENTITY_CACHE_SIZE", "10000"))
+ENTITY_CACHE_TTL = float(os.environ.get("ENTITY_CACHE_TTL", "300"))
+# member lists longer than this are not cached, the size bounds the number of entries
+# so one large organization can't take up a disproportionate share of the memory
+MEMBERS_CACHE_MAX_ROWS = int(os.environ.get("MEMBERS_CACHE_MAX_ROWS", "1000"))
+
+_backend = TTLCache(max_size=ENTITY_CACHE_SIZE, ttl=ENTITY_CACHE_TTL)
+event_cache = ReadThroughCache("event", _backend)
+organization_cache = ReadThroughCache("organization", _backend)
+members_cache = ReadThroughCache(
+    "organization_members", _backend, max_items=MEMBERS_CACHE_MAX_ROWS
+)
+
+ENTITY_CACHES = [event_cache, organization_cache, members_cache]
+
+
+def configure_entity_cache(backend: CacheBackend) -> None:
+    """
+    Swap the backend of every entity cache, e.g. for one shared by all the workers.
+    """
+    for cache in ENTITY_CACHES:
+        cache.backend = backend
+
+
+def entity_cache_stats() -> dict:
+    """
+    The stats of the shared backend (size, evictions...) and the hits and misses of
+    each entity cache.
+    """
+    return {
+        "backend": event_cache.backend.stats(),
+        **{cache.name: cache.stats() for cache in ENTITY_CACHES},
+    }
@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Literal, Mapping, Sequence
+
+from fastapi.responses import StreamingResponse
+
+ExportFormat = Literal["ndjson", "csv"]
+
+# rows fetched from the database and encoded per chunk of the response body, memory
+# use is bounded by one batch however large the export is
+EXPORT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+async def encode_rows(
+    batches: AsyncIterator[list[Mapping]],
+    columns: Sequence[str],
+    export_format: ExportFormat,
+) -> AsyncIterator[bytes]:
+    """
+    Encode batches of rows (mappings of `columns`) one batch at a time, as NDJSON (one
+    JSON object per line) or CSV with a header row.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == "csv":
+        writer.writerow(columns)
+
+    async for rows in batches:
+        if export_format == "csv":
+            writer.writerows([row[column] for column in columns] for row in rows)
+        else:
+            for row in rows:
+                buffer.write(
+                    json.dumps(
+                        {column: row[column] for column in columns},
+                        separators=(",", ":"),
+                    )
+                )
+                buffer.write("\n")
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    # an empty CSV export still has its header
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_export(
+    batches: AsyncIterator[list[Mapping]],
+    columns: Sequence[str],
+    export_format: ExportFormat,
+    filename: str,
+) -> StreamingResponse:
+    """
+    Stream the batches of rows of a repository export (export_events, export_users...)
+    as a file download, rows are read from the database as the response is sent so the
+    first bytes go out right away.
+
+    The repository checks out its own connection rather than using a request
+    dependency, which is released before the response body is sent. The connection is
+    acquired and the query executed when the body starts, so a response that is never
+    sent (the client disconnects first, an error) holds nothing. The connection goes
+    back to the pool once the export is done, or the client disconnects.
+    """
+    return StreamingResponse(
+        encode_rows(batches, columns, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format}"'
+        },
+    )
@@ -0,0 +1,95 @@
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# how often a blocking acquire retries on Windows, msvcrt can't wait for the lock
+_RETRY_INTERVAL = 0.05
+
+
+class FileLock:
+    """
+    An exclusive lock on a file shared by every process on the host, e.g. the workers
+    of a multi-worker server. The lock is held until `release` or until the process
+    exits, the operating system drops it even if the process crashes, so a lock is
+    never left behind.
+
+    The lock file is created next to the database and is never deleted, deleting it
+    while another process waits on it would let two processes hold "the" lock.
+
+        with FileLock("app.db.lock"):
+            ...  # only one process at a time
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: int | None = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Take the lock, waiting for it unless `blocking` is False. Returns whether the
+        lock is held, acquiring a lock this instance already holds is a no-op.
+        """
+        if self._fd is not None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if not _lock(fd, blocking):
+                os.close(fd)
+                return False
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        try:
+            _unlock(fd)
+        finally:
+            os.close(fd)
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+def _lock(fd: int, blocking: bool) -> bool:
+    if fcntl is not None:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            return False
+        return True
+
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(_RETRY_INTERVAL)
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
@@ -1,131 +1,80 @@
-from faker import Faker
-import hashlib
 import random
-from datetime import datetime, timedelta
-
-# Faker init
-fake = Faker()
-
-
-def generate_password_hash(password):
-    """Generate a hash MD5 for password"""
-    return hashlib.md5(password.encode()).hexdigest()
-
-
-def generate_identification_number():
-    """Generate an unique ID"""
-    return fake.unique.bothify(text="##########")
-
-
-def generate_skills():
-    """Generate a random skills list"""
-    skills_list = [
-        "Communication",
-        "Empathy and compassion",
-        "Reliability and commitment",
-        "Adaptability",
-        "Flexibility",
-        "Teamwork",
-        "Problem-solving",
-        "Time management",
-        "Leadership",
-        "Digital skills",
-        "Technical skills",
-        "Cultural competence",
-    ]
-    return ", ".join(random.sample(skills_list, random.randint(2, 5)))
+import re
+from typing import Iterable, Iterator
 
+from faker import Faker
+from faker.providers.person.en_US import Provider as PersonProvider
 
-def generate_education():
-    """Generate a random educational level"""
-    education_levels = [
-        "High School",
-        "Associate Degree",
-        "Bachelor's Degree",
-        "Master's Degree",
-        "PhD",
-        "Technical Certification",
-    ]
-    return random.choice(education_levels)
+AVAILABILITY_OPTIONS = ["Full-time", "Part-time", "Weekends", "Evenings"]
+NUM_DOMAINS = 50
 
 
-def generate_profile_picture():
-    """Generate a fake image URL"""
-    return f"https://example.com/profile/{fake.uuid4()}.jpg"
+def _email_part(name: str) -> str:
+    # names like O'Connor, emails only get the letters
+    return re.sub(r"[^a-z]", "", name.lower())
 
 
-def generate_user_data(num_records=100):
-    """Generate fake data for Users table"""
+def _name_pool(names: Iterable[str]) -> list[str]:
+    # one name per email part, so a combination of pool indexes is one email address
+    return list({_email_part(name): name for name in names}.values())
 
-    # default pre-defined options
-    genders = ["Male", "Female", "Other", "Prefer not to say"]
-    availability_options = ["Full-time", "Part-time", "Weekends", "Evenings"]
-    countries = [
-        "United States",
-        "Canada",
-        "United Kingdom",
-        "Australia",
-        "Germany",
-        "France",
-        "Spain",
-    ]
 
-    users_data = []
+# Names are drawn from Faker's word lists rather than calling Faker per row, which is
+# far too slow for millions of users. The pools are the same in every process so
+# chunks generated in parallel match chunks generated inline.
+FIRST_NAMES = _name_pool(PersonProvider.first_names)
+LAST_NAMES = _name_pool(PersonProvider.last_names)
+_fake = Faker()
+_fake.seed_instance(0)
+DOMAINS = sorted({_fake.domain_name() for _ in range(NUM_DOMAINS)})
 
-    for _ in range(num_records):
-        first_name = fake.first_name()
-        last_name = fake.last_name()
-        email = f"{first_name.lower()}.{last_name.lower()}@{fake.domain_name()}"
+_FIRST_EMAIL_PARTS = [_email_part(name) for name in FIRST_NAMES]
+_LAST_EMAIL_PARTS = [_email_part(name) for name in LAST_NAMES]
 
-        # unique email
-        while any(email == user[0] for user in users_data):
-            first_name = fake.first_name()
-            last_name = fake.last_name()
-            email = f"{first_name.lower()}.{last_name.lower()}@{fake.domain_name()}"
 
-        # Generate data
-        password_hash = generate_password_hash("Password123!")
-        phone = fake.phone_number()[:20]
-        birth_date = fake.date_of_birth(minimum_age=18, maximum_age=70).strftime(
-            "%Y-%m-%d"
-        )
-        gender = random.choice(genders)
-        identification_number = generate_identification_number()
-        country = random.choice(countries)
-        city = fake.city()
-        address = fake.address().replace("\n", ", ")[:100]
-        profile_picture = generate_profile_picture()
-        education = generate_education()
-        skills = generate_skills()
-        availability = random.choice(availability_options)
-        active = random.choice([0, 1])
+def generate_users_chunk(start: int, count: int, seed: int) -> list[tuple]:
+    """
+    Generate `count` users starting at user number `start`, as indexes into the name
+    pools: (first_name, last_name, domain, availability).
 
-        # Generate random registry date in last two years
-        days_ago = random.randint(0, 730)
-        registration_date = (datetime.now() - timedelta(days=days_ago)).strftime(
-            "%Y-%m-%d %H:%M:%S"
+    Every chunk has its own random generator derived from the seed and its start, so
+    chunks can be generated in any order or in parallel and still give the same data.
+    """
+    rng = random.Random(f"{seed}-users-{start}")
+    return list(
+        zip(
+            rng.choices(range(len(FIRST_NAMES)), k=count),
+            rng.choices(range(len(LAST_NAMES)), k=count),
+            rng.choices(range(len(DOMAINS)), k=count),
+            rng.choices(AVAILABILITY_OPTIONS, k=count),
         )
-
-        users_data.append(
-            (
-                email,
-                password_hash,
-                first_name,
-                last_name,
-                phone,
-                birth_date,
-                gender,
-                identification_number,
-                country,
-                city,
-                address,
-                profile_picture,
-                education,
-                skills,
-                availability,
-                active,
-                registration_date,
-            )
+    )
+
+
+def assign_unique_emails(users: Iterable[tuple], start: int = 1) -> Iterator[tuple]:
+    """
+    Turn generated users into (email, first_name, last_name, availability) rows with
+    a unique email each.
+
+    The first user with a name and domain combination gets `first.last@domain`, the
+    ones after it get their user number added (`first.last42@domain`). Used
+    combinations are tracked in a bit set, one bit per possible combination, so
+    checking is O(1) and memory stays a few MB no matter how many users there are.
+    Email parts never contain digits, so the numbered emails can't collide with the
+    plain ones or each other.
+    """
+    seen = bytearray(len(FIRST_NAMES) * len(LAST_NAMES) * len(DOMAINS) // 8 + 1)
+    for number, (first, last, domain, availability) in enumerate(users, start):
+        combination = (first * len(LAST_NAMES) + last) * len(DOMAINS) + domain
+        byte, bit = divmod(combination, 8)
+        local = f"{_FIRST_EMAIL_PARTS[first]}.{_LAST_EMAIL_PARTS[last]}"
+        if seen[byte] & (1 << bit):
+            local = f"{local}{number}"
+        else:
+            seen[byte] |= 1 << bit
+        yield (
+            f"{local}@{DOMAINS[domain]}",
+            FIRST_NAMES[first],
+            LAST_NAMES[last],
+            availability,
         )
-
-    return users_data
@@ -0,0 +1,60 @@
+import random
+from datetime import datetime, timedelta
+
+from generate_events_data import generate_event_schedule
+
+# registrations happen up to this long before the event
+MAX_DAYS_BEFORE_EVENT = 30
+
+
+def registrations_per_event(event_id: int, num_events: int, num_registrations: int):
+    """Registrations are spread evenly, the first events take the remainder"""
+    per_event, remainder = divmod(num_registrations, num_events)
+    return per_event + (1 if event_id <= remainder else 0)
+
+
+def generate_event_registrations_chunk(
+    events_start: int,
+    events_count: int,
+    start: int,
+    count: int,
+    seed: int,
+    num_users: int,
+    num_orgs: int,
+    num_events: int,
+    num_registrations: int,
+    start_date: str,
+) -> list[tuple]:
+    """
+    Generate the registrations of the `count` events starting at event id `start`,
+    as (user_id, event_id, organization_id, registration_time) rows.
+
+    `events_start` and `events_count` are the chunk the events were generated in,
+    needed to get the same schedule back, `start` and `count` can be a slice of it so
+    a chunk of registrations stays a reasonable size.
+    """
+    rng = random.Random(f"{seed}-event-registrations-{start}")
+    schedule = generate_event_schedule(
+        events_start, events_count, seed, num_orgs, start_date
+    )
+    registrations_data = []
+    for event_id in range(start, start + count):
+        organization_id, time = schedule[event_id - events_start]
+        event_time = datetime.fromisoformat(time)
+        num_event_registrations = min(
+            num_users, registrations_per_event(event_id, num_events, num_registrations)
+        )
+        # sampling without replacement keeps (user_id, event_id) unique
+        for user_id in rng.sample(range(1, num_users + 1), num_event_registrations):
+            registration_time = event_time - timedelta(
+                seconds=rng.randrange(1, MAX_DAYS_BEFORE_EVENT * 86400)
+            )
+            registrations_data.append(
+                (
+                    user_id,
+                    event_id,
+                    organization_id,
+                    registration_time.isoformat(timespec="seconds"),
+                )
+            )
+    return registrations_data
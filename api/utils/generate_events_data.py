@@ -0,0 +1,86 @@
+import random
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from faker import Faker
+from faker.providers.lorem.en_US import Provider as LoremProvider
+
+WORDS = LoremProvider.word_list
+ACTIVITIES = [
+    "Beach Cleanup",
+    "Food Drive",
+    "Tutoring Session",
+    "Community Garden Day",
+    "Shelter Meal Service",
+    "Park Restoration",
+    "Blood Drive",
+    "Coding Workshop",
+    "Clothing Drive",
+    "Senior Center Visit",
+    "Animal Shelter Walk",
+    "Library Book Sort",
+    "Habitat Build",
+    "River Cleanup",
+    "Mentoring Meetup",
+    "Repair Cafe",
+]
+# events are spread from this many days before the start date to this many after
+DAYS_BEFORE = 90
+DAYS_AFTER = 365
+
+# same pools in every process, see genarate_users_data
+_fake = Faker()
+_fake.seed_instance(0)
+CITIES = sorted({_fake.city() for _ in range(300)})
+STREETS = sorted({_fake.street_name() for _ in range(300)})
+
+
+# the registrations of a chunk of events are generated in several slices, each of
+# them needs the schedule of the whole chunk
+@lru_cache(maxsize=4)
+def generate_event_schedule(
+    start: int, count: int, seed: int, num_orgs: int, start_date: str
+) -> list[tuple]:
+    """
+    The (organization_id, time) of `count` events starting at event id `start`.
+
+    This uses its own random generator, separate from the rest of the event fields,
+    so the registrations can be generated against the events without reading them back
+    from the database or generating their text again.
+    """
+    rng = random.Random(f"{seed}-event-schedule-{start}")
+    first_day = datetime.fromisoformat(start_date) - timedelta(days=DAYS_BEFORE)
+    schedule = []
+    for _ in range(count):
+        # quarter hours between 6:00 and 21:45 so every time of day bucket gets events
+        time = first_day + timedelta(
+            days=rng.randrange(DAYS_BEFORE + DAYS_AFTER),
+            minutes=15 * rng.randrange(6 * 4, 22 * 4),
+        )
+        schedule.append((rng.randint(1, num_orgs), time.isoformat(timespec="seconds")))
+    return schedule
+
+
+def generate_events_chunk(
+    start: int, count: int, seed: int, num_orgs: int, start_date: str
+) -> list[tuple]:
+    """
+    Generate `count` events starting at event id `start`, as
+    (name, description, location, time, organization_id) rows.
+    """
+    rng = random.Random(f"{seed}-events-{start}")
+    events_data = []
+    for organization_id, time in generate_event_schedule(
+        start, count, seed, num_orgs, start_date
+    ):
+        city = rng.choice(CITIES)
+        events_data.append(
+            (
+                f"{rng.choice(ACTIVITIES)} in {city}",
+                f"{' '.join(rng.choices(WORDS, k=20)).capitalize()}.",
+                f"{rng.randint(1, 9999)} {rng.choice(STREETS)}, {city}",
+                time,
+                organization_id,
+            )
+        )
+    return events_data
@@ -1,45 +1,45 @@
 import json
-import sqlite3
+import random
 
-from faker import Faker
+from faker.providers.lorem.en_US import Provider as LoremProvider
 
-# Faker init
-fake = Faker()
+WORDS = LoremProvider.word_list
+ORGANIZATION_SUFFIXES = [
+    "Alliance",
+    "Collective",
+    "Foundation",
+    "Initiative",
+    "Network",
+    "Project",
+    "Society",
+    "Trust",
+]
 
 
-def get_admin_users(conn: sqlite3.Connection):
-    """
-    This query is to ensure to match the admin user from Roles with created_by_user_id
-    """
-    cursor = conn.cursor()
-
-    query = """
-    SELECT * FROM roles WHERE permission_level = 'admin' ORDER BY organization_id
-    """
-
-    cursor.execute(query)
-    rows = cursor.fetchall()
-
-    return rows
-
-
-def generate_organizations_data(org_list_file, conn: sqlite3.Connection):
-    """Generate fake data for Organizations table"""
-    admin_users = get_admin_users(conn)  # user_id, organization_id, permission_level
-    # read from org_list_file the organizations list
+def load_organization_names(org_list_file) -> list[str]:
+    """Read the hand picked organization names, used for the first organizations"""
     with open(org_list_file, "r") as file:
-        orgs_list = json.load(file)
-
-    orgs_data = []
-
-    print(f"Generating data for {len(admin_users)} admins...")
+        return [organization["name"] for organization in json.load(file)]
 
-    for k in range(len(admin_users)):
 
-        created_by_user_id = admin_users[k][0]
-        name = orgs_list[k]["name"]
-        description = fake.text(max_nb_chars=100)
-
-        orgs_data.append((created_by_user_id, name, description))
+def generate_organizations_chunk(
+    start: int, count: int, seed: int, num_users: int, names: list[str]
+) -> list[tuple]:
+    """
+    Generate `count` organizations starting at organization id `start`, as
+    (created_by_user_id, name, description) rows. The first organizations take their
+    names from `names`, the rest get a generated one.
 
-    return orgs_data
+    Like the users, every chunk has its own random generator derived from the seed.
+    """
+    rng = random.Random(f"{seed}-organizations-{start}")
+    organizations_data = []
+    for organization_id in range(start, start + count):
+        if organization_id <= len(names):
+            name = names[organization_id - 1]
+        else:
+            name = f"{' '.join(rng.choices(WORDS, k=2)).title()} {rng.choice(ORGANIZATION_SUFFIXES)}"
+        description = f"{' '.join(rng.choices(WORDS, k=15)).capitalize()}."
+        created_by_user_id = rng.randint(1, num_users)
+        organizations_data.append((created_by_user_id, name, description))
+    return organizations_data
@@ -1,30 +1,23 @@
-from faker import Faker
 import random
 
-# Faker init
-fake = Faker()
-
-
-def generate_roles_data(num_records=100):
-    """Generate fake data for roles table"""
-    # default pre-defined options
 
+def generate_roles_chunk(
+    start: int, creators: list[int], seed: int, num_users: int, volunteers: int
+) -> list[tuple]:
+    """
+    Generate the roles of the organizations starting at organization id `start`,
+    `creators` holds the created_by_user_id of each of them. The creator is the admin
+    of the organization, plus up to `volunteers` distinct random volunteers, as
+    (user_id, organization_id, permission_level) rows.
+    """
+    rng = random.Random(f"{seed}-roles-{start}")
     roles_data = []
-    user_number = 100  # This number will be use to generate random user ids
-    org_number = 20  # This is the number of organizations
-
-    org_ids_with_admin = []  # save orgs with an admin user
-
-    for _ in range(num_records):
-        organization_id = random.choice(range(1, org_number + 1))
-        # To ensure a unique admin user for each organization
-        if organization_id in org_ids_with_admin:
-            permission_level = "volunteer"
-        else:
-            permission_level = "admin"
-            org_ids_with_admin.append(organization_id)
-
-        user_id = fake.unique.random_int(min=1, max=user_number)
-        roles_data.append((user_id, organization_id, permission_level))
-
+    for organization_id, admin_id in enumerate(creators, start):
+        roles_data.append((admin_id, organization_id, "admin"))
+        # sample one extra in case the admin is picked, sampling without replacement
+        # keeps (user_id, organization_id) unique without tracking what was used
+        sample = rng.sample(range(1, num_users + 1), min(volunteers + 1, num_users))
+        volunteer_ids = [user_id for user_id in sample if user_id != admin_id]
+        for user_id in volunteer_ids[:volunteers]:
+            roles_data.append((user_id, organization_id, "volunteer"))
     return roles_data
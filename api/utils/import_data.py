@@ -0,0 +1,79 @@
+"""
+Import users, organizations, or events from a CSV or NDJSON file, run from the `api`
+folder. This does the same as POST /api/import/{kind} without going through the API.
+
+    python utils/import_data.py users users.csv
+    python utils/import_data.py events events.ndjson --db app.db
+
+Records are validated against the API models and inserted in chunks, records that
+fail are reported by row and the rest are still imported.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# the import code lives with the API, which imports from the `api` folder
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.bulk_import import (  # noqa: E402
+    IMPORT_MODELS,
+    guess_format,
+    import_records,
+)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("kind", choices=list(IMPORT_MODELS))
+    parser.add_argument("file", type=Path)
+    parser.add_argument(
+        "--format",
+        dest="import_format",
+        choices=["ndjson", "csv"],
+        default=None,
+        help="defaults to guessing from the file extension",
+    )
+    parser.add_argument("--db", default="app.db", help="database file to import into")
+    args = parser.parse_args(argv)
+
+    args.import_format = args.import_format or guess_format(args.file.name)
+    if args.import_format is None:
+        parser.error("unknown file format, pass --format csv or --format ndjson")
+    if not Path(args.db).exists():
+        parser.error(f"{args.db} does not exist, start the API or seed it first")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    # the database is picked when db is first imported
+    os.environ["DATABASE_PATH"] = args.db
+    from repositories.sqlite import SqliteImportRepository
+    from utils.writer import close_write_queue
+
+    started = time.perf_counter()
+    try:
+        with open(args.file, "rb") as file:
+            result = asyncio.run(
+                import_records(
+                    SqliteImportRepository(), args.kind, file, args.import_format
+                )
+            )
+    finally:
+        close_write_queue()
+
+    for error in result.errors:
+        print(f"row {error.row}: {error.detail}")
+    if result.failed > len(result.errors):
+        print(f"... and {result.failed - len(result.errors)} more")
+    print(
+        f"\n{result.inserted} {args.kind} imported, {result.failed} failed, "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+    if result.failed:
+        sys.exit(1)
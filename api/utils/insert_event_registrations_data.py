@@ -0,0 +1,58 @@
+import sqlite3
+
+from batch_insert import insert_in_batches
+
+
+def insert_event_registrations_data(conn, cursor, registrations_data):
+    """
+    Insert data in event_registrations table, registrations_data can be any iterable
+    of rows and is inserted in batches within a single transaction. Returns the number
+    of rows inserted.
+    """
+
+    insert_query = """
+    INSERT INTO event_registrations (
+        user_id, event_id, organization_id, registration_time
+    ) VALUES (?, ?, ?, ?)
+    """
+
+    try:
+        inserted = insert_in_batches(cursor, insert_query, registrations_data)
+        conn.commit()
+        print(f"{inserted} records were inserted successfully.")
+        return inserted
+    except sqlite3.IntegrityError as e:
+        print(f"Integrity error: {e}")
+        conn.rollback()
+    except Exception as e:
+        print(f"Error: {e}")
+        conn.rollback()
+    return 0
+
+
+def verify_data(cursor):
+    """Verify correct data insertion"""
+    cursor.execute("SELECT COUNT(*) FROM event_registrations")
+    count = cursor.fetchone()[0]
+    print(f"Total records: {count}")
+
+    cursor.execute("SELECT * FROM event_registrations LIMIT 5")
+    sample_records = cursor.fetchall()
+
+    print("\nShowing 5 records:")
+    for (
+        record
+    ) in sample_records:  # user_id, event_id, organization_id, registration_time
+        print(
+            f"user_id: {record[0]}, event_id: {record[1]}, organization_id: {record[2]}, "
+            f"registration_time: {record[3]}"
+        )
+
+
+# Main configuration
+def execute_insert_event_registrations_data(conn, cursor, registrations_data):
+    print("Inserting event registrations in DB...")
+    insert_event_registrations_data(conn, cursor, registrations_data)
+
+    # Verifying insertion
+    verify_data(cursor)
@@ -0,0 +1,54 @@
+import sqlite3
+
+from batch_insert import insert_in_batches
+
+
+def insert_events_data(conn, cursor, events_data):
+    """
+    Insert data in events table, events_data can be any iterable of rows and is
+    inserted in batches within a single transaction. Returns the number of rows.
+    """
+
+    insert_query = """
+    INSERT INTO events (
+        name, description, location, time, organization_id
+    ) VALUES (?, ?, ?, ?, ?)
+    """
+
+    try:
+        inserted = insert_in_batches(cursor, insert_query, events_data)
+        conn.commit()
+        print(f"{inserted} records were inserted successfully.")
+        return inserted
+    except sqlite3.IntegrityError as e:
+        print(f"Integrity error: {e}")
+        conn.rollback()
+    except Exception as e:
+        print(f"Error: {e}")
+        conn.rollback()
+    return 0
+
+
+def verify_data(cursor):
+    """Verify correct data insertion"""
+    cursor.execute("SELECT COUNT(*) FROM events")
+    count = cursor.fetchone()[0]
+    print(f"Total records: {count}")
+
+    cursor.execute("SELECT id, name, time, organization_id FROM events LIMIT 5")
+    sample_records = cursor.fetchall()
+
+    print("\nShowing 5 records:")
+    for record in sample_records:
+        print(
+            f"ID: {record[0]}, name: {record[1]}, time: {record[2]}, organization_id: {record[3]}"
+        )
+
+
+# Main configuration
+def execute_insert_events_data(conn, cursor, events_data):
+    print("Inserting events in DB...")
+    insert_events_data(conn, cursor, events_data)
+
+    # Verifying insertion
+    verify_data(cursor)
@@ -1,10 +1,13 @@
 import sqlite3
 
-from generate_organizations_data import generate_organizations_data
+from batch_insert import insert_in_batches
 
 
 def insert_orgs_data(conn, cursor, orgs_data):
-    """Insert data in organizations table"""
+    """
+    Insert data in organizations table, orgs_data can be any iterable of rows and is
+    inserted in batches within a single transaction. Returns the number of rows.
+    """
 
     insert_query = """
     INSERT INTO organizations (
@@ -13,15 +16,17 @@ def insert_orgs_data(conn, cursor, orgs_data):
     """
 
     try:
-        cursor.executemany(insert_query, orgs_data)
+        inserted = insert_in_batches(cursor, insert_query, orgs_data)
         conn.commit()
-        print(f"{len(orgs_data)} records were inserted successfully.")
+        print(f"{inserted} records were inserted successfully.")
+        return inserted
     except sqlite3.IntegrityError as e:
         print(f"Integrity error: {e}")
         conn.rollback()
     except Exception as e:
         print(f"Error: {e}")
         conn.rollback()
+    return 0
 
 
 def verify_data(cursor):
@@ -34,17 +39,15 @@ def verify_data(cursor):
     sample_records = cursor.fetchall()
 
     print("\nShowing 5 records:")
-    for record in sample_records:  # legal_name, public_name, email, phone, country
-        print(f"ID: {record[0]}, created_by_user_id: {record[1]}, name: {record[2]}")
+    for (
+        record
+    ) in sample_records:  # organization_id, name, description, created_by_user_id
+        print(f"ID: {record[0]}, name: {record[1]}, created_by_user_id: {record[3]}")
 
 
 # Main configuration
-def execute_insert_orgs_data(conn, cursor, org_list_file):
-    print("Generating synthetic data...")
-
-    orgs_data = generate_organizations_data(org_list_file, conn)
-
-    print(f"Inserting {len(orgs_data)} records in DB...")
+def execute_insert_orgs_data(conn, cursor, orgs_data):
+    print("Inserting organizations in DB...")
     insert_orgs_data(conn, cursor, orgs_data)
 
     # Verifying insertion
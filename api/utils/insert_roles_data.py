@@ -1,10 +1,13 @@
 import sqlite3
 
-from generate_roles_data import generate_roles_data
+from batch_insert import insert_in_batches
 
 
 def insert_roles_data(conn, cursor, roles_data):
-    """Insert data in Roles table"""
+    """
+    Insert data in Roles table, roles_data can be any iterable of rows and is inserted
+    in batches within a single transaction. Returns the number of rows inserted.
+    """
 
     insert_query = """
     INSERT INTO roles (
@@ -13,15 +16,17 @@ def insert_roles_data(conn, cursor, roles_data):
     """
 
     try:
-        cursor.executemany(insert_query, roles_data)
+        inserted = insert_in_batches(cursor, insert_query, roles_data)
         conn.commit()
-        print(f"{len(roles_data)} records were inserted successfully.")
+        print(f"{inserted} records were inserted successfully.")
+        return inserted
     except sqlite3.IntegrityError as e:
         print(f"Integrity error: {e}")
         conn.rollback()
     except Exception as e:
         print(f"Error: {e}")
         conn.rollback()
+    return 0
 
 
 def verify_data(cursor):
@@ -41,12 +46,8 @@ def verify_data(cursor):
 
 
 # Main configuration
-def execute_insert_roles_data(conn, cursor, num_records):
-    print("Generating synthetic data...")
-
-    roles_data = generate_roles_data(num_records)
-
-    print(f"Inserting {len(roles_data)} records in DB...")
+def execute_insert_roles_data(conn, cursor, roles_data):
+    print("Inserting roles in DB...")
     insert_roles_data(conn, cursor, roles_data)
 
     # Verifying insertion
@@ -1,25 +1,47 @@
 import sqlite3
 
-from genarate_users_data import generate_user_data
+from batch_insert import insert_in_batches
 
 
 def insert_users_data(conn, cursor, users_data):
-    """Insert data in Users table"""
+    """
+    Insert data in Users table, users_data can be any iterable of rows and is inserted
+    in batches within a single transaction. Returns the number of rows inserted.
+    """
     insert_query = """
     INSERT INTO users (
         email, first_name, last_name, availability
     ) VALUES (?, ?, ?, ?)
     """
     try:
-        cursor.executemany(insert_query, users_data)
+        inserted = insert_in_batches(cursor, insert_query, users_data)
         conn.commit()
-        print(f"{len(users_data)} records were inserted successfully.")
+        print(f"{inserted} records were inserted successfully.")
+        return inserted
     except sqlite3.IntegrityError as e:
         print(f"Integridad error: {e}")
         conn.rollback()
     except Exception as e:
         print(f"Error: {e}")
         conn.rollback()
+    return 0
+
+
+def insert_credentials_data(conn, cursor, hashed_password):
+    """
+    Give every user without credentials the same password hash, in one statement
+    rather than a row at a time.
+    """
+    cursor.execute(
+        """
+        INSERT INTO credentials (user_id, hashed_password)
+        SELECT user_id, ? FROM users
+        WHERE user_id NOT IN (SELECT user_id FROM credentials)
+        """,
+        (hashed_password,),
+    )
+    conn.commit()
+    print(f"{cursor.rowcount} credentials were inserted successfully.")
 
 
 def verify_data(cursor):
@@ -39,15 +61,10 @@ def verify_data(cursor):
 
 
 # Main configuration
-def execute_insert_users_data(conn, cursor, num_records):
-    print("Generating synthetic data...")
-    generated_data = generate_user_data(num_records)
-    users_data = [
-        (email, first_name, last_name, availability)
-        for email, _, first_name, last_name, *_, availability, _, _ in generated_data
-    ]
-    print(f"Inserting {num_records} records in DB...")
+def execute_insert_users_data(conn, cursor, users_data, hashed_password):
+    print("Inserting users in DB...")
     insert_users_data(conn, cursor, users_data)
+    insert_credentials_data(conn, cursor, hashed_password)
 
     # Verifying insertion
     verify_data(cursor)
@@ -0,0 +1,287 @@
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Callable, Iterable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# seconds, from a cached read to a slow write
+HTTP_DURATION_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SQL_DURATION_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    1.0,
+)
+STATEMENTS_PER_REQUEST_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    """A metric family, one time series per combination of label values."""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def samples(self) -> list[tuple[str, tuple[str, ...], tuple[str, ...], float]]:
+        """(suffix, extra label names, label values, value) of every sample."""
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for suffix, extra_names, values, value in self.samples():
+            labels = _format_labels(self.label_names + extra_names, values)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [("", (), key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = HTTP_DURATION_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label values: [count per bucket (not cumulative) + one for +Inf, sum]
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[label_values] = series
+            series[0][index] += 1
+            series[1][0] += value
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total) in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    samples.append(
+                        ("_bucket", ("le",), key + (_format_value(bound),), cumulative)
+                    )
+                samples.append(("_sum", (), key, total[0]))
+                samples.append(("_count", (), key, cumulative))
+        return samples
+
+
+class GaugeCallback(Metric):
+    """A gauge read from a callback when the metrics are rendered, e.g. pool stats."""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], dict[tuple[str, ...], float]],
+        labels: Iterable[str] = (),
+    ):
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+
+    def samples(self):
+        return [("", (), key, value) for key, value in self.callback().items()]
+
+
+# Every metric rendered by GET /api/metrics in the Prometheus text format. Metrics
+# are per process, with several workers every worker reports its own.
+REGISTRY: list[Metric] = []
+
+
+def register(metric: Metric) -> Metric:
+    REGISTRY.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+http_requests = register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by route template and status code.",
+        ("method", "route", "status"),
+    )
+)
+http_request_duration = register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time to send the response headers, by route template.",
+        ("method", "route"),
+    )
+)
+http_requests_in_flight = register(
+    Gauge("http_requests_in_flight", "HTTP requests being handled.", ("method",))
+)
+http_request_db_statements = register(
+    Histogram(
+        "http_request_db_statements",
+        "SQL statements executed per request, by route template.",
+        ("method", "route"),
+        buckets=STATEMENTS_PER_REQUEST_BUCKETS,
+    )
+)
+db_statement_duration = register(
+    Histogram(
+        "db_statement_duration_seconds",
+        "Time spent executing each SQL statement shape, rows fetched afterwards are not included.",
+        ("statement",),
+        buckets=SQL_DURATION_BUCKETS,
+    )
+)
+
+
+class RequestStats:
+    """What the SQL profiling attributes to the request being handled."""
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.statements = 0
+
+    @property
+    def route(self) -> str:
+        return _route_path(self.scope)
+
+
+# set by MetricsMiddleware for the duration of a request, route handlers ran in the
+# threadpool get a copy of the context so they see (and update) the same object
+current_request: ContextVar[RequestStats | None] = ContextVar(
+    "current_request", default=None
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency, status and number of SQL statements of
+    every request, labelled by the route template (`/api/events/{event_id}`) so ids in
+    the path don't create a time series each. Requests that match no route are
+    labelled `unmatched`.
+
+    The latency is measured until the response headers are sent, which for streamed
+    exports is the time to first byte.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        started = time.perf_counter()
+        status_code = 500
+        duration = None
+        request_stats = RequestStats(scope)
+        token = current_request.set(request_stats)
+        http_requests_in_flight.inc(method)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, duration
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                duration = time.perf_counter() - started
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            http_requests_in_flight.dec(method)
+            route = request_stats.route
+            if duration is None:
+                duration = time.perf_counter() - started
+            http_requests.inc(method, route, str(status_code))
+            http_request_duration.observe(duration, method, route)
+            http_request_db_statements.observe(request_stats.statements, method, route)
+
+
+def _route_path(scope: Scope) -> str:
+    # FastAPI stores the matched route in the scope
+    return getattr(scope.get("route"), "path", "unmatched")
@@ -0,0 +1,78 @@
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException, Response, status
+
+# response header list endpoints use to return the cursor for the next page, the body
+# stays a plain list so existing clients keep working.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: int | str) -> str:
+    """
+    Encode the sort key of the last row of a page into an opaque cursor string.
+    """
+    raw = json.dumps(list(values), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> list:
+    """
+    Decode a cursor created by encode_cursor, checking it holds one value of each of
+    the given types.
+
+    :raises HTTPException: 400 if the cursor is malformed or doesn't match the types
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error, UnicodeError):
+        values = None
+
+    if (
+        not isinstance(values, list)
+        or len(values) != len(types)
+        or not all(
+            isinstance(value, expected) and not isinstance(value, bool)
+            for value, expected in zip(values, types)
+        )
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return values
+
+
+def validate_page(
+    limit: int | None,
+    skip: int = 0,
+    cursor: str | None = None,
+    max_limit: int | None = None,
+) -> None:
+    """
+    Shared validation of the pagination query params.
+    """
+    if skip < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Skip cannot be negative"
+        )
+    if limit is not None and limit < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Limit must be at least 1"
+        )
+    if max_limit is not None and limit is not None and limit > max_limit:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Limit cannot be more than {max_limit}",
+        )
+    if skip and cursor:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either skip or cursor, not both",
+        )
+
+
+def set_next_cursor(response: Response, next_cursor: str | None) -> None:
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
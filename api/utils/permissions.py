@@ -0,0 +1,95 @@
+import os
+
+from fastapi import Depends, HTTPException, status
+
+from repositories import RoleRepository, get_role_repository
+from utils.auth import get_current_user
+from utils.cache import TTLCache
+
+# Every organization role of a user is cached as one organization_id -> permission
+# level map, so any number of authorization checks in a request cost at most one
+# query, and none while the map is cached. The role routes invalidate the map of the
+# users they change, the ttl bounds how long a change made outside of this process
+# (another worker, the import CLI) can take to apply.
+ROLES_CACHE_SIZE = int(os.environ.get("ROLES_CACHE_SIZE", "10000"))
+ROLES_CACHE_TTL = float(os.environ.get("ROLES_CACHE_TTL", "60"))
+
+roles_cache = TTLCache(max_size=ROLES_CACHE_SIZE, ttl=ROLES_CACHE_TTL)
+
+
+async def get_user_roles(repository: RoleRepository, user_id: int) -> dict[int, str]:
+    """
+    The permission level of a user in every organization they have a role in, keyed by
+    organization_id. Don't modify the returned map, it is shared through the cache.
+    """
+    roles = roles_cache.get(user_id)
+    if roles is None:
+        roles = await repository.get_user_roles(user_id)
+        roles_cache.set(user_id, roles)
+    return roles
+
+
+async def is_org_admin(
+    repository: RoleRepository, user_id: int, organization_id: int
+) -> bool:
+    return (await get_user_roles(repository, user_id)).get(organization_id) == "admin"
+
+
+async def check_org_admin(
+    repository: RoleRepository, user_id: int, organization_id: int
+) -> None:
+    """
+    Refuse a user who isn't an admin of the organization.
+
+    :raises HTTPException: 403 if the user isn't an admin of the organization
+    """
+    if not await is_org_admin(repository, user_id, organization_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only organization admins can do this",
+        )
+
+
+def invalidate_user_roles(user_id: int) -> None:
+    """
+    Drop the cached roles of a user, call this whenever a role of the user is created,
+    updated or deleted.
+    """
+    roles_cache.delete(int(user_id))
+
+
+def invalidate_organization_roles(organization_id: int) -> None:
+    """
+    Drop the cached roles of every member of an organization, for changes to all of
+    its roles at once such as deleting the organization.
+    """
+    roles_cache.delete_where(lambda _, roles: int(organization_id) in roles)
+
+
+async def get_current_user_roles(
+    current_user: dict = Depends(get_current_user),
+    repository: RoleRepository = Depends(get_role_repository),
+) -> dict[int, str]:
+    """
+    FastAPI dependency with the roles of the authenticated user. Dependencies are
+    resolved once per request, so every use in the request shares one lookup.
+    """
+    return await get_user_roles(repository, current_user["user_id"])
+
+
+async def require_org_admin(
+    organization_id: int,
+    current_user: dict = Depends(get_current_user),
+    repository: RoleRepository = Depends(get_role_repository),
+) -> dict:
+    """
+    FastAPI dependency for routes with an `organization_id` path parameter that only
+    the organization's admins may call, returns the authenticated user.
+
+    The roles are read from the primary (RoleRepository.get_user_roles): a DB_READ_PATH
+    snapshot could still list a role that was revoked since it was taken.
+
+    :raises HTTPException: 403 if the user isn't an admin of the organization
+    """
+    await check_org_admin(repository, current_user["user_id"], organization_id)
+    return current_user
@@ -1,33 +1,267 @@
+"""
+Seed the database with fake data, run from the `api` folder. NOTE this will nuke the
+database every time.
+
+    python utils/populate_db.py
+    python utils/populate_db.py --users 1000000 --orgs 10000 --events 1000000 \\
+        --registrations 10000000 --seed 42 --workers 4
+
+Rows are generated in chunks, each from its own random generator derived from the
+seed, so the same seed always gives the same database whether the chunks are
+generated inline or in `--workers` processes. Everything is streamed into the
+database in batches, one transaction per table, with durability relaxed for the
+load. The secondary and full text indexes are built once at the end by the
+migrations instead of being updated row by row.
+"""
+
+import argparse
 import os
+import random
 import sqlite3
+import time
+from contextlib import nullcontext
+from datetime import date
+from multiprocessing import Pool
+from pathlib import Path
+
+import bcrypt
 
-from db_schema import DB_SCHEMA
+from db_schema import DB_SCHEMA, run_migrations
+from genarate_users_data import assign_unique_emails, generate_users_chunk
+from generate_event_registrations_data import (
+    generate_event_registrations_chunk,
+    registrations_per_event,
+)
+from generate_events_data import generate_events_chunk
+from generate_organizations_data import (
+    generate_organizations_chunk,
+    load_organization_names,
+)
+from generate_roles_data import generate_roles_chunk
+from insert_event_registrations_data import execute_insert_event_registrations_data
+from insert_events_data import execute_insert_events_data
 from insert_organizations_data import execute_insert_orgs_data
 from insert_roles_data import execute_insert_roles_data
 from insert_users_data import execute_insert_users_data
 
-NUM_RECORDS = 100
+# rows generated per chunk, the unit of work handed to a worker process
+CHUNK_SIZE = 10_000
+# every seeded user can log in with this password
+PASSWORD = "Password123!"
+ORG_LIST_FILE = Path(__file__).resolve().parent / "organizations_list.json"
+
+# The database is thrown away if the load fails, so there is no need for a rollback
+# journal or for syncing to disk during it. journal_mode OFF also means the one big
+# transaction per table doesn't have to be written twice.
+LOAD_PRAGMAS = [
+    "PRAGMA journal_mode = OFF;",
+    "PRAGMA synchronous = OFF;",
+    "PRAGMA locking_mode = EXCLUSIVE;",
+    "PRAGMA temp_store = MEMORY;",
+    "PRAGMA cache_size = -262144;",
+]
+
+
+def _generate_chunk(task):
+    chunk_function, args = task
+    return chunk_function(*args)
+
+
+def generate_rows(pool, chunk_function, chunk_args):
+    """
+    Yield the rows of every chunk, in order. With a pool the chunks are generated in the
+    worker processes while the rows of earlier chunks are being inserted.
+    """
+    tasks = ((chunk_function, args) for args in chunk_args)
+    if pool is None:
+        chunks = map(_generate_chunk, tasks)
+    else:
+        chunks = pool.imap(_generate_chunk, tasks)
+    for chunk in chunks:
+        yield from chunk
+
+
+def chunk_ranges(total: int, chunk_size: int = CHUNK_SIZE):
+    """(start, count) of each chunk of ids 1..total"""
+    for start in range(1, total + 1, chunk_size):
+        yield start, min(chunk_size, total - start + 1)
+
+
+def populate_db(
+    conn: sqlite3.Connection,
+    users: int,
+    orgs: int,
+    events: int,
+    registrations: int,
+    volunteers: int,
+    seed: int,
+    pool=None,
+):
+    """Fill an empty database (DB_SCHEMA, no migrations yet) with generated data."""
+    cursor = conn.cursor()
+    start_date = date.today().isoformat()
+
+    started = time.perf_counter()
+    hashed_password = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt())
+    users_data = assign_unique_emails(
+        generate_rows(
+            pool,
+            generate_users_chunk,
+            ((start, count, seed) for start, count in chunk_ranges(users)),
+        )
+    )
+    execute_insert_users_data(conn, cursor, users_data, hashed_password.decode("utf-8"))
+    print(f"users done in {time.perf_counter() - started:.1f}s\n")
+
+    started = time.perf_counter()
+    names = load_organization_names(ORG_LIST_FILE)
+    orgs_data = generate_rows(
+        pool,
+        generate_organizations_chunk,
+        ((start, count, seed, users, names) for start, count in chunk_ranges(orgs)),
+    )
+    execute_insert_orgs_data(conn, cursor, orgs_data)
+
+    # the creator of each organization is its admin
+    creators = [
+        row[0]
+        for row in cursor.execute(
+            "SELECT created_by_user_id FROM organizations ORDER BY organization_id"
+        )
+    ]
+    roles_data = generate_rows(
+        pool,
+        generate_roles_chunk,
+        (
+            (start, creators[start - 1 : start - 1 + count], seed, users, volunteers)
+            for start, count in chunk_ranges(orgs, CHUNK_SIZE // (volunteers + 1))
+        ),
+    )
+    execute_insert_roles_data(conn, cursor, roles_data)
+    print(f"organizations done in {time.perf_counter() - started:.1f}s\n")
+
+    started = time.perf_counter()
+    events_data = generate_rows(
+        pool,
+        generate_events_chunk,
+        (
+            (start, count, seed, orgs, start_date)
+            for start, count in chunk_ranges(events)
+        ),
+    )
+    execute_insert_events_data(conn, cursor, events_data)
+    print(f"events done in {time.perf_counter() - started:.1f}s\n")
+
+    def registration_chunks():
+        # registrations are generated per chunk of events, sliced further so each
+        # chunk of registrations is about CHUNK_SIZE rows
+        per_event = max(1, registrations_per_event(1, events, registrations))
+        for events_start, events_count in chunk_ranges(events):
+            events_end = events_start + events_count
+            step = max(1, CHUNK_SIZE // per_event)
+            for start in range(events_start, events_end, step):
+                yield (
+                    events_start,
+                    events_count,
+                    start,
+                    min(step, events_end - start),
+                    seed,
+                    users,
+                    orgs,
+                    events,
+                    registrations,
+                    start_date,
+                )
+
+    started = time.perf_counter()
+    if registrations:
+        registrations_data = generate_rows(
+            pool, generate_event_registrations_chunk, registration_chunks()
+        )
+        execute_insert_event_registrations_data(conn, cursor, registrations_data)
+        print(f"event registrations done in {time.perf_counter() - started:.1f}s\n")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", default="app.db", help="database file to (re)create")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--orgs", type=int, default=20)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--registrations", type=int, default=1000)
+    parser.add_argument(
+        "--volunteers",
+        type=int,
+        default=5,
+        help="volunteers per organization, besides its admin",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="seed for the random data, the same seed gives the same database",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processes generating the data, 1 generates it in this process",
+    )
+    args = parser.parse_args(argv)
+
+    for name in ("users", "orgs", "events", "registrations", "volunteers"):
+        if getattr(args, name) < 0:
+            parser.error(f"--{name} can't be negative")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.orgs and not args.users:
+        parser.error("organizations need at least one user to create them")
+    if args.events and not args.orgs:
+        parser.error("events need at least one organization")
+    if args.registrations and not (args.users and args.events):
+        parser.error("registrations need at least one user and one event")
+    return args
+
 
 if __name__ == "__main__":
-    # NOTE this will nuke the database every time
+    args = parse_args()
+    seed = args.seed if args.seed is not None else random.randrange(2**32)
 
-    db_file = "app.db"
+    db_file = args.db
     if os.path.exists(db_file):
         os.remove(db_file)
         print(f"\n{db_file} has been removed\n")
     else:
         print(f"\n{db_file} does not exist\n")
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
 
+    print(f"Seeding with --seed {seed}\n")
+    started = time.perf_counter()
     conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
-    cursor.executescript(DB_SCHEMA)
-
     try:
-        execute_insert_users_data(conn, cursor, NUM_RECORDS)
-        execute_insert_roles_data(conn, cursor, NUM_RECORDS)
-        execute_insert_orgs_data(
-            conn, cursor, "./utils/organizations_list.json"
-        )  # Inside the function there is a list with organization names
+        conn.executescript(DB_SCHEMA)
+        for pragma in LOAD_PRAGMAS:
+            conn.execute(pragma)
+
+        with Pool(args.workers) if args.workers > 1 else nullcontext() as pool:
+            populate_db(
+                conn,
+                users=args.users,
+                orgs=args.orgs,
+                events=args.events,
+                registrations=args.registrations,
+                volunteers=args.volunteers,
+                seed=seed,
+                pool=pool,
+            )
+
+        # indexes and full text tables are built in one pass over the loaded data
+        run_migrations(conn)
+        conn.execute("ANALYZE;")
     finally:
         conn.close()
-        print("\nProcess complete. Connection close.\n")
+        print(
+            f"\nProcess complete in {time.perf_counter() - started:.1f}s. Connection close.\n"
+        )
@@ -0,0 +1,37 @@
+import re
+
+# split on anything the unicode61 tokenizer treats as a separator, so a search for
+# "jane.doe@exa" matches the same tokens the email was indexed with
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(query: str, column: str | None = None) -> str | None:
+    """
+    Turn free text from a search box into an FTS5 MATCH expression.
+
+    Every word of the input has to match (implicit AND) as a prefix of an indexed word,
+    so results update while the user is still typing. Words are quoted, so FTS5
+    operators in the input are searched for literally rather than interpreted. If a
+    column is given the words only match in that column.
+
+    Returns None if the input has no searchable words.
+    """
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    prefix = f"{column} : " if column is not None else ""
+    return " ".join(f'{prefix}"{token}"*' for token in tokens)
+
+
+def build_tsquery(query: str) -> str | None:
+    """
+    The PostgreSQL counterpart of build_match_query, a to_tsquery expression where every
+    word has to match as a prefix. Words are quoted, so tsquery operators in the input
+    are searched for literally.
+
+    Returns None if the input has no searchable words.
+    """
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    return " & ".join(f"'{token}':*" for token in tokens)
@@ -1,4 +1,9 @@
-import os 
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta, timezone
 import bcrypt
 import jwt
@@ -7,29 +12,192 @@ SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# bcrypt cost factor for new hashes, existing hashes with a different cost are rehashed
+# the next time the user logs in
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+# processes dedicated to hashing, 0 hashes in the calling thread instead
+PASSWORD_HASH_WORKERS = int(
+    os.environ.get("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+# hashes allowed to be queued or running at once, past this requests get a 503 rather
+# than tying up more request threads waiting on the pool
+PASSWORD_HASH_MAX_PENDING = int(
+    os.environ.get("PASSWORD_HASH_MAX_PENDING", str(max(1, PASSWORD_HASH_WORKERS) * 4))
+)
 
-def hash_password(plain_password: str) -> str:
-    """Hash a plain-text password using bcrypt."""
+
+# how the hashing processes are started. Forking would copy the server with its threads
+# (writer, database executor) and open sqlite handles mid-use, a forkserver (or spawn,
+# where there is none) starts them from a clean interpreter instead
+_MP_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised when too many password hashes are already pending."""
+
+
+def _hashpw(plain_password: str, rounds: int) -> str:
     password_bytes = plain_password.encode("utf-8")
-    hashed = bcrypt.hashpw(password_bytes, bcrypt.gensalt())
+    hashed = bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds=rounds))
     return hashed.decode("utf-8")
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain-text password against a bcrypt hash."""
+def _checkpw(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(
         plain_password.encode("utf-8"),
         hashed_password.encode("utf-8"),
     )
 
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated process pool, so hashing bursts (a wave of logins) use
+    their own cores instead of competing with every other request for the GIL.
+
+    The number of pending hashes is bounded, once `max_pending` are queued or running
+    further calls fail fast with PasswordHasherBusyError.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+        rounds: int = BCRYPT_ROUNDS,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor: ProcessPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self) -> None:
+        # the pool's processes belong to the parent, a forked worker starts its own
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(_MP_START_METHOD),
+                )
+            return self._executor
+
+    def _forget_executor(self, executor: ProcessPoolExecutor) -> None:
+        # a worker died, start a fresh pool for the next call
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+
+    def _submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusyError(
+                "Too many password hashes pending, retry later"
+            )
+        try:
+            executor = self._get_executor()
+            future = executor.submit(fn, *args)
+        except BaseException as exc:
+            self._slots.release()
+            if isinstance(exc, BrokenProcessPool):
+                self._forget_executor(executor)
+            raise
+
+        def done(future: Future) -> None:
+            self._slots.release()
+            if not future.cancelled() and isinstance(
+                future.exception(), BrokenProcessPool
+            ):
+                self._forget_executor(executor)
+
+        future.add_done_callback(done)
+        return future
+
+    def _run(self, fn, *args):
+        if self.workers < 1:
+            return fn(*args)
+        return self._submit(fn, *args).result()
+
+    async def _run_async(self, fn, *args):
+        if self.workers < 1:
+            return await asyncio.to_thread(fn, *args)
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    def hash(self, plain_password: str) -> str:
+        return self._run(_hashpw, plain_password, self.rounds)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(_checkpw, plain_password, hashed_password)
+
+    async def hash_async(self, plain_password: str) -> str:
+        """hash for async routes, the event loop keeps serving while bcrypt runs."""
+        return await self._run_async(_hashpw, plain_password, self.rounds)
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        """verify for async routes."""
+        return await self._run_async(_checkpw, plain_password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Whether a hash was created with a different cost factor than configured."""
+        # bcrypt hashes look like $2b$12$<salt+hash>, the third field is the cost
+        try:
+            return int(hashed_password.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(plain_password: str) -> str:
+    """Hash a plain-text password using bcrypt."""
+    return password_hasher.hash(plain_password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a plain-text password against a bcrypt hash."""
+    return password_hasher.verify(plain_password, hashed_password)
+
+
+async def hash_password_async(plain_password: str) -> str:
+    """hash_password for async routes."""
+    return await password_hasher.hash_async(plain_password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password for async routes."""
+    return await password_hasher.verify_async(plain_password, hashed_password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether a stored hash should be replaced, as the bcrypt cost setting changed."""
+    return password_hasher.needs_rehash(hashed_password)
+
+
 # When we login, we'll call create_access_token with a dict of claims ("sub" - user's ID && "role" - volunteer or org_admin) and return the token to the client.
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """Create a JWT access token with the given claims."""
     to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    expire = datetime.now(timezone.utc) + (
+        expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
     to_encode["exp"] = expire
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+
 # Our protected routes will receive the token in something like "Authorization: Bearer <token>" and call decode_access_token to validate it and then extract the userID and role from the claims.
 def decode_access_token(token: str) -> dict:
     """Decode and validate a JWT access token. Raises jwt.ExpiredSignatureError or jwt.InvalidTokenError."""
@@ -0,0 +1,64 @@
+"""
+Copy the database to a snapshot file the GET routes can read from (DB_READ_PATH), run
+from the `api` folder. With --every the snapshot is refreshed until interrupted.
+
+    python utils/snapshot_db.py app.snapshot.db
+    python utils/snapshot_db.py app.snapshot.db --db app.db --every 30
+
+The copy is made with sqlite's online backup, the API keeps serving (and writing)
+while it runs and readers of the snapshot only wait for the final pages to be copied.
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+# pages copied per backup step, the source is only locked for the duration of a step
+BACKUP_STEP_PAGES = 1024
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "snapshot", type=Path, help="snapshot file to create or refresh"
+    )
+    parser.add_argument("--db", default="app.db", help="database file to copy")
+    parser.add_argument(
+        "--every",
+        type=float,
+        default=None,
+        help="refresh the snapshot every this many seconds",
+    )
+    args = parser.parse_args(argv)
+    if not Path(args.db).exists():
+        parser.error(f"{args.db} does not exist, start the API or seed it first")
+    return args
+
+
+def snapshot(database: str, snapshot_path: Path) -> None:
+    source = sqlite3.connect(database)
+    target = sqlite3.connect(snapshot_path)
+    try:
+        source.backup(target, pages=BACKUP_STEP_PAGES)
+        # the copy keeps the source's WAL mode, read-only connections can't create the
+        # WAL index of a file nobody writes to, so the snapshot uses a rollback journal
+        target.execute("PRAGMA journal_mode = DELETE;")
+    finally:
+        target.close()
+        source.close()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    while True:
+        started = time.perf_counter()
+        snapshot(args.db, args.snapshot)
+        print(
+            f"snapshot of {args.db} saved to {args.snapshot} "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        if args.every is None:
+            sys.exit(0)
+        time.sleep(args.every)
@@ -0,0 +1,106 @@
+import logging
+import os
+import re
+import sqlite3
+import time
+from functools import lru_cache
+
+from utils.metrics import current_request, db_statement_duration
+
+logger = logging.getLogger(__name__)
+
+# statements slower than this many milliseconds are logged with their query plan,
+# 0 (the default) disables the slow query log
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "0"))
+# longest statement label in the metrics, the label identifies the statement shape
+STATEMENT_LABEL_LENGTH = 200
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS_LIST = re.compile(r"(\(\?(?:, \.\.\.)?\))(?:\s*,\s*\1)+")
+
+
+@lru_cache(maxsize=1024)
+def normalize_statement(sql: str) -> str:
+    """
+    The statement shape used as the metrics label: whitespace is collapsed and `IN`
+    or `VALUES` lists of any length become one placeholder, so the batched queries
+    don't create a time series per batch size.
+    """
+    statement = _WHITESPACE.sub(" ", sql).strip()
+    statement = _PLACEHOLDER_LIST.sub("(?, ...)", statement)
+    statement = _ROWS_LIST.sub(r"\1, ...", statement)
+    return statement[:STATEMENT_LABEL_LENGTH]
+
+
+def _log_slow_statement(
+    cursor: sqlite3.Cursor, sql: str, parameters, elapsed: float
+) -> None:
+    stats = current_request.get()
+    route = stats.route if stats is not None else "outside of a request"
+    plan = ""
+    if parameters is not None:
+        # a plain cursor, the EXPLAIN must not be profiled (and logged) itself
+        try:
+            rows = sqlite3.Cursor(cursor.connection).execute(
+                "EXPLAIN QUERY PLAN " + sql, parameters
+            )
+            plan = "\n".join(f"  {row[3]}" for row in rows)
+        except sqlite3.Error as exc:
+            plan = f"  (no query plan: {exc})"
+    # parameters are left out, they can hold emails and password hashes
+    logger.warning(
+        "Slow query (%.1f ms) in %s: %s\n%s",
+        elapsed * 1000,
+        route,
+        normalize_statement(sql),
+        plan,
+    )
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    A cursor recording how long every statement takes to execute in the
+    db_statement_duration_seconds metric and counting it against the current request.
+    Fetching the rows afterwards is not included in the time.
+    """
+
+    def _record(self, sql: str, parameters, elapsed: float) -> None:
+        db_statement_duration.observe(elapsed, normalize_statement(sql))
+        stats = current_request.get()
+        if stats is not None:
+            stats.statements += 1
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            _log_slow_statement(self, sql, parameters, elapsed)
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record(sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            # no single set of parameters to explain the statement with
+            self._record(sql, None, time.perf_counter() - started)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """
+    Connection factory for the pool, every statement ran through `execute`,
+    `executemany` or a cursor is profiled. executescript is not.
+    """
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    # the C implementation of these doesn't go through cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
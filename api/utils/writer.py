@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from db import DATABASE_PATH, configure_connection
+from utils.metrics import Histogram, register
+from utils.sql_profiling import ProfiledConnection
+
+logger = logging.getLogger(__name__)
+
+# how long the writer keeps collecting writes after the first one before committing
+# them together, 0 only groups the writes already queued
+DB_WRITE_BATCH_WINDOW_MS = float(os.environ.get("DB_WRITE_BATCH_WINDOW_MS", "2"))
+# max writes committed in one transaction
+DB_WRITE_BATCH_SIZE = int(os.environ.get("DB_WRITE_BATCH_SIZE", "64"))
+# writes allowed to be queued or running at once, past this requests get a 503
+DB_WRITE_MAX_PENDING = int(os.environ.get("DB_WRITE_MAX_PENDING", "1000"))
+
+_STOP = object()
+
+write_batch_size = register(
+    Histogram(
+        "db_write_batch_size",
+        "Writes group committed per transaction by the write queue.",
+        buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+    )
+)
+
+
+class WriteQueueBusyError(Exception):
+    """Raised when too many writes are already pending."""
+
+
+class _Write:
+    def __init__(self, fn: Callable[..., Any], args: tuple):
+        self.fn = fn
+        self.args = args
+        self.future: Future = Future()
+
+
+class WriteQueue:
+    """
+    Serializes writes through one connection owned by a dedicated thread, so routes
+    never compete for sqlite's write lock (and never see `database is locked`).
+
+    Writes that arrive within `window` seconds of each other are group committed, each
+    one runs in its own SAVEPOINT of a single transaction and the whole batch is
+    committed (and synced) once. A write that raises is rolled back on its own, the
+    others in the batch still commit. Results are only returned after the commit.
+
+    A write is a function taking the writer's connection, it must not commit or roll
+    back itself, and should only run statements: anything slow (password hashing,
+    HTTP calls) holds up every other write, so do it before submitting.
+    """
+
+    def __init__(
+        self,
+        database,
+        window: float = DB_WRITE_BATCH_WINDOW_MS / 1000,
+        batch_size: int = DB_WRITE_BATCH_SIZE,
+        max_pending: int = DB_WRITE_MAX_PENDING,
+    ):
+        self.database = database
+        self.window = window
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # stats
+        self._writes = 0
+        self._failed = 0
+        self._batches = 0
+        self._max_batch = 0
+
+    def submit(self, fn: Callable[..., Any], *args) -> Future:
+        """
+        Queue `fn(connection, *args)` and return a future for its result.
+
+        :raises WriteQueueBusyError: if too many writes are pending
+        """
+        if not self._slots.acquire(blocking=False):
+            raise WriteQueueBusyError("Too many writes pending, retry later")
+        write = _Write(fn, args)
+        write.future.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            if self._closed:
+                self._slots.release()
+                raise RuntimeError("Write queue is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="db-writer", daemon=True
+                )
+                self._thread.start()
+            self._queue.put(write)
+        return write.future
+
+    def execute(self, fn: Callable[..., Any], *args) -> Any:
+        """Run a write and wait for it to be committed, for sync routes."""
+        return self.submit(fn, *args).result()
+
+    async def execute_async(self, fn: Callable[..., Any], *args) -> Any:
+        """Run a write and wait for it to be committed, for async routes."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def _run(self) -> None:
+        conn = sqlite3.connect(
+            self.database, check_same_thread=False, factory=ProfiledConnection
+        )
+        configure_connection(conn)
+        try:
+            while True:
+                batch, stop = self._collect()
+                if batch:
+                    self._commit(conn, batch)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _collect(self) -> tuple[list[_Write], bool]:
+        """Wait for a write, then gather more until the window ends or the batch is full."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.batch_size:
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    write = self._queue.get(timeout=remaining)
+                else:
+                    write = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if write is _STOP:
+                return batch, True
+            batch.append(write)
+        return batch, False
+
+    def _commit(self, conn: sqlite3.Connection, batch: list[_Write]) -> None:
+        outcomes: list[tuple[_Write, Any, BaseException | None]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for write in batch:
+                if not write.future.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT write")
+                try:
+                    result = write.fn(conn, *write.args)
+                except Exception as exc:
+                    conn.execute("ROLLBACK TO write")
+                    conn.execute("RELEASE write")
+                    outcomes.append((write, None, exc))
+                else:
+                    conn.execute("RELEASE write")
+                    outcomes.append((write, result, None))
+            conn.commit()
+        except Exception as exc:
+            # the transaction itself failed (busy, disk full...), none of it committed
+            logger.exception("Write batch of %s failed", len(batch))
+            if conn.in_transaction:
+                conn.rollback()
+            for write in batch:
+                if write.future.running() or (
+                    not write.future.done()
+                    and write.future.set_running_or_notify_cancel()
+                ):
+                    write.future.set_exception(exc)
+            with self._lock:
+                self._failed += len(batch)
+            return
+
+        with self._lock:
+            self._writes += len(outcomes)
+            self._failed += sum(1 for _, _, exc in outcomes if exc is not None)
+            self._batches += 1
+            self._max_batch = max(self._max_batch, len(outcomes))
+        write_batch_size.observe(len(outcomes))
+        for write, result, exc in outcomes:
+            if exc is not None:
+                write.future.set_exception(exc)
+            else:
+                write.future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": self._queue.qsize(),
+                "writes": self._writes,
+                "failed": self._failed,
+                "batches": self._batches,
+                "avg_batch_size": self._writes / self._batches
+                if self._batches
+                else 0.0,
+                "max_batch_size": self._max_batch,
+            }
+
+    def close(self) -> None:
+        """Commit the queued writes and stop the writer thread."""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+            # everything queued before the stop marker is still committed
+            self._queue.put(_STOP)
+        if thread is not None:
+            thread.join()
+
+
+_write_queue: WriteQueue | None = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue() -> WriteQueue:
+    """
+    Return the process wide write queue, creating it on first use.
+    """
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            _write_queue = WriteQueue(DATABASE_PATH)
+        return _write_queue
+
+
+def _reset_after_fork() -> None:
+    # the writer thread doesn't survive a fork, a forked worker starts its own queue
+    global _write_queue, _write_queue_lock
+    _write_queue = None
+    _write_queue_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def close_write_queue() -> None:
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is not None:
+            _write_queue.close()
+            _write_queue = None
@@ -1,268 +1,125 @@
 import { Event } from "@/models/event";
 import { Filters } from "@/models/filters";
 import { Role } from "@/models/roles";
-import { applyEventFilters } from "./apply-event-filters";
-
-describe("applyFilters", () => {
-  const mockEvents: Event[] = [
-    {
-      id: 1,
-      name: "Morning Cleanup",
-      description: "Beach cleanup",
-      location: "Beach",
-      category: "Environmental Conservation",
-      date: "2026-03-15",
-      time: "09:00",
-      time_zone: "PST",
-      organization_id: 1,
-      signup_count: 10,
-      user_signed_up: false,
-      is_weekend: false,
-    },
-    {
-      id: 2,
-      name: "Evening Tutoring",
-      description: "Help students",
-      location: "School",
-      category: "Education & Tutoring",
-      date: "2026-03-16",
-      time: "18:00",
-      time_zone: "PST",
-      organization_id: 2,
-      signup_count: 5,
-      user_signed_up: false,
-      is_weekend: false,
-    },
-    {
-      id: 3,
-      name: "Weekend Food Drive",
-      description: "Collect food",
-      location: "Community Center",
-      category: "Community Development",
-      date: "2026-03-20",
-      time: "10:00",
-      time_zone: "PST",
-      organization_id: 1,
-      signup_count: 20,
-      user_signed_up: true,
-      is_weekend: true,
-    },
-    {
-      id: 4,
-      name: "Afternoon Workshop",
-      description: "Skills workshop",
-      location: "Library",
-      category: "Education & Tutoring",
-      date: "2026-03-17",
-      time: "14:00",
-      time_zone: "PST",
-      organization_id: 3,
-      signup_count: 15,
-      user_signed_up: false,
-      is_weekend: false,
-    },
-  ];
+import {
+  applyCategoryFilter,
+  buildEventQuery,
+  toApiTime,
+} from "./apply-event-filters";
 
+describe("buildEventQuery", () => {
   const mockUserRoles: Role[] = [
     { user_id: 1, organization_id: 1, permission_level: "admin" },
     { user_id: 1, organization_id: 2, permission_level: "volunteer" },
   ];
 
-  describe("scope filtering", () => {
-    it("should return all events when scope is 'all'", () => {
-      const filters: Filters = {
-        scope: "all",
-        category: null,
-        availability: null,
-      };
-
-      const result = applyEventFilters(mockEvents, filters, mockUserRoles);
-
-      expect(result).toHaveLength(4);
-      expect(result).toEqual(mockEvents);
-    });
-
-    it("should filter events by user organizations when scope is 'myOrgs'", () => {
-      const filters: Filters = {
-        scope: "myOrgs",
-        category: null,
-        availability: null,
-      };
-
-      const result = applyEventFilters(mockEvents, filters, mockUserRoles);
-
-      expect(result).toHaveLength(3);
-      expect(result.map((e) => e.organization_id)).toEqual([1, 2, 1]);
-    });
+  const noFilters: Filters = {
+    scope: "all",
+    category: null,
+    availability: null,
+  };
 
-    it("should filter events by admin organizations when scope is 'admin'", () => {
-      const filters: Filters = {
-        scope: "admin",
-        category: null,
-        availability: null,
-      };
-
-      const result = applyEventFilters(mockEvents, filters, mockUserRoles);
-
-      expect(result).toHaveLength(2);
-      expect(result.every((e) => e.organization_id === 1)).toBe(true);
-    });
-
-    it("should return empty array when user has no roles and scope is 'myOrgs'", () => {
-      const filters: Filters = {
-        scope: "myOrgs",
-        category: null,
-        availability: null,
-      };
-
-      const result = applyEventFilters(mockEvents, filters, []);
-
-      expect(result).toHaveLength(0);
-    });
+  it("should format times like the API stores them", () => {
+    expect(toApiTime(new Date(2026, 2, 15, 9, 5, 7))).toBe("2026-03-15T09:05:07");
   });
 
-  describe("category filtering", () => {
-    it("should filter events by category", () => {
-      const filters: Filters = {
-        scope: "all",
-        category: "Education & Tutoring",
-        availability: null,
-      };
-
-      const result = applyEventFilters(mockEvents, filters, mockUserRoles);
-
-      expect(result).toHaveLength(2);
-      expect(result.every((e) => e.category === "Education & Tutoring")).toBe(true);
-    });
-
-    it("should return empty array when no events match category", () => {
-      const filters: Filters = {
-        scope: "all",
-        category: "Health & Medical",
-        availability: null,
-      };
+  it("should request every event when nothing is filtered", () => {
+    const params = buildEventQuery(noFilters, mockUserRoles);
 
-      const result = applyEventFilters(mockEvents, filters, mockUserRoles);
-
-      expect(result).toHaveLength(0);
-    });
+    expect(params?.toString()).toBe("");
   });
 
-  describe("availability filtering", () => {
-    it("should filter events by weekend availability", () => {
-      const filters: Filters = {
-        scope: "all",
-        category: null,
-        availability: ["Weekends"],
-      };
-
-      const result = applyEventFilters(mockEvents, filters, mockUserRoles);
-
-      expect(result).toHaveLength(1);
-      expect(result[0].is_weekend).toBe(true);
-    });
-
-    it("should filter events by morning time", () => {
-      const filters: Filters = {
-        scope: "all",
-        category: null,
-        availability: ["Mornings"],
-      };
-
-      const result = applyEventFilters(mockEvents, filters, mockUserRoles);
+  it("should only limit the time to the picked date range", () => {
+    const params = buildEventQuery(
+      { ...noFilters, dateRange: { from: "2026-03-15", to: "2026-03-31" } },
+      mockUserRoles,
+    );
 
-      expect(result).toHaveLength(2);
-      expect(result.map((e) => e.id)).toEqual([1, 3]);
-    });
-
-    it("should filter events by evening time", () => {
-      const filters: Filters = {
-        scope: "all",
-        category: null,
-        availability: ["Evenings"],
-      };
-
-      const result = applyEventFilters(mockEvents, filters, mockUserRoles);
+    expect(params?.get("start")).toBe("2026-03-15T00:00:00");
+    // the last day is included
+    expect(params?.get("end")).toBe("2026-04-01T00:00:00");
+  });
 
-      expect(result).toHaveLength(1);
-      expect(result[0].time).toBe("18:00");
-    });
+  it("should leave an open end of the date range unfiltered", () => {
+    const params = buildEventQuery(
+      { ...noFilters, dateRange: { from: null, to: "2026-03-15" } },
+      mockUserRoles,
+    );
 
-    it("should filter events by afternoon time", () => {
-      const filters: Filters = {
-        scope: "all",
-        category: null,
-        availability: ["Afternoons"],
-      };
+    expect(params?.has("start")).toBe(false);
+    expect(params?.get("end")).toBe("2026-03-16T00:00:00");
+  });
 
-      const result = applyEventFilters(mockEvents, filters, mockUserRoles);
+  it("should send the scope with the user it is resolved for", () => {
+    const params = buildEventQuery(
+      { ...noFilters, scope: "admin" },
+      mockUserRoles,
+    );
 
-      expect(result).toHaveLength(1);
-      expect(result[0].time).toBe("14:00");
-    });
+    expect(params?.get("scope")).toBe("admin");
+    expect(params?.get("user_id")).toBe("1");
+  });
 
-    it("should filter events by multiple availability options", () => {
-      const filters: Filters = {
-        scope: "all",
-        category: null,
-        availability: ["Mornings", "Evenings"],
-      };
+  it("should return null for a scope when the user has no roles", () => {
+    const params = buildEventQuery({ ...noFilters, scope: "myOrgs" }, []);
 
-      const result = applyEventFilters(mockEvents, filters, mockUserRoles);
+    expect(params).toBeNull();
+  });
 
-      expect(result).toHaveLength(3);
-    });
+  it("should send the times of day and the weekend filter", () => {
+    const params = buildEventQuery(
+      { ...noFilters, availability: ["Mornings", "Evenings", "Weekends"] },
+      mockUserRoles,
+    );
 
-    it("should combine weekend and time of day filters", () => {
-      const filters: Filters = {
-        scope: "all",
-        category: null,
-        availability: ["Weekends", "Mornings"],
-      };
+    expect(params?.getAll("time_of_day")).toEqual(["Mornings", "Evenings"]);
+    expect(params?.get("weekend_only")).toBe("true");
+  });
 
-      const result = applyEventFilters(mockEvents, filters, mockUserRoles);
+  it("should combine weekend and time of day filters", () => {
+    // the API returns the events on a weekend or in the morning
+    const params = buildEventQuery(
+      { ...noFilters, availability: ["Weekends", "Mornings"] },
+      mockUserRoles,
+    );
 
-      expect(result).toHaveLength(2);
-    });
+    expect(params?.getAll("time_of_day")).toEqual(["Mornings"]);
+    expect(params?.get("weekend_only")).toBe("true");
   });
 
-  describe("combined filtering", () => {
-    it("should apply scope and category filters together", () => {
-      const filters: Filters = {
-        scope: "myOrgs",
-        category: "Education & Tutoring",
-        availability: null,
-      };
-
-      const result = applyEventFilters(mockEvents, filters, mockUserRoles);
+  it("should ignore availability the API can't filter on", () => {
+    const params = buildEventQuery(
+      { ...noFilters, availability: ["Flexible"] },
+      mockUserRoles,
+    );
 
-      expect(result).toHaveLength(1);
-      expect(result[0].id).toBe(2);
-    });
+    expect(params?.has("time_of_day")).toBe(false);
+    expect(params?.has("weekend_only")).toBe(false);
+  });
+});
 
-    it("should apply all filters together", () => {
-      const filters: Filters = {
-        scope: "admin",
-        category: "Environmental Conservation",
-        availability: ["Mornings"],
-      };
+describe("applyCategoryFilter", () => {
+  const mockEvents = [
+    { id: 1, category: "Environmental Conservation" },
+    { id: 2, category: "Education & Tutoring" },
+    { id: 3, category: "Education & Tutoring" },
+  ] as Event[];
 
-      const result = applyEventFilters(mockEvents, filters, mockUserRoles);
+  it("should return all events without a category", () => {
+    const filters: Filters = { scope: "all", category: null, availability: null };
 
-      expect(result).toHaveLength(1);
-      expect(result[0].id).toBe(1);
-    });
+    expect(applyCategoryFilter(mockEvents, filters)).toEqual(mockEvents);
+  });
 
-    it("should return empty array when combined filters match nothing", () => {
-      const filters: Filters = {
-        scope: "admin",
-        category: "Education & Tutoring",
-        availability: ["Weekends"],
-      };
+  it("should filter events by category", () => {
+    const filters: Filters = {
+      scope: "all",
+      category: "Education & Tutoring",
+      availability: null,
+    };
 
-      const result = applyEventFilters(mockEvents, filters, mockUserRoles);
+    const result = applyCategoryFilter(mockEvents, filters);
 
-      expect(result).toHaveLength(0);
-    });
+    expect(result.map((e) => e.id)).toEqual([2, 3]);
   });
 });
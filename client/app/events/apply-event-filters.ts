@@ -1,57 +1,82 @@
-import { Event, getTimeOfDay } from "@/models/event";
+import { Event, TIME_OF_DAY_RANGES, TimeOfDay } from "@/models/event";
 import { Filters } from "@/models/filters";
 import { Role } from "@/models/roles";
 
 /**
- * Temporary client-side filtering, used as an example of using jest to test.
+ * Format a date like the API stores event times, local time without a time zone
+ * (YYYY-MM-DDTHH:MM:SS), so it can be compared with them.
+ *
+ * @param date the date to format
+ * @returns the formatted date
+ */
+export function toApiTime(date: Date) {
+  const pad = (value: number) => String(value).padStart(2, "0");
+  return (
+    `${date.getFullYear()}-${pad(date.getMonth() + 1)}-${pad(date.getDate())}` +
+    `T${pad(date.getHours())}:${pad(date.getMinutes())}:${pad(date.getSeconds())}`
+  );
+}
+
+/**
+ * Build the /api/events query for the filter state, the API does the filtering.
+ * Events are only limited in time when the user picks a date range.
  *
- * @param events The list of all events as-is
  * @param filters the filter state to apply
- * @param userRoles the user's roles
- * @returns the list of events after applying the filters
+ * @param userRoles the user's roles, the scope filters are resolved for their user
+ * @returns the query parameters, or null when no event can match (a scope filter
+ * without a signed in user)
  */
-export function applyEventFilters(
-  events: Event[],
+export function buildEventQuery(
   filters: Filters,
   userRoles: Role[],
-) {
-  let filtered = events;
+): URLSearchParams | null {
+  const params = new URLSearchParams();
 
-  //Filter by scope
-  if (filters.scope === "myOrgs") {
-    filtered = filtered.filter((event) =>
-      userRoles.some((role) => role.organization_id === event.organization_id),
-    );
-  } else if (filters.scope === "admin") {
-    filtered = filtered.filter((event) =>
-      userRoles.some(
-        (role) =>
-          role.organization_id === event.organization_id &&
-          role.permission_level === "admin",
-      ),
-    );
+  if (filters.dateRange?.from) {
+    params.set("start", `${filters.dateRange.from}T00:00:00`);
+  }
+  if (filters.dateRange?.to) {
+    // the API's end is exclusive, the picked day is included
+    const [year, month, day] = filters.dateRange.to.split("-").map(Number);
+    params.set("end", toApiTime(new Date(year, month - 1, day + 1)));
   }
 
-  // Filter by category
-  if (filters.category) {
-    filtered = filtered.filter((event) => event.category === filters.category);
+  if (filters.scope && filters.scope !== "all") {
+    // TODO: the API should resolve the scope for the authenticated user
+    const userId = userRoles[0]?.user_id;
+    if (userId === undefined) {
+      return null;
+    }
+    params.set("scope", filters.scope);
+    params.set("user_id", String(userId));
   }
 
-  // Filter by availability
-  if (filters.availability && filters.availability.length > 0) {
-    filtered = filtered.filter((event) => {
-      if (filters.availability!.includes("Weekends") && event.is_weekend) {
-        return true;
+  if (filters.availability) {
+    for (const availability of filters.availability) {
+      if (availability in TIME_OF_DAY_RANGES) {
+        params.append("time_of_day", availability as TimeOfDay);
       }
+    }
+    // the API matches the weekend or any of the times of day
+    if (filters.availability.includes("Weekends")) {
+      params.set("weekend_only", "true");
+    }
+  }
 
-      const eventTimeOfDay = getTimeOfDay(event.time);
-      if (eventTimeOfDay && filters.availability!.includes(eventTimeOfDay)) {
-        return true;
-      }
+  return params;
+}
 
-      return false;
-    });
+/**
+ * The API has no categories yet, so the category filter is still applied to the
+ * fetched events.
+ *
+ * @param events the events returned by the API
+ * @param filters the filter state to apply
+ * @returns the events of the selected category
+ */
+export function applyCategoryFilter(events: Event[], filters: Filters) {
+  if (!filters.category) {
+    return events;
   }
-
-  return filtered;
+  return events.filter((event) => event.category === filters.category);
 }
@@ -0,0 +1,57 @@
+import { Event } from "@/models/event";
+import { EVENTS_PAGE_SIZE, fetchEvents } from "./fetch-events";
+
+function mockResponse(events: Partial<Event>[], nextCursor: string | null) {
+  return {
+    ok: true,
+    status: 200,
+    json: async () => events,
+    headers: {
+      get: (name: string) => (name === "X-Next-Cursor" ? nextCursor : null),
+    },
+  } as unknown as Response;
+}
+
+function calledQuery(fetchFn: jest.Mock) {
+  return new URLSearchParams(fetchFn.mock.calls[0][0].split("?")[1]);
+}
+
+describe("fetchEvents", () => {
+  it("should fetch a single page and return its cursor", async () => {
+    const fetchFn = jest
+      .fn()
+      .mockResolvedValue(mockResponse([{ id: 1 }, { id: 2 }], "abc"));
+
+    const page = await fetchEvents(
+      new URLSearchParams({ time_of_day: "Mornings" }),
+      null,
+      fetchFn,
+    );
+
+    expect(page.events.map((e) => e.id)).toEqual([1, 2]);
+    expect(page.nextCursor).toBe("abc");
+    expect(fetchFn).toHaveBeenCalledTimes(1);
+    const query = calledQuery(fetchFn);
+    expect(query.get("time_of_day")).toBe("Mornings");
+    expect(query.get("limit")).toBe(String(EVENTS_PAGE_SIZE));
+    expect(query.has("cursor")).toBe(false);
+  });
+
+  it("should fetch the page after a cursor", async () => {
+    const fetchFn = jest.fn().mockResolvedValue(mockResponse([{ id: 3 }], null));
+
+    const page = await fetchEvents(new URLSearchParams(), "abc", fetchFn);
+
+    expect(page.events.map((e) => e.id)).toEqual([3]);
+    expect(page.nextCursor).toBeNull();
+    expect(calledQuery(fetchFn).get("cursor")).toBe("abc");
+  });
+
+  it("should throw when a page fails", async () => {
+    const fetchFn = jest.fn().mockResolvedValue({ ok: false, status: 500 });
+
+    await expect(
+      fetchEvents(new URLSearchParams(), null, fetchFn),
+    ).rejects.toThrow("Failed to load events: 500");
+  });
+});
@@ -0,0 +1,39 @@
+import { Event } from "@/models/event";
+
+/** The page size the events page asks for, the API allows up to 200. */
+export const EVENTS_PAGE_SIZE = 50;
+
+export interface EventsPage {
+  events: Event[];
+  /** the cursor of the next page, null on the last page */
+  nextCursor: string | null;
+}
+
+/**
+ * Fetch one page of the events matching the query. Pass the `nextCursor` of a page
+ * to fetch the page after it.
+ *
+ * @param params the query parameters, see buildEventQuery
+ * @param cursor the cursor of the page to fetch, null for the first page
+ * @param fetchFn the fetch implementation, replaced in tests
+ * @returns the events of the page, in time order, and the cursor of the next one
+ */
+export async function fetchEvents(
+  params: URLSearchParams,
+  cursor: string | null = null,
+  fetchFn: typeof fetch = fetch,
+): Promise<EventsPage> {
+  const query = new URLSearchParams(params);
+  query.set("limit", String(EVENTS_PAGE_SIZE));
+  if (cursor) {
+    query.set("cursor", cursor);
+  }
+  const res = await fetchFn(`/api/events?${query}`);
+  if (!res.ok) {
+    throw new Error(`Failed to load events: ${res.status}`);
+  }
+  return {
+    events: (await res.json()) as Event[],
+    nextCursor: res.headers.get("X-Next-Cursor"),
+  };
+}
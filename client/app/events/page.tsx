@@ -3,13 +3,14 @@
 import { Event } from "@/models/event";
 import { Filters } from "@/models/filters";
 import { Role } from "@/models/roles";
-import { useEffect, useState } from "react";
+import { useEffect, useMemo, useRef, useState } from "react";
 import ActiveFilters from "../../components/ActiveFilters";
 import EventCarousel from "../../components/EventCarousel";
 import FilterButton from "../../components/FilterButton";
 import FilterModal from "../../components/FilterModal";
 import NavBar from "../../components/NavBar";
-import { applyEventFilters } from "./apply-event-filters";
+import { applyCategoryFilter, buildEventQuery } from "./apply-event-filters";
+import { fetchEvents } from "./fetch-events";
 
 // Helper functions
 
@@ -18,6 +19,7 @@ function getActiveFilterCount(filters: Filters) {
   if (filters.scope !== "all") count++;
   if (filters.category) count++;
   if (filters.availability) count++;
+  if (filters.dateRange) count++;
   return count;
 }
 
@@ -31,6 +33,8 @@ function removeFilter(filters: Filters, key: string) {
 
 const EventsPage = () => {
   const [events, setEvents] = useState<Event[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [userRoles, setUserRoles] = useState<Role[]>([]);
   const [showFilters, setShowFilters] = useState(false);
   const [filters, setFilters] = useState<Filters>({
@@ -40,22 +44,53 @@ const EventsPage = () => {
   });
 
   useEffect(() => {
-    Promise.all([
-      fetch("/api/events")
-        .then((res) => res.json())
-        .catch(() => []),
-      fetch("/api/roles")
-        .then((res) => res.json())
-        .catch(() => []),
-    ])
-      .then(([eventsData, rolesData]) => {
-        setEvents(eventsData);
-        setUserRoles(rolesData);
+    fetch("/api/roles")
+      .then((res) => res.json())
+      .then((rolesData) => setUserRoles(rolesData))
+      .catch(() => setUserRoles([]));
+  }, []);
+
+  const params = useMemo(
+    () => buildEventQuery(filters, userRoles),
+    [filters, userRoles],
+  );
+  // a page loaded for filters that have since changed is dropped
+  const currentParams = useRef(params);
+  currentParams.current = params;
+
+  // the API filters the events, the first page is fetched again whenever the
+  // filters change and the next ones on demand
+  useEffect(() => {
+    let cancelled = false;
+    setEvents([]);
+    setNextCursor(null);
+    if (!params) return;
+    fetchEvents(params)
+      .then((page) => {
+        if (cancelled) return;
+        setEvents(page.events);
+        setNextCursor(page.nextCursor);
       })
       .catch((error) => console.error("Error:", error));
-  }, []);
+    return () => {
+      cancelled = true;
+    };
+  }, [params]);
 
-  const filteredEvents = applyEventFilters(events, filters, userRoles);
+  const loadMore = () => {
+    if (!params || !nextCursor) return;
+    setLoadingMore(true);
+    fetchEvents(params, nextCursor)
+      .then((page) => {
+        if (currentParams.current !== params) return;
+        setEvents((loaded) => [...loaded, ...page.events]);
+        setNextCursor(page.nextCursor);
+      })
+      .catch((error) => console.error("Error:", error))
+      .finally(() => setLoadingMore(false));
+  };
+
+  const filteredEvents = applyCategoryFilter(events, filters);
 
   const handleRemoveFilter = (key: string) => {
     setFilters(removeFilter(filters, key));
@@ -70,6 +105,11 @@ const EventsPage = () => {
       />
       <ActiveFilters filters={filters} onRemove={handleRemoveFilter} />
       <EventCarousel events={filteredEvents} />
+      {nextCursor && (
+        <button onClick={loadMore} disabled={loadingMore}>
+          {loadingMore ? "Loading..." : "Load more"}
+        </button>
+      )}
       {showFilters && (
         <FilterModal
           onClose={() => setShowFilters(false)}
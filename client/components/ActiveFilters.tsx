@@ -20,6 +20,14 @@ const ActiveFilters = ({ filters, onRemove }: ActiveFiltersProps) => {
     activeFilters.push({ key: "availability", label: filters.availability.join(", ") });
   }
 
+  if (filters.dateRange) {
+    const { from, to } = filters.dateRange;
+    activeFilters.push({
+      key: "dateRange",
+      label: from && to ? `${from} to ${to}` : from ? `From ${from}` : `Until ${to}`,
+    });
+  }
+
   if (activeFilters.length === 0) return null;
   return (
     <div>
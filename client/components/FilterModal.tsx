@@ -32,6 +32,18 @@ const FilterModal = ({ onClose, filters, onApply }: FilterModalProps) => {
     }
   };
 
+  const handleDateChange = (end: "from" | "to", value: string) => {
+    const dateRange = {
+      from: localFilters.dateRange?.from ?? null,
+      to: localFilters.dateRange?.to ?? null,
+      [end]: value || null,
+    };
+    setLocalFilters({
+      ...localFilters,
+      dateRange: dateRange.from || dateRange.to ? dateRange : null,
+    });
+  };
+
   return (
     <div className="modal-overlay" onClick={onClose}>
       <div className="modal-content" onClick={(e) => e.stopPropagation()}>
@@ -100,6 +112,27 @@ const FilterModal = ({ onClose, filters, onApply }: FilterModalProps) => {
             </label>
           ))}
         </fieldset>
+
+        {/* Dates */}
+        <fieldset>
+          <legend>Dates</legend>
+          <label>
+            From
+            <input
+              type="date"
+              value={localFilters.dateRange?.from || ""}
+              onChange={(e) => handleDateChange("from", e.target.value)}
+            />
+          </label>
+          <label>
+            To
+            <input
+              type="date"
+              value={localFilters.dateRange?.to || ""}
+              onChange={(e) => handleDateChange("to", e.target.value)}
+            />
+          </label>
+        </fieldset>
         <button onClick={() => onApply(localFilters)}>Apply</button>
         <button onClick={onClose}>Cancel</button>
       </div>
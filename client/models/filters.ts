@@ -4,8 +4,16 @@ import { Availability } from "./user";
 export const SCOPE_OPTIONS = ["all", "myOrgs", "admin"] as const;
 
 export type Scope = (typeof SCOPE_OPTIONS)[number];
+
+/** Calendar days (YYYY-MM-DD), both included, either end may be left open. */
+export interface DateRange {
+  from: string | null;
+  to: string | null;
+}
+
 export interface Filters {
   scope: Scope | null;
   category: EventCategory | null;
   availability: Availability[] | null;
+  dateRange?: DateRange | null;
 }